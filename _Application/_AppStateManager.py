@@ -5,14 +5,16 @@ from _Application._SystemEvent import (
     NewTestExecutionEvent,
     TestRunTerminationEvent,
     TestCaseFailEvent,
+    UserInteractionEvent,
 )
 from _Application._DomainEntity._Session import Session, ControlSession, ViewSession
 from _Application._SystemEventBus import SystemEventBus
+from _Application._UIStateStore import UIStateStore, json_pointer
 from _Application._SystemEvent import BaseEvent
 from _Application._DomainEntity._TestCaseDataModel import TestCaseDataModel
 from _Node._TCNode import TCNode
-from typing import TYPE_CHECKING, Dict, Any
-import trio
+from _Node._BaseNode import NodeState
+from typing import TYPE_CHECKING, Dict, Any, List
 import logging
 
 if TYPE_CHECKING:
@@ -29,16 +31,30 @@ class ApplicationStateManager:
         node_executor_send_channel: "MemorySendChannel[BaseNode]",
         ui_request_send_channel: "MemorySendChannel[str]",
         test_profile,  # type: ignore
+        panel_count: int = 1,
     ):
         self._app_state = {}
         self._control_context = {}
         self._app_data = {}
+        self._ui_state = UIStateStore()
         self._event_bus = event_bus
         self._tc_data_send_channel = tc_data_send_channel
         self._node_executor_send_channel = node_executor_send_channel
         self._ui_request_send_channel = ui_request_send_channel
         self._test_profile = test_profile  # type: ignore
-        self._event_bus.subscribe(self.event_handler)
+        self._panel_count = panel_count
+        # COMMENT: Test cases shown per test run, and the last finished test run of every panel.
+        #   A finished run stays on screen until the panel's next run finishes, then it is evicted,
+        #   its results are in the ResultStore.
+        self._run_test_cases: Dict[str, List[str]] = {}
+        self._finished_runs: Dict[Any, str] = {}
+        self._event_bus.subscribe(self._on_new_test_case, NewTestCaseEvent)
+        self._event_bus.subscribe(self._on_parameter_update, ParameterUpdateEvent)
+        self._event_bus.subscribe(self._on_progress_update, ProgressUpdateEvent)
+        self._event_bus.subscribe(self._on_new_test_execution, NewTestExecutionEvent)
+        self._event_bus.subscribe(self._on_test_run_termination, TestRunTerminationEvent)
+        self._event_bus.subscribe(self._on_test_case_fail, TestCaseFailEvent)
+        self._event_bus.subscribe(self._on_user_interaction, UserInteractionEvent)
         self._control_session: ControlSession | None = None
         self._sessions: Dict["WebSocketConnection", Session] = {}
         self._logger = logging.getLogger("ApplicationStateManager")
@@ -51,6 +67,19 @@ class ApplicationStateManager:
     def sessions(self):
         return self._sessions
 
+    @property
+    def ui_state(self) -> UIStateStore:
+        return self._ui_state
+
+    async def _send_patch(self, event_type: str, patch: List[Dict[str, Any]]):
+        try:
+            message = self._ui_state.apply(event_type, patch)
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            # COMMENT: The patch may be applied in part, the clients get the whole state instead
+            self._logger.error(f"Cannot apply {event_type} patch, resyncing the clients: {e!r}")
+            message = self._ui_state.resync()
+        await self._tc_data_send_channel.send(message)
+
     def add_session(self, ws_connection: "WebSocketConnection"):
         if not self._control_session:
             new_session = ControlSession(
@@ -59,6 +88,7 @@ class ApplicationStateManager:
                 self._ui_request_send_channel,
                 self._event_bus,
                 self._test_profile,  # type: ignore
+                self._panel_count,
             )
             self._control_session = new_session
         else:
@@ -70,100 +100,154 @@ class ApplicationStateManager:
         if isinstance(session, ControlSession):
             self._control_session = None
 
-    async def event_handler(self, event: BaseEvent):
-        if isinstance(event, NewTestCaseEvent):
-            if isinstance(
-                event.payload, TCNode
-            ):  # FIXME: Is this necessary for type checking?
-                self._logger.info(
-                    f"New test case added to test run {event.payload.name} "
-                )
-                tc_node = event.payload
-                react_ui_data_payload = {
-                    "type": "tc_data",
-                    "event_type": "newTC",
-                    "payload": tc_node.data_model.react_ui_payload,
-                }
-                async with trio.open_nursery() as nursery:
-                    nursery.start_soon(
-                        self._tc_data_send_channel.send, react_ui_data_payload
-                    )
-            else:
-                self._logger.error("New test case event payload is not of type TCNode")
-                raise (TypeError("New test case event payload is not of type TCNode"))
-        elif isinstance(event, ParameterUpdateEvent):
+    async def _on_new_test_case(self, event: BaseEvent):
+        if isinstance(
+            event.payload, TCNode
+        ):  # FIXME: Is this necessary for type checking?
             self._logger.info(
-                f"Parameter updated for test case {event.payload['tc_id']}"
+                f"New test case added to test run {event.payload.name} "
+            )
+            tc_node = event.payload
+            self._run_test_cases.setdefault(tc_node.data_model.parent_tr_id, []).append(
+                tc_node.id
             )
-            async with trio.open_nursery() as nursery:
-                nursery.start_soon(
-                    self._tc_data_send_channel.send,
+            await self._send_patch(
+                "newTC",
+                [
                     {
-                        "type": "tc_data",
-                        "event_type": "parameterUpdate",
-                        "payload": event.payload,
-                    },
-                )
+                        "op": "add",
+                        "path": json_pointer("test_cases", tc_node.id),
+                        "value": tc_node.data_model.react_ui_payload,
+                    }
+                ],
+            )
+        else:
+            self._logger.error("New test case event payload is not of type TCNode")
+            raise (TypeError("New test case event payload is not of type TCNode"))
 
-        elif isinstance(event, ProgressUpdateEvent):
-            tc_data_model = event.payload
-            if isinstance(tc_data_model, TestCaseDataModel):
-                self._logger.info(
-                    f"Progress updated for test case {tc_data_model.id}"
-                )
-                react_ui_data_payload = {
-                    "type": "tc_data",
-                    "event_type": "progressUpdate",
-                    "payload": {
-                        "tc_id": tc_data_model.id,
-                        "progress": tc_data_model.progress,   
-                    },
+    async def _on_parameter_update(self, event: BaseEvent):
+        self._logger.info(
+            f"Parameter updated for test case {event.payload['tc_id']}"
+        )
+        tc_id = event.payload["tc_id"]
+        execution_id = event.payload["execution_id"]
+        await self._send_patch(
+            "parameterUpdate",
+            [
+                {
+                    "op": "add",
+                    "path": json_pointer(
+                        "test_cases", tc_id, "executions", execution_id, "parameters", name
+                    ),
+                    "value": parameter,
                 }
-                async with trio.open_nursery() as nursery:
-                    nursery.start_soon(
-                        self._tc_data_send_channel.send, react_ui_data_payload
-                    )
-            else:
-                self._logger.error(
-                    "Progress update event payload is not of type TestCaseDataModel"
-                )
-                raise (
-                    TypeError(
-                        "Progress update event payload is not of type TestCaseDataModel"
-                    )
-                )
-        elif isinstance(event, NewTestExecutionEvent):
+                for name, parameter in event.payload["parameter"].items()
+            ],
+        )
+
+    async def _on_progress_update(self, event: BaseEvent):
+        tc_data_model = event.payload
+        if isinstance(tc_data_model, TestCaseDataModel):
+            # COMMENT: A late update of an evicted test case would fail the patch and resync
+            #   every client, there is nothing left to update
+            if tc_data_model.id not in self._ui_state.state["test_cases"]:
+                self._logger.debug(f"Progress update of unknown test case {tc_data_model.id} dropped")
+                return
             self._logger.info(
-                f"New execution added to test case {event.payload['tc_id']}"
+                f"Progress updated for test case {tc_data_model.id}"
             )
-            async with trio.open_nursery() as nursery:
-                nursery.start_soon(
-                    self._tc_data_send_channel.send,
+            await self._send_patch(
+                "progressUpdate",
+                [
                     {
-                        "type": "tc_data",
-                        "event_type": "newExecution",
-                        "payload": event.payload,
-                    },
+                        "op": "replace",
+                        "path": json_pointer("test_cases", tc_data_model.id, "progress"),
+                        "value": tc_data_model.progress,
+                    }
+                ],
+            )
+        else:
+            self._logger.error(
+                "Progress update event payload is not of type TestCaseDataModel"
+            )
+            raise (
+                TypeError(
+                    "Progress update event payload is not of type TestCaseDataModel"
                 )
+            )
 
-        elif isinstance(event, TestRunTerminationEvent):
-            self._logger.info(f"Test run {event.payload['tr_id']} terminated")
-            async with trio.open_nursery() as nursery:
-                nursery.start_soon(
-                    self._tc_data_send_channel.send,
-                    {
-                        "type": "tc_data",
-                        "event_type": "testRunTermination",
-                    },
-                )
-        elif isinstance(event, TestCaseFailEvent):
-            self._logger.info(f"Test case {event.payload['tc_id']} failed")
-            async with trio.open_nursery() as nursery:
-                nursery.start_soon(
-                    self._tc_data_send_channel.send,
-                    {
-                        "type": "tc_data",
-                        "event_type": "testCaseFail",
-                        "payload": event.payload,
+    async def _on_new_test_execution(self, event: BaseEvent):
+        self._logger.info(
+            f"New execution added to test case {event.payload['tc_id']}"
+        )
+        tc_id = event.payload["tc_id"]
+        execution_id = event.payload["execution_id"]
+        await self._send_patch(
+            "newExecution",
+            [
+                {
+                    "op": "add",
+                    "path": json_pointer("test_cases", tc_id, "executions", execution_id),
+                    "value": {
+                        "id": execution_id,
+                        "name": f"Execution {execution_id + 1}",
+                        "parameters": {},
                     },
-                )
+                },
+                {
+                    "op": "replace",
+                    "path": json_pointer("test_cases", tc_id, "tc_state"),
+                    "value": event.payload["tc_state"],
+                },
+                {
+                    "op": "replace",
+                    "path": json_pointer("test_cases", tc_id, "progress"),
+                    "value": 0,
+                },
+            ],
+        )
+
+    async def _on_test_run_termination(self, event: BaseEvent):
+        tr_id = event.payload["tr_id"]
+        self._logger.info(f"Test run {tr_id} terminated")
+        value: Dict[str, Any] = {"terminated": True}
+        # COMMENT: Set when the test run could not be loaded
+        if event.payload.get("failed"):
+            value["failed"] = True
+        patch: List[Dict[str, Any]] = [
+            {"op": "add", "path": json_pointer("test_runs", tr_id), "value": value}
+        ]
+        previous_tr_id = self._finished_runs.get(event.payload.get("panel_id"))
+        if previous_tr_id is not None:
+            patch.extend(self._eviction_patch(previous_tr_id))
+        self._finished_runs[event.payload.get("panel_id")] = tr_id
+        await self._send_patch("testRunTermination", patch)
+
+    def _eviction_patch(self, tr_id: str) -> List[Dict[str, Any]]:
+        patch = [
+            {"op": "remove", "path": json_pointer("test_cases", tc_id)}
+            for tc_id in self._run_test_cases.pop(tr_id, [])
+            if tc_id in self._ui_state.state["test_cases"]
+        ]
+        if tr_id in self._ui_state.state["test_runs"]:
+            patch.append({"op": "remove", "path": json_pointer("test_runs", tr_id)})
+        return patch
+
+    async def _on_test_case_fail(self, event: BaseEvent):
+        self._logger.info(f"Test case {event.payload['tc_id']} failed")
+        await self._send_patch(
+            "testCaseFail",
+            [
+                {
+                    "op": "replace",
+                    "path": json_pointer("test_cases", event.payload["tc_id"], "tc_state"),
+                    "value": NodeState.FAILED.value,
+                }
+            ],
+        )
+
+    async def _on_user_interaction(self, event: BaseEvent):
+        # COMMENT: The payload is an InteractionContext, the UIRequestProcessor sends the prompt
+        #   and answers the context
+        self._logger.info(f"User interaction {event.payload.id} requested")
+        await self._ui_request_send_channel.send(event.payload)
@@ -2,6 +2,11 @@ from _ProducerConsumer._WorkflowProcessor._NodeResultProcessor import (
     NodeResultProcessor,
 )
 from _ProducerConsumer._WorkflowProcessor._NodeExecutor import NodeExecutor
+from _ProducerConsumer._WorkflowProcessor._ResourcePool import ResourcePool
+from _ProducerConsumer._WorkflowProcessor._NodeScheduler import (
+    CriticalPathScheduler,
+    DurationHistory,
+)
 from _ProducerConsumer._SideEffectProcessor._AppCommandProcessor import (
     AppCommandProcessor,
 )
@@ -14,27 +19,83 @@ from _ProducerConsumer._WorkflowProcessor._NodeFailureProcessor import (
 from _ProducerConsumer._SideEffectProcessor._TCDataWSProcessor import TCDataWSProcessor
 from _ProducerConsumer._SideEffectProcessor._LogProcessor import LogProcessor
 from _Application._SystemEventBus import SystemEventBus
+from _Application._SystemEvent import TestRunTerminationEvent
 from _Application._AppStateManager import ApplicationStateManager
+from _Application._ResultStore import ResultStore
 from _CommunicationModules._WSCommModule import WSCommModule
-from sample_profile.profile import SampleTestProfile
+from _Application._DomainEntity._ProfileTemplate import ProfileTemplate
+from _Application._DomainEntity._InteractionContext import InteractionContext
+from _Application._ProfileRegistry import ProfileRegistry
 from util.log_handler import WebSocketLogHandler
+from util.log_buffer import LogBuffer
 from util.log_filter import TAGAppLoggerFilter
-from _Node._TestRunTerminalNode import TestRunTerminalNode
+from util.log_setup import LOG_FORMAT
+from util.process_runner import default_process_runner
+from util.remote_worker import Address, RemoteRunner
+from util.tracer import Tracer
+from util.output_path import output_path
+from util.latency import LatencyRecorder
 
-from typing import Dict, Any, TYPE_CHECKING
-from queue import Queue
+from typing import Dict, Any, Iterable, TYPE_CHECKING
+from functools import partial
 import logging
+import json
 import trio
+import os
 
 if TYPE_CHECKING:
     from _Node._BaseNode import BaseNode
+    from _Application._DomainEntity._Panel import Panel
+    from _Application._ResultIndex import ResultIndex
+
+
+def _write_json(path: str, data: Any) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def _open_result_index(directory: str, log_path: str, log_length: int) -> "ResultIndex":
+    # COMMENT: Imported here, the index pulls in numpy
+    from _Application._ResultIndex import ResultIndex
+
+    # COMMENT: The index is derived from the result log, caught up with it or rebuilt from it
+    return ResultIndex.open(directory, log_path, log_length)
 
 
 class Application:
-    def __init__(self):
+    """
+    Wires the producers, consumers and communication modules together, start() runs them.
+
+    Nodes run unbounded unless max_concurrency or resource_limits is set. Only in that bounded
+    mode do waiting nodes get a critical path priority, with durations learned in
+    duration_history_file, a file of data_directory. Files written on request of a client go to
+    output_directory.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int | None = None,
+        resource_limits: Dict[str, int] | None = None,
+        data_directory: str = "data",
+        duration_history_file: str | None = "node_durations.json",
+        event_batch_window: float | None = 0.02,
+        panel_count: int = 1,
+        remote_workers: Iterable[Address] | None = None,
+        remote_authkey: bytes | None = None,
+        result_store_path: str | None = "test_results.bin",
+        trace_capacity: int | None = 10000,
+        output_directory: str = "output",
+        latency_dump_file: str | None = "node_latency.json",
+        profile: str = "sample",
+        profile_directories: Iterable[str] = (),
+        profile_cache_directory: str | None = ".profile_cache",
+    ):
         self._command_mapping = {
             "loadTC": self.start_test_run,
             "retest": self.retest,
+            "exportTrace": self.export_trace,
+            "dumpLatency": self.dump_latency,
         }
 
         self._node_executor_send_channel: trio.MemorySendChannel["BaseNode"]
@@ -64,14 +125,14 @@ class Application:
             trio.open_memory_channel(50)
         )
 
-        self._ui_request_send_channel: trio.MemorySendChannel[str]
-        self._ui_request_receive_channel: trio.MemoryReceiveChannel[str]
+        self._ui_request_send_channel: trio.MemorySendChannel[InteractionContext]
+        self._ui_request_receive_channel: trio.MemoryReceiveChannel[InteractionContext]
         self._ui_request_send_channel, self._ui_request_receive_channel = (
             trio.open_memory_channel(50)
         )
 
-        self._ui_response_send_channel: trio.MemorySendChannel[str]
-        self._ui_response_receive_channel: trio.MemoryReceiveChannel[str]
+        self._ui_response_send_channel: trio.MemorySendChannel[Dict[Any, Any]]
+        self._ui_response_receive_channel: trio.MemoryReceiveChannel[Dict[Any, Any]]
         self._ui_response_send_channel, self._ui_response_receive_channel = (
             trio.open_memory_channel(50)
         )
@@ -83,49 +144,102 @@ class Application:
         )
 
         # COMMENT: Custom log handler and filter installation
-        self._log_queue: Queue[logging.LogRecord | TestRunTerminalNode] = Queue()
+        self._log_buffer = LogBuffer()
         root_logger = logging.getLogger()
-        ws_logger_handler = WebSocketLogHandler(self._log_queue)
-        if root_logger.handlers:
-            formatter = root_logger.handlers[0].formatter
-            ws_logger_handler.setFormatter(formatter)
+        ws_logger_handler = WebSocketLogHandler(self._log_buffer)
+        # COMMENT: The root logger's handler is the QueueHandler of setup_logging, which has no
+        #   formatter, the format of the log file is used
+        ws_logger_handler.setFormatter(logging.Formatter(LOG_FORMAT))
         ws_logger_handler.addFilter(TAGAppLoggerFilter())
         ws_logger_handler.setLevel(logging.DEBUG)
         root_logger.addHandler(ws_logger_handler)
 
         # COMMENT: Application state manager initialization
-        self._system_event_bus = SystemEventBus()
+        self._system_event_bus = SystemEventBus(event_batch_window)
         self._asm = ApplicationStateManager(
             self._system_event_bus,
             self._tc_data_send_channel,  # type: ignore
             self._node_executor_send_channel,  # type: ignore
             self._ui_request_send_channel,  # type: ignore
-            SampleTestProfile,
+            None,
+            panel_count,
         )
 
+        # COMMENT: Profiles are imported and compiled at loadTC, the first time they are used
+        self._default_profile = profile
+        self._profile_registry = ProfileRegistry(profile_directories, profile_cache_directory)
+
+        # COMMENT: Results are persisted as they happen, finished test runs are then evicted from
+        #   the UI state
+        self._result_store: ResultStore | None = None
+        if result_store_path is not None:
+            # COMMENT: The index (and numpy) is opened once the store starts, off the startup path
+            self._result_store = ResultStore(
+                result_store_path,
+                index_opener=partial(
+                    _open_result_index, result_store_path + ".index", result_store_path
+                ),
+            )
+            self._result_store.subscribe(self._system_event_bus)
+
         # COMMENT: Consumer initialization
 
+        # COMMENT: Per-stage latency histograms of every node execution, dumped on shutdown to
+        #   latency_dump_file in output_directory
+        self._latency_recorder = LatencyRecorder()
+        self._latency_dump_file = latency_dump_file
+
         # COMMENT: Initialize communication modules
         self._ws_comm_module = WSCommModule(
             self._app_command_send_channel,  # type: ignore
             self._ui_response_send_channel,  # type: ignore
             self._asm,
+            latency_recorder=self._latency_recorder,
         )
 
+        # COMMENT: Executor runs in bounded mode only when limits are configured, waiting nodes
+        #   are then served longest remaining critical path first
+        resource_pool: ResourcePool | None = None
+        self._scheduler: CriticalPathScheduler | None = None
+        if max_concurrency is not None or resource_limits:
+            resource_pool = ResourcePool(max_concurrency, resource_limits)
+            self._scheduler = CriticalPathScheduler(
+                DurationHistory(
+                    os.path.join(data_directory, duration_history_file)
+                    if duration_history_file is not None
+                    else None
+                )
+            )
+        # COMMENT: With remote workers configured, process mode test cases are forwarded to them,
+        #   see util.remote_worker
+        self._remote_runner: RemoteRunner | None = (
+            RemoteRunner(remote_workers, authkey=remote_authkey) if remote_workers else None
+        )
+        # COMMENT: Files written on request of a client go to output_directory, see output_path
+        self._output_directory = output_directory
+        # COMMENT: Spans of the last trace_capacity node executions of every test run
+        self._tracer: Tracer | None = (
+            Tracer(trace_capacity) if trace_capacity is not None else None
+        )
         self._node_executor: NodeExecutor = NodeExecutor(
             self._node_executor_receive_channel,  # type: ignore
             self._node_result_processor_send_channel,  # type: ignore
+            resource_pool,
+            self._scheduler,
+            self._remote_runner,
+            self._tracer,
         )
         self._node_result_processor = NodeResultProcessor(
             self._node_result_processor_receive_channel,  # type: ignore
             self._node_failure_send_channel,  # type: ignore
+            self._latency_recorder,
         )
 
         self._node_failure_processor = NodeFailureProcessor(
             self._node_failure_receive_channel  # type: ignore
         )
 
-        self._log_processor = LogProcessor(self._log_queue, self._ws_comm_module)
+        self._log_processor = LogProcessor(self._log_buffer, self._ws_comm_module)
         self._ui_request_processor = UIRequestProcessor(
             self._ui_request_receive_channel,  # type: ignore
             self._ui_response_receive_channel,  # type: ignore
@@ -143,28 +257,132 @@ class Application:
 
         self._logger = logging.getLogger("Application")
 
-    async def start_test_run(self):
+    @property
+    def tracer(self) -> Tracer | None:
+        return self._tracer
+
+    async def export_trace(self, file_name: str = "trace.json", run_id: str | None = None):
+        if self._tracer is None:
+            self._logger.error("Tracing is disabled")
+            return
+        try:
+            path = output_path(self._output_directory, file_name)
+        except ValueError as e:
+            self._logger.error(f"Trace not exported: {e}")
+            return
+        # COMMENT: Without a run id, the trace covers every run still held by the tracer. Built
+        #   here, the executor keeps recording spans meanwhile, only the file is written in a thread.
+        trace = self._tracer.to_chrome_trace(run_id, all_runs=run_id is None)
+        await trio.to_thread.run_sync(_write_json, path, trace)
+        self._logger.info(f"Trace written to {path}")
+
+    @property
+    def latency_recorder(self) -> LatencyRecorder:
+        return self._latency_recorder
+
+    async def dump_latency(self, file_name: str | None = None):
+        try:
+            path = output_path(
+                self._output_directory,
+                file_name or self._latency_dump_file or "node_latency.json",
+            )
+        except ValueError as e:
+            self._logger.error(f"Latency histograms not written: {e}")
+            return
+        await trio.to_thread.run_sync(_write_json, path, self._latency_recorder.summary())
+        self._logger.info(f"Latency histograms written to {path}")
+
+    async def _serve_result_index(self):
+        assert self._result_store is not None
+        self._ws_comm_module.result_index = await self._result_store.wait_index()
+
+    @property
+    def profile_registry(self) -> ProfileRegistry:
+        return self._profile_registry
+
+    async def _profile_template(self, name: str) -> ProfileTemplate:
+        template = self._profile_registry.cached(name)
+        if template is None:
+            # COMMENT: Importing or compiling the profile may take a while, it is done in a thread
+            template = await trio.to_thread.run_sync(self._profile_registry.template, name)
+        return template
+
+    async def start_test_run(self, panel_id: int | None = None, profile: str | None = None):
         if self._asm.control_session is None:
             self._logger.error("Control session not established")
             raise Exception(
                 "Control session not established"
             )  # TODO: this should not stop the application execution loop, prompt user instead
-        for panel in self._asm.control_session.panels:
+        try:
+            template = await self._profile_template(profile or self._default_profile)
+        except (ImportError, AttributeError, KeyError, TypeError, ValueError) as e:
+            self._logger.error(f"Test profile {profile or self._default_profile} not loaded: {e}")
+            return
+        if panel_id is None:
+            panels = self._asm.control_session.panels
+        else:
+            try:
+                panels = [self._asm.control_session.panel(panel_id)]
+            except KeyError:
+                # COMMENT: Logged by the session, an unknown panel must not stop the application
+                return
+        # COMMENT: Panels load concurrently, each test run DAG starts executing as soon as its
+        #   first test cases are scheduled instead of waiting for the other panels to load. A
+        #   panel that fails to load does not cancel the others, see _load_panel
+        async with trio.open_nursery() as nursery:
+            for panel in panels:
+                nursery.start_soon(self._load_panel, panel, template)
+
+    async def _load_panel(self, panel: "Panel", template: ProfileTemplate):
+        try:
+            panel.test_profile = template
             await panel.add_test_run()
-            if panel.test_run is not None:
-                await panel.test_run.load_test_case()
+        except Exception as e:
+            # COMMENT: E.g. the panel is still running a test run, which goes on
+            self._logger.error(f"Panel {panel.id} cannot start a test run: {e}")
+            return
+        test_run = panel.test_run
+        if test_run is None:
+            return
+        try:
+            await test_run.load_test_case()
+        except Exception as e:
+            self._logger.error(f"Test run {test_run.id} of panel {panel.id} failed to load: {e!r}")
+            if test_run.tc_nodes:
+                # COMMENT: Test cases already scheduled run, the test run ends with them
+                return
+            panel.remove_test_run()
+            await self._system_event_bus.publish(
+                TestRunTerminationEvent(
+                    {"tr_id": test_run.id, "panel_id": panel.id, "failed": True}
+                )
+            )
 
-    async def retest(self, tc_id: str | None = None):
+    async def retest(self, tc_id: str | None = None, panel_id: int | None = None):
         if self._asm.control_session is None:
             self._logger.error("Control session not established")
             raise Exception("Control session not established")
-        if tc_id is not None and self._asm.control_session.panels[0].test_run is not None:
-            await self._asm.control_session.panels[0].test_run.retest_failed_test_cases(tc_id)
+        if tc_id is None:
+            return
+        if panel_id is None:
+            panels = self._asm.control_session.panels
+        else:
+            try:
+                panels = [self._asm.control_session.panel(panel_id)]
+            except KeyError:
+                # COMMENT: Logged by the session, an unknown panel must not stop the application
+                return
+        for panel in panels:
+            if panel.test_run is not None and panel.test_run.has_failed_test_case(tc_id):
+                await panel.test_run.retest_failed_test_cases(tc_id)
+                return
+        self._logger.error(f"No failed test case {tc_id} to retest")
 
     async def start(self):
         try:
             async with trio.open_nursery() as nursery:
                 # NOTE: Each consumer can be considered as an attachment
+                nursery.start_soon(self._system_event_bus.start)
                 nursery.start_soon(self._ws_comm_module.start)
                 nursery.start_soon(self._node_executor.start)
                 nursery.start_soon(self._node_result_processor.start)
@@ -173,6 +391,20 @@ class Application:
                 nursery.start_soon(self._ui_request_processor.start)
                 nursery.start_soon(self._tc_data_ws_processor.start)
                 nursery.start_soon(self._app_command_processor.start)
+                if self._result_store is not None:
+                    nursery.start_soon(self._result_store.start)
+                    nursery.start_soon(self._serve_result_index)
+                if self._remote_runner is not None:
+                    nursery.start_soon(self._remote_runner.start)
         except Exception as e:
             self._logger.error(e)
             raise
+        finally:
+            if self._scheduler is not None:
+                self._scheduler.duration_history.save()
+            if self._latency_dump_file is not None:
+                os.makedirs(self._output_directory, exist_ok=True)
+                self._latency_recorder.dump(
+                    output_path(self._output_directory, self._latency_dump_file)
+                )
+            default_process_runner().shutdown()
@@ -12,21 +12,82 @@ class InteractionType(Enum):
 
 
 class InteractionContext:
-    def __init__(self, interaction_type: InteractionType, payload: Dict[str, Any]):
+    """
+    One prompt to the operator. The id travels with the prompt and its response, so any number of
+    prompts can be outstanding at once. If timeout is set and no response arrives in time, the
+    prompt is answered with default_response and timed_out is set.
+    """
+
+    def __init__(
+        self,
+        interaction_type: InteractionType,
+        payload: Any,
+        timeout: float | None = None,
+        default_response: Any = None,
+    ):
         self._id = uuid4().hex
         self._interaction_type = interaction_type
         self._payload = payload
+        self._timeout = timeout
+        self._default_response = default_response
+        self._timed_out = False
         self._response_ready_flag = Event()
         self._response = None
 
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @property
+    def interaction_type(self) -> InteractionType:
+        return self._interaction_type
+
+    @property
+    def payload(self) -> Any:
+        return self._payload
+
+    @property
+    def timeout(self) -> float | None:
+        return self._timeout
+
+    @property
+    def default_response(self) -> Any:
+        return self._default_response
+
+    @property
+    def timed_out(self) -> bool:
+        return self._timed_out
+
+    @property
+    def answered(self) -> bool:
+        return self._response_ready_flag.is_set()
+
+    @property
+    def message(self) -> Dict[str, Any]:
+        return {
+            "type": "prompt",
+            "id": self._id,
+            "interaction_type": self._interaction_type.name,
+            "data": self._payload,
+            "timeout": self._timeout,
+        }
+
     @property
     def response(self): # type: ignore
         return self._response # type: ignore
     
     @response.setter
     def response(self, value): # type: ignore
+        # COMMENT: The first answer wins, a late response after a timeout is ignored
+        if self._response_ready_flag.is_set():
+            return
         self._response = value # type: ignore
         self._response_ready_flag.set()
 
+    def expire(self) -> None:
+        if not self._response_ready_flag.is_set():
+            self._timed_out = True
+            self.response = self._default_response
+
     async def response_ready(self):
-        await self._response_ready_flag.wait()
\ No newline at end of file
+        await self._response_ready_flag.wait()
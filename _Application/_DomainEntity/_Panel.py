@@ -45,6 +45,15 @@ class Panel:
     def test_run(self):
         return self._test_run
 
+    # COMMENT: The profile of the next test run, chosen at loadTC
+    @property
+    def test_profile(self):  # type: ignore
+        return self._test_profile  # type: ignore
+
+    @test_profile.setter
+    def test_profile(self, value):  # type: ignore
+        self._test_profile = value  # type: ignore
+
     @parent_control_session.setter
     def parent_control_session(self, value: "ControlSession"):
         self._parent_control_session = value
@@ -1,10 +1,15 @@
 from abc import ABC, abstractmethod
 from typing import Any, Union, Dict
+import sys
 
 
 class Parameter(ABC):
+    # COMMENT: A unit can measure tens of thousands of parameters, slots keep them small
+    __slots__ = ("_parameter_name", "_description", "_result")
+
     def __init__(self, parameter_name: str):
-        self._parameter_name: str = parameter_name
+        # COMMENT: Every unit measures the same parameters, interned their names are stored once
+        self._parameter_name: str = sys.intern(parameter_name)
         self._description: str = ""
         self._result: bool
 
@@ -59,6 +64,8 @@ class Parameter(ABC):
 
 
 class SingleValueParameter(Parameter):
+    __slots__ = ("_expected_value", "_measured_value")
+
     def __init__(
         self,
         parameter_name: str,
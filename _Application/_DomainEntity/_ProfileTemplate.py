@@ -0,0 +1,207 @@
+from typing import Any, Callable, Dict, FrozenSet, List, NamedTuple, Tuple, TYPE_CHECKING
+from _Node._NodeGraph import NodeGraph
+from _Node._TCNode import TCNode, ExecutionMode
+from util.profile_loader import import_object, object_reference
+import logging
+
+if TYPE_CHECKING:
+    from _Node._BaseNode import BaseNode
+
+
+class NodeSpec(NamedTuple):
+    name: str
+    callable_object: Callable[..., Any]
+    func_parameter_label: str | None
+    description: str
+    resources: FrozenSet[str]
+    execution_mode: ExecutionMode
+    # COMMENT: Indices into ProfileTemplate.node_specs, always smaller than the spec's own index
+    dependencies: Tuple[int, ...]
+    # COMMENT: (func_parameter_label, dependency index) pairs, the argument bindings of the callable
+    bindings: Tuple[Tuple[str, int], ...]
+
+
+class ProfileTemplate:
+    """
+    A test profile compiled once into an immutable description of its DAG. The node specs are
+    stored in topological order, so a test run only has to create fresh TCNodes and link them,
+    without re-running the profile, cycle checks or binding resolution. Compiling validates the
+    DAG and the argument bindings of every callable, a profile that cannot bind fails to load.
+    A template read back with from_dict is validated the same way.
+    """
+
+    def __init__(self, name: str, node_specs: Tuple[NodeSpec, ...]) -> None:
+        self._name = name
+        self._node_specs = node_specs
+        self._logger = logging.getLogger("ProfileTemplate")
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def node_specs(self) -> Tuple[NodeSpec, ...]:
+        return self._node_specs
+
+    def __len__(self) -> int:
+        return len(self._node_specs)
+
+    @classmethod
+    def compile(cls, test_profile) -> "ProfileTemplate":  # type: ignore
+        """
+        Instantiates the profile class once and captures its DAG.
+        """
+        profile = test_profile()  # type: ignore
+        test_case_list: List["BaseNode"] = list(profile.test_case_list)  # type: ignore
+        for tc_node in test_case_list:
+            if not isinstance(tc_node, TCNode):
+                raise TypeError(
+                    f"{tc_node.name} in {test_profile.__name__} is not a TCNode"  # type: ignore
+                )
+        members = set(test_case_list)
+        graph = NodeGraph()
+        for tc_node in test_case_list:
+            for dependency in tc_node.dependencies:
+                if dependency not in members:
+                    raise ValueError(
+                        f"{tc_node.name} depends on {dependency.name}, which is not part of the profile"
+                    )
+            graph.add_node(tc_node)
+        ordered = [node for node in graph.topological_order() if node in members]
+        for tc_node in ordered:
+            assert isinstance(tc_node, TCNode)
+            tc_node.validate_bindings()
+
+        index: Dict["BaseNode", int] = {node: i for i, node in enumerate(ordered)}
+        node_specs: List[NodeSpec] = []
+        for tc_node in ordered:
+            assert isinstance(tc_node, TCNode)
+            node_specs.append(
+                NodeSpec(
+                    name=tc_node.name,
+                    callable_object=tc_node.callable_object,
+                    func_parameter_label=tc_node.func_parameter_label,
+                    description=tc_node.data_model.description,
+                    resources=tc_node.resources,
+                    execution_mode=tc_node.execution_mode,
+                    dependencies=tuple(index[d] for d in tc_node.dependencies),
+                    bindings=tuple(
+                        (label, index[d])
+                        for label, d in tc_node.dependency_bindings.items()
+                    ),
+                )
+            )
+        template = cls(test_profile.__name__, tuple(node_specs))  # type: ignore
+        template._validate_dag()
+        return template
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        JSON-serialisable form of the template, callables are stored as "module:name" references.
+        Raises ValueError when a callable has no such reference.
+        """
+        node_specs: List[Dict[str, Any]] = []
+        for spec in self._node_specs:
+            reference = object_reference(spec.callable_object)
+            if reference is None:
+                raise ValueError(f"{spec.name}: {spec.callable_object!r} cannot be referenced by name")
+            node_specs.append(
+                {
+                    "name": spec.name,
+                    "callable": reference,
+                    "func_parameter_label": spec.func_parameter_label,
+                    "description": spec.description,
+                    "resources": sorted(spec.resources),
+                    "execution_mode": spec.execution_mode.value,
+                    "dependencies": list(spec.dependencies),
+                    "bindings": [list(binding) for binding in spec.bindings],
+                }
+            )
+        return {"name": self._name, "node_specs": node_specs}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ProfileTemplate":
+        """
+        Inverse of to_dict. The profile is not instantiated again, the callables are imported and
+        the template is validated, see validate.
+        """
+        callables: Dict[str, Callable[..., Any]] = {}
+
+        def resolve(reference: str) -> Callable[..., Any]:
+            # COMMENT: Test cases of a profile tend to share a few callables
+            callable_object = callables.get(reference)
+            if callable_object is None:
+                callable_object = callables[reference] = import_object(reference)
+            return callable_object
+
+        template = cls(
+            data["name"],
+            tuple(
+                NodeSpec(
+                    name=spec["name"],
+                    callable_object=resolve(spec["callable"]),
+                    func_parameter_label=spec["func_parameter_label"],
+                    description=spec["description"],
+                    resources=frozenset(spec["resources"]),
+                    execution_mode=ExecutionMode(spec["execution_mode"]),
+                    dependencies=tuple(spec["dependencies"]),
+                    bindings=tuple((label, index) for label, index in spec["bindings"]),
+                )
+                for spec in data["node_specs"]
+            ),
+        )
+        template.validate()
+        return template
+
+    def _validate_dag(self) -> None:
+        names = set()
+        for i, spec in enumerate(self._node_specs):
+            if spec.name in names:
+                raise ValueError(f"More than one test case is named {spec.name}")
+            names.add(spec.name)
+            # COMMENT: Dependencies precede their dependents, an index that does not is unknown
+            #   or part of a cycle
+            for dependency_index in spec.dependencies:
+                if not 0 <= dependency_index < i:
+                    raise ValueError(
+                        f"{spec.name} depends on test case {dependency_index}, which does not precede it"
+                    )
+            for label, dependency_index in spec.bindings:
+                if dependency_index not in spec.dependencies:
+                    raise ValueError(
+                        f"{spec.name} binds {label} to test case {dependency_index}, which is not a dependency"
+                    )
+
+    def validate(self) -> None:
+        """
+        Checks the DAG of the node specs, unique names and the argument bindings of every
+        callable, as compile does. Raises ValueError.
+        """
+        self._validate_dag()
+        for tc_node in self.instantiate():
+            tc_node.validate_bindings()
+
+    def instantiate(self) -> List[TCNode]:
+        """
+        Creates the per-run TCNodes, returned in topological order.
+        """
+        tc_nodes: List[TCNode] = []
+        graph = NodeGraph()
+        for spec in self._node_specs:
+            tc_node = TCNode(
+                spec.callable_object,
+                spec.name,
+                spec.func_parameter_label,
+                spec.description,
+                spec.resources,
+                spec.execution_mode,
+            )
+            graph.add_node(tc_node)
+            for dependency_index in spec.dependencies:
+                tc_node._link_dependency(tc_nodes[dependency_index])
+            tc_node.dependency_bindings = {
+                label: tc_nodes[dependency_index]
+                for label, dependency_index in spec.bindings
+            }
+            tc_nodes.append(tc_node)
+        return tc_nodes
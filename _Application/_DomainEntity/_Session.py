@@ -54,6 +54,13 @@ class ControlSession(Session):
     def panels(self):
         return self._panels
 
+    def panel(self, panel_id: int) -> Panel:
+        for panel in self._panels:
+            if panel.id == panel_id:
+                return panel
+        self._logger.error(f"Panel {panel_id} not found")
+        raise KeyError(f"Panel {panel_id} not found")
+
     # Creating new panel in a control session
     def add_panel(self):
         if len(self._panels) >= self._panel_limit:
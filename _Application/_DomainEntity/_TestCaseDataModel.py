@@ -1,5 +1,7 @@
 from typing import List, TYPE_CHECKING, cast, Dict, Any
 from datetime import datetime
+from util.node_id import node_id_string
+import time
 from _Application._DomainEntity._InteractionContext import InteractionContext, InteractionType
 from _Application._DomainEntity._Parameter import Parameter
 from _Application._SystemEvent import (
@@ -16,12 +18,15 @@ if TYPE_CHECKING:
 
 
 class TestExecution:
+    __slots__ = ("_execution_id", "_timestamp", "_test_duration", "_parameters", "_progress")
+
     def __init__(
         self,
         execution_id: int,
     ):
         self._execution_id: int = execution_id
-        self._timestamp: datetime = datetime.now()
+        # COMMENT: Seconds since the epoch, a datetime is only built when asked for
+        self._timestamp: float = time.time()
         self._test_duration: float = 0.0
         self._parameters: List[Parameter] = []
         self._progress: int = 0
@@ -44,7 +49,7 @@ class TestExecution:
 
     @property
     def timestamp(self) -> datetime:
-        return self._timestamp
+        return datetime.fromtimestamp(self._timestamp)
 
     @property
     def test_duration(self) -> float:
@@ -67,22 +72,33 @@ class TestExecution:
 
     @timestamp.setter
     def timestamp(self, value: datetime):
-        self._timestamp = value
+        self._timestamp = value.timestamp()
 
     def update_parameter(self, parameter: Parameter):
         self._parameters.append(parameter)
 
 
 class TestCaseDataModel:
+    __slots__ = (
+        "_test_case_name",
+        "_test_description",
+        "_tc_id",
+        "_execution",
+        "_event_bus",
+        "_parent_test_run",
+        "_state",
+    )
+
     def __init__(
         self,
-        tc_id: str,
+        tc_id: int | str,
         test_case_name: str,
         test_description: str,
     ):
         self._test_case_name: str = test_case_name
         self._test_description: str = test_description
-        self._tc_id: str = tc_id
+        # COMMENT: The integer id of the TCNode, see util.node_id
+        self._tc_id: int | str = tc_id
         self._execution: List[TestExecution] = []
         self._event_bus: "SystemEventBus" = cast("SystemEventBus", None)
         self._parent_test_run: "TestRun" = cast("TestRun", None)
@@ -92,9 +108,13 @@ class TestCaseDataModel:
     def name(self) -> str:
         return self._test_case_name
 
+    @property
+    def description(self) -> str:
+        return self._test_description
+
     @property
     def id(self) -> str:
-        return self._tc_id
+        return node_id_string(self._tc_id) if isinstance(self._tc_id, int) else self._tc_id
 
     @property
     def parent_tr_id(self) -> str:
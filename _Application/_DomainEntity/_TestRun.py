@@ -1,4 +1,5 @@
 from _Node._TestRunTerminalNode import TestRunTerminalNode
+from _Application._DomainEntity._ProfileTemplate import ProfileTemplate
 from _Application._SystemEvent import NewTestCaseEvent
 from typing import List, TYPE_CHECKING, Dict, cast
 from uuid import uuid4
@@ -9,6 +10,7 @@ if TYPE_CHECKING:
     from _Application._SystemEventBus import SystemEventBus
     from _Node._TCNode import TCNode
     from _Node._BaseNode import BaseNode
+    from _Node._NodeGraph import NodeGraph
     from trio import MemorySendChannel
 
 
@@ -40,6 +42,15 @@ class TestRun:
     def id(self) -> str:
         return self._id
 
+    @property
+    def tc_nodes(self) -> List["TCNode"]:
+        return self._tc_nodes
+
+    @property
+    def graph(self) -> "NodeGraph | None":
+        # COMMENT: The terminal node depends on every test case, so its graph holds the whole test run
+        return self._test_run_terminal_node.graph
+
     @property
     def parent_panel_id(self) -> int:
         return self._parent_panel.id
@@ -59,6 +70,9 @@ class TestRun:
         else:
             raise Exception("A test run can only have one parent panel")
 
+    def has_failed_test_case(self, tc_id: str) -> bool:
+        return tc_id in self._failed_tasks
+
     def add_to_failed_test_cases(self, tc_node: "TCNode"):
         self._failed_tasks[tc_node.id] = tc_node
         self._tc_nodes.remove(tc_node)
@@ -76,14 +90,18 @@ class TestRun:
         tc_node.ui_request_send_channel = self._ui_request_send_channel
         tc_node.event_bus = self._event_bus
         assert tc_node.event_bus is not None, "TCNode must have event bus"
-        await tc_node.check_dependency_and_schedule_self()
+        # COMMENT: Published before scheduling, the test case must be known before its first execution event
         new_test_case_event = NewTestCaseEvent(tc_node)
         await self._event_bus.publish(new_test_case_event)
+        await tc_node.check_dependency_and_schedule_self()
 
     async def load_test_case(self):
-        profile = self._test_profile()  # type: ignore
-        for tc_node in profile.test_case_list:  # type: ignore
-            await self.add_tc_node(tc_node)  # type: ignore
+        if isinstance(self._test_profile, ProfileTemplate):
+            template = self._test_profile
+        else:
+            template = ProfileTemplate.compile(self._test_profile)  # type: ignore
+        for tc_node in template.instantiate():
+            await self.add_tc_node(tc_node)
 
     async def _node_scheduling_callback(self, node: "BaseNode"):
         await self._node_executor_send_channel.send(node)
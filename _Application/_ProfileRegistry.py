@@ -0,0 +1,220 @@
+from _Application._DomainEntity._ProfileTemplate import ProfileTemplate
+from util.profile_loader import BUILTIN_PROFILES, ENTRY_POINT_GROUP, import_object
+from typing import Any, Dict, Iterable, List, NamedTuple
+import importlib.util
+import threading
+import hashlib
+import logging
+import json
+import sys
+import os
+import re
+
+# COMMENT: Part of the cache key, bumped when the cached form of a template changes
+CACHE_VERSION = 1
+
+
+class ProfileSource(NamedTuple):
+    name: str
+    # COMMENT: "module:Class" of the profile class
+    reference: str
+    # COMMENT: Only set for profiles discovered in a directory, their module is loaded from there
+    path: str | None = None
+
+
+# COMMENT: A top level class whose name ends with "Profile"
+_PROFILE_CLASS = re.compile(rb"^class\s+(\w*Profile)\b", re.MULTILINE)
+
+
+def _profile_class_name(path: str) -> str | None:
+    """
+    The first profile class of a profile file, found without importing or even parsing it.
+    """
+    with open(path, "rb") as f:
+        match = _PROFILE_CLASS.search(f.read())
+    return match.group(1).decode() if match is not None else None
+
+
+class ProfileRegistry:
+    """
+    Finds test profiles by name and hands out their compiled ProfileTemplate. Profiles come from
+    BUILTIN_PROFILES, from the ENTRY_POINT_GROUP entry points of the installed distributions and
+    from the directories: every widget.py there defining a *Profile class is a profile named
+    widget. Directories take precedence, then entry points. A name containing ":" is taken as a
+    "module:Class" reference.
+
+    Compiling a profile instantiates it and validates its DAG and the bindings of its callables.
+    This is done once: templates are kept in memory, and written to cache_directory keyed by the
+    hash of the profile's source file, so that a restart only imports the profile module to get
+    its callables back. The key does not cover the modules a profile imports, so a cached
+    template is validated again when it is read, one whose callables are gone or no longer bind
+    is compiled again. Templates may be loaded from several threads, each name is loaded once.
+    """
+
+    def __init__(
+        self,
+        directories: Iterable[str] = (),
+        cache_directory: str | None = None,
+    ) -> None:
+        self._directories = list(directories)
+        self._cache_directory = cache_directory
+        self._sources: Dict[str, ProfileSource] | None = None
+        self._templates: Dict[str, ProfileTemplate] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._compiles = 0
+        self._logger = logging.getLogger("ProfileRegistry")
+
+    def discover(self) -> Dict[str, ProfileSource]:
+        """
+        Scans the built-in profiles, entry points and directories again.
+        """
+        sources = {
+            name: ProfileSource(name, reference) for name, reference in BUILTIN_PROFILES.items()
+        }
+        # COMMENT: importlib.metadata scans the installed distributions, only done when needed
+        from importlib.metadata import entry_points
+
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            sources[entry_point.name] = ProfileSource(entry_point.name, entry_point.value)
+        for directory in self._directories:
+            for file_name in sorted(os.listdir(directory)):
+                stem, extension = os.path.splitext(file_name)
+                if extension != ".py" or stem.startswith("_"):
+                    continue
+                path = os.path.join(directory, file_name)
+                class_name = _profile_class_name(path)
+                if class_name is not None:
+                    sources[stem] = ProfileSource(stem, f"tag_profile_{stem}:{class_name}", path)
+        self._sources = sources
+        return sources
+
+    def names(self) -> List[str]:
+        if self._sources is None:
+            self.discover()
+        assert self._sources is not None
+        return sorted(self._sources)
+
+    def source(self, name: str) -> ProfileSource:
+        if self._sources is None:
+            self.discover()
+        assert self._sources is not None
+        source = self._sources.get(name)
+        if source is not None:
+            return source
+        if ":" in name:
+            return ProfileSource(name, name)
+        raise KeyError(f"Unknown test profile {name}")
+
+    def statistics(self) -> Dict[str, Any]:
+        return {
+            "memory_hits": self._memory_hits,
+            "disk_hits": self._disk_hits,
+            "compiles": self._compiles,
+        }
+
+    def cached(self, name: str) -> ProfileTemplate | None:
+        """
+        The template of name if it is already loaded, never imports anything.
+        """
+        template = self._templates.get(name)
+        if template is not None:
+            self._memory_hits += 1
+        return template
+
+    def template(self, name: str) -> ProfileTemplate:
+        """
+        Loads the template of name, from memory, from the disk cache or by compiling the profile.
+        Raises KeyError for an unknown profile, ImportError or AttributeError when it cannot be
+        imported and ValueError or TypeError when its DAG is invalid.
+        """
+        template = self.cached(name)
+        if template is not None:
+            return template
+        with self._locks_lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            # COMMENT: Loaded by another thread meanwhile
+            template = self.cached(name)
+            if template is not None:
+                return template
+            template = self._load(name)
+            self._templates[name] = template
+        return template
+
+    def _load(self, name: str) -> ProfileTemplate:
+        source = self.source(name)
+        self._import_module(source)
+        cache_path = self._cache_path(source)
+        template = self._read_cache(cache_path) if cache_path is not None else None
+        if template is not None:
+            self._disk_hits += 1
+        else:
+            template = ProfileTemplate.compile(import_object(source.reference))
+            self._compiles += 1
+            if cache_path is not None:
+                self._write_cache(cache_path, template)
+        return template
+
+    def _import_module(self, source: ProfileSource) -> None:
+        module_name = source.reference.partition(":")[0]
+        if source.path is None or module_name in sys.modules:
+            return
+        spec = importlib.util.spec_from_file_location(module_name, source.path)
+        assert spec is not None and spec.loader is not None
+        module = importlib.util.module_from_spec(spec)
+        # COMMENT: Registered before running it, like an import, so that the module's callables
+        #   can be found again from their references
+        sys.modules[module_name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[module_name]
+            raise
+
+    def _source_path(self, source: ProfileSource) -> str | None:
+        if source.path is not None:
+            return source.path
+        spec = importlib.util.find_spec(source.reference.partition(":")[0])
+        return spec.origin if spec is not None and spec.has_location else None
+
+    def _cache_path(self, source: ProfileSource) -> str | None:
+        if self._cache_directory is None:
+            return None
+        path = self._source_path(source)
+        if path is None:
+            return None
+        digest = hashlib.sha256(f"{CACHE_VERSION}:{source.reference}:".encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+        return os.path.join(self._cache_directory, f"{digest.hexdigest()}.json")
+
+    def _read_cache(self, cache_path: str) -> ProfileTemplate | None:
+        try:
+            with open(cache_path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            self._logger.warning(f"Ignoring unreadable profile cache {cache_path}: {e}")
+            return None
+        try:
+            return ProfileTemplate.from_dict(data)
+        except (ImportError, AttributeError, KeyError, TypeError, ValueError) as e:
+            self._logger.warning(f"Ignoring stale profile cache {cache_path}: {e}")
+            return None
+
+    def _write_cache(self, cache_path: str, template: ProfileTemplate) -> None:
+        try:
+            data = template.to_dict()
+        except ValueError as e:
+            self._logger.info(f"Profile {template.name} is not cached: {e}")
+            return
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        # COMMENT: Written aside and renamed, a crash never leaves a partial cache file behind
+        temporary_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(data, f)
+        os.replace(temporary_path, cache_path)
@@ -0,0 +1,544 @@
+from _Application._ResultStore import MAGIC, read_records_between
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+import numpy as np
+import logging
+import shutil
+import json
+import math
+import os
+
+# COMMENT: Value of the measurements "passed" column when the parameter reported no result
+UNKNOWN = 2
+
+
+def _replace_json(path: str, data: Any) -> None:
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w") as f:
+        json.dump(data, f)
+    os.replace(temporary_path, path)
+
+
+class ColumnTable:
+    """
+    A table stored as one raw binary file per column. Rows are only ever appended, reads go
+    through read-only memory maps, so a query touches the pages it needs and never builds Python
+    objects per row.
+    """
+
+    def __init__(self, directory: str, name: str, columns: Dict[str, Any]) -> None:
+        self._dtypes = {column: np.dtype(dtype) for column, dtype in columns.items()}
+        self._paths = {
+            column: os.path.join(directory, f"{name}.{column}.bin") for column in columns
+        }
+        lengths = []
+        for column, path in self._paths.items():
+            if not os.path.exists(path):
+                open(path, "wb").close()
+            lengths.append(os.path.getsize(path) // self._dtypes[column].itemsize)
+        # COMMENT: Row count the maps were made for, rows are appended from a worker thread
+        self._maps: Tuple[int, Dict[str, np.ndarray]] | None = None
+        # COMMENT: A crash between column writes leaves columns of different lengths, the rows
+        #   beyond the shortest column are incomplete and cut off
+        self.truncate(min(lengths))
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def truncate(self, rows: int) -> None:
+        for column, path in self._paths.items():
+            os.truncate(path, rows * self._dtypes[column].itemsize)
+        self._rows = rows
+        self._maps = None
+
+    def append(self, rows: Dict[str, Any]) -> None:
+        arrays = {
+            column: np.asarray(rows[column], dtype=dtype)
+            for column, dtype in self._dtypes.items()
+        }
+        count = len(next(iter(arrays.values())))
+        if count == 0:
+            return
+        for column, array in arrays.items():
+            with open(self._paths[column], "ab") as f:
+                f.write(array.tobytes())
+        self._rows += count
+        self._maps = None
+
+    def column(self, column: str) -> np.ndarray:
+        rows = self._rows
+        if rows == 0:
+            return np.empty(0, dtype=self._dtypes[column])
+        if self._maps is None or self._maps[0] != rows:
+            self._maps = (
+                rows,
+                {
+                    c: np.memmap(path, dtype=self._dtypes[c], mode="r", shape=(rows,))
+                    for c, path in self._paths.items()
+                },
+            )
+        return self._maps[1][column]
+
+
+class _OpenTestCase:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.timestamp = math.nan
+        self.attempts = 0
+        # COMMENT: Whether its last execution failed, the executions before the last one failed
+        #   anyway
+        self.failed = False
+        # COMMENT: (timestamp, parameter name, value dict)
+        self.parameters: List[Tuple[float, str, Dict[str, Any]]] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "timestamp": self.timestamp,
+            "attempts": self.attempts,
+            "failed": self.failed,
+            "parameters": list(self.parameters),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "_OpenTestCase":
+        test_case = cls(data["name"])
+        test_case.timestamp = data["timestamp"]
+        test_case.attempts = data["attempts"]
+        test_case.failed = data.get("failed", False)
+        test_case.parameters = [tuple(parameter) for parameter in data["parameters"]]
+        return test_case
+
+
+class ResultIndex:
+    """
+    Columnar index of historical results, fed with the records of the ResultStore.
+
+    Two tables: units holds one row per test case per finished test run (timestamp of its first
+    execution, test case, number of executions, whether it failed in the end) and measurements
+    one row per parameter (timestamp, test case, parameter, measured value, passed). Test case
+    and parameter names are stored as codes into names.json. A test case passed first time when
+    it was executed once and did not fail, every further execution follows a failure. Records of
+    a test run are held in memory until its test_run_end record, the index only contains
+    finished test runs. At most max_open_runs test runs are held, beyond that the oldest is
+    closed as it is.
+
+    Rows of finished test runs are not written by ingest: take_writes hands them out, with
+    state.json, as a function that writes them, which the ResultStore runs in its flush thread
+    after the records they come from are fsynced. Queries see the rows written so far.
+
+    state.json tracks records ingested with the log offset of their end: the offset the index
+    covers, its row counts and the test runs still open at that point, so that opening the index
+    again picks up exactly where it stopped, see open.
+    """
+
+    def __init__(self, directory: str, max_open_runs: int = 256) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._names_path = os.path.join(directory, "names.json")
+        self._names: List[str] = []
+        if os.path.exists(self._names_path):
+            with open(self._names_path) as f:
+                self._names = json.load(f)
+        self._codes = {name: code for code, name in enumerate(self._names)}
+        self._units = ColumnTable(
+            directory,
+            "units",
+            {"timestamp": "<f8", "test_case": "<u4", "attempts": "<u2", "failed": "<u1"},
+        )
+        self._measurements = ColumnTable(
+            directory,
+            "measurements",
+            {
+                "timestamp": "<f8",
+                "test_case": "<u4",
+                "parameter": "<u4",
+                "value": "<f8",
+                "passed": "<u1",
+            },
+        )
+        # COMMENT: tr_id -> tc_id -> test case of a test run that has not finished yet
+        self._open_runs: Dict[str, Dict[str, _OpenTestCase]] = {}
+        self._run_of: Dict[str, str] = {}
+        self._max_open_runs = max_open_runs
+        # COMMENT: Rows of finished test runs not handed to take_writes yet, and the row counts
+        #   and name count once they are written
+        self._unwritten: List[Tuple[Dict[str, List[Any]], Dict[str, List[Any]]]] = []
+        self._unit_count = len(self._units)
+        self._measurement_count = len(self._measurements)
+        self._written_names = len(self._names)
+        # COMMENT: Log offset of the end of the last record ingested, None when the records came
+        #   without offsets
+        self._log_offset: int | None = None
+        self._state_path = os.path.join(directory, "state.json")
+        self._logger = logging.getLogger("ResultIndex")
+        if os.path.exists(self._state_path):
+            self._load_state()
+
+    @classmethod
+    def rebuild(
+        cls, directory: str, log_path: str, log_length: int | None = None
+    ) -> "ResultIndex":
+        """
+        Builds the index of a result log, of its first log_length bytes when given, into an empty
+        directory.
+        """
+        index = cls(directory)
+        if len(index._units) or len(index._measurements) or index._log_offset is not None:
+            raise ValueError(f"{directory} already holds an index")
+        index._log_offset = len(MAGIC)
+        if os.path.exists(log_path):
+            if log_length is None:
+                log_length = os.path.getsize(log_path)
+            index.catch_up(log_path, log_length)
+        index.close_open_runs()
+        return index
+
+    @classmethod
+    def open(cls, directory: str, log_path: str, log_length: int) -> "ResultIndex":
+        """
+        Opens the index of a result log whose valid records end at log_length, and ingests the
+        records of the log past the offset it covers. An index that covers more than the log
+        holds, does not know what it covers or cannot be read is built again. Test runs still
+        open at the end of the log were cut off by a crash and are closed as they are.
+        """
+        if os.path.isdir(directory):
+            index: ResultIndex | None = None
+            try:
+                index = cls(directory)
+            except (OSError, KeyError, TypeError, ValueError) as e:
+                logging.getLogger("ResultIndex").warning(f"Unreadable index {directory}: {e}")
+            if index is not None and index._log_offset is not None:
+                if index._log_offset <= log_length:
+                    index.catch_up(log_path, log_length)
+                    index.close_open_runs()
+                    return index
+            logging.getLogger("ResultIndex").warning(
+                f"Index {directory} does not match {log_path}, rebuilding it"
+            )
+            shutil.rmtree(directory)
+        return cls.rebuild(directory, log_path, log_length)
+
+    @property
+    def log_offset(self) -> int | None:
+        return self._log_offset
+
+    def catch_up(self, log_path: str, log_length: int) -> None:
+        """
+        Ingests the records of the log from the offset the index covers up to log_length, and
+        writes them.
+        """
+        assert self._log_offset is not None
+        # COMMENT: The state is saved once at the end, a crash meanwhile cuts the rows written
+        #   since the last save and catches up from there again
+        for record, log_offset in read_records_between(log_path, self._log_offset, log_length):
+            self.ingest(record, log_offset)
+        self.write()
+
+    def close_open_runs(self) -> None:
+        """
+        Closes and writes all test runs that are still open.
+        """
+        for tr_id in list(self._open_runs):
+            self._close_run(tr_id)
+        self.write()
+
+    def _load_state(self) -> None:
+        with open(self._state_path) as f:
+            state = json.load(f)
+        # COMMENT: Rows beyond the saved counts were written by a crash before the state was
+        #   saved, their test runs are still open in the state and are written again
+        if state["units"] > len(self._units) or state["measurements"] > len(self._measurements):
+            raise ValueError(f"Rows of {self._directory} are missing")
+        self._units.truncate(state["units"])
+        self._measurements.truncate(state["measurements"])
+        self._unit_count = state["units"]
+        self._measurement_count = state["measurements"]
+        self._log_offset = state["log_offset"]
+        for tr_id, test_cases in state["open_runs"].items():
+            self._open_runs[tr_id] = {
+                tc_id: _OpenTestCase.from_dict(test_case) for tc_id, test_case in test_cases.items()
+            }
+            for tc_id in test_cases:
+                self._run_of[tc_id] = tr_id
+
+    def take_writes(self) -> Callable[[], None] | None:
+        """
+        Takes the rows of the test runs finished since the last call, with the names and the
+        state they need, as a function that writes them. Called where the records are ingested,
+        the function may be run in another thread. None when no test run was finished.
+        """
+        if not self._unwritten:
+            return None
+        rows, self._unwritten = self._unwritten, []
+        names = list(self._names) if len(self._names) > self._written_names else None
+        self._written_names = len(self._names)
+        state = self._state()
+        return lambda: self._write_rows(rows, names, state)
+
+    def write(self) -> None:
+        """
+        Writes the rows of the finished test runs and the state right away.
+        """
+        writes = self.take_writes()
+        if writes is not None:
+            writes()
+        else:
+            _replace_json(self._state_path, self._state())
+
+    def _state(self) -> Dict[str, Any]:
+        return {
+            "log_offset": self._log_offset,
+            "units": self._unit_count,
+            "measurements": self._measurement_count,
+            "open_runs": {
+                tr_id: {tc_id: test_case.to_dict() for tc_id, test_case in test_cases.items()}
+                for tr_id, test_cases in self._open_runs.items()
+            },
+        }
+
+    def _write_rows(
+        self,
+        rows: List[Tuple[Dict[str, List[Any]], Dict[str, List[Any]]]],
+        names: List[str] | None,
+        state: Dict[str, Any],
+    ) -> None:
+        # COMMENT: Names are written before the rows that use the new codes, the state after the
+        #   rows it counts, both replaced atomically
+        if names is not None:
+            _replace_json(self._names_path, names)
+        for table, i in ((self._units, 0), (self._measurements, 1)):
+            table.append(
+                {
+                    column: [value for run in rows for value in run[i][column]]
+                    for column in rows[0][i]
+                }
+            )
+        _replace_json(self._state_path, state)
+
+    @property
+    def units(self) -> ColumnTable:
+        return self._units
+
+    @property
+    def measurements(self) -> ColumnTable:
+        return self._measurements
+
+    def _code(self, name: str) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            code = len(self._names)
+            self._names.append(name)
+            self._codes[name] = code
+        return code
+
+    def ingest_all(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.ingest(record)
+        self.write()
+
+    def ingest(self, record: Dict[str, Any], log_offset: int | None = None) -> None:
+        """
+        Ingests a record, log_offset is the offset of its end in the result log.
+        """
+        if log_offset is not None:
+            self._log_offset = log_offset
+        kind = record["kind"]
+        if kind == "test_case":
+            tr_id = record["tr_id"]
+            if tr_id not in self._open_runs and len(self._open_runs) >= self._max_open_runs:
+                oldest = next(iter(self._open_runs))
+                self._logger.warning(f"Closing test run {oldest}, it did not end")
+                self._close_run(oldest)
+            test_cases = self._open_runs.setdefault(tr_id, {})
+            # COMMENT: A retested test case is added again, its executions so far still count
+            if record["tc_id"] not in test_cases:
+                test_cases[record["tc_id"]] = _OpenTestCase(record["name"])
+            self._run_of[record["tc_id"]] = tr_id
+            return
+        if kind == "test_run_end":
+            self._close_run(record["tr_id"])
+            return
+        tr_id = self._run_of.get(record["tc_id"])
+        if tr_id is None:
+            return
+        test_case = self._open_runs[tr_id][record["tc_id"]]
+        if kind == "execution":
+            test_case.attempts += 1
+            test_case.timestamp = record["timestamp"]
+            test_case.failed = False
+        elif kind == "test_case_fail":
+            test_case.failed = True
+        elif kind == "parameter":
+            test_case.parameters.append((test_case.timestamp, record["name"], record["value"]))
+
+    def _close_run(self, tr_id: str) -> None:
+        test_cases = self._open_runs.pop(tr_id, {})
+        units: Dict[str, List[Any]] = {
+            "timestamp": [], "test_case": [], "attempts": [], "failed": []
+        }
+        measurements: Dict[str, List[Any]] = {
+            "timestamp": [], "test_case": [], "parameter": [], "value": [], "passed": []
+        }
+        for tc_id, test_case in test_cases.items():
+            self._run_of.pop(tc_id, None)
+            if test_case.attempts == 0:
+                continue
+            test_case_code = self._code(test_case.name)
+            units["timestamp"].append(test_case.timestamp)
+            units["test_case"].append(test_case_code)
+            units["attempts"].append(test_case.attempts)
+            units["failed"].append(int(test_case.failed))
+            for timestamp, parameter, value in test_case.parameters:
+                measurements["timestamp"].append(timestamp)
+                measurements["test_case"].append(test_case_code)
+                measurements["parameter"].append(self._code(parameter))
+                measurements["value"].append(_as_float(value.get("measured")))
+                result = value.get("result")
+                measurements["passed"].append(UNKNOWN if result is None else int(bool(result)))
+        self._unwritten.append((units, measurements))
+        self._unit_count += len(units["timestamp"])
+        self._measurement_count += len(measurements["timestamp"])
+
+    def _rows(
+        self,
+        table: ColumnTable,
+        test_case: str | None = None,
+        parameter: str | None = None,
+        last: int | None = None,
+        since: float | None = None,
+    ) -> np.ndarray | slice:
+        # COMMENT: Rows may be appended meanwhile, all columns are cut to the same length
+        count = len(table)
+        mask: np.ndarray | None = None
+        if test_case is not None:
+            code = self._codes.get(test_case)
+            if code is None:
+                return slice(0, 0)
+            mask = table.column("test_case")[:count] == code
+        if parameter is not None:
+            code = self._codes.get(parameter)
+            if code is None:
+                return slice(0, 0)
+            parameter_mask = table.column("parameter")[:count] == code
+            mask = parameter_mask if mask is None else mask & parameter_mask
+        if since is not None:
+            since_mask = table.column("timestamp")[:count] >= since
+            mask = since_mask if mask is None else mask & since_mask
+        if mask is None:
+            return slice(max(count - last, 0) if last else 0, count)
+        rows = np.flatnonzero(mask)
+        return rows[-last:] if last else rows
+
+    def yield_(
+        self, test_case: str | None = None, last: int | None = None, since: float | None = None
+    ) -> Dict[str, Any]:
+        """
+        First pass yield of a test case, or of all test cases, over the last units.
+        """
+        rows = self._rows(self._units, test_case, last=last, since=since)
+        attempts = self._units.column("attempts")[rows]
+        failed = self._units.column("failed")[rows]
+        units = int(attempts.size)
+        first_pass = int(np.count_nonzero((attempts == 1) & (failed == 0)))
+        return {
+            "units": units,
+            "first_pass": first_pass,
+            "failures": int(attempts.sum(dtype=np.int64)) - units + int(failed.sum(dtype=np.int64)),
+            "yield": first_pass / units if units else None,
+        }
+
+    def cpk(
+        self,
+        test_case: str,
+        parameter: str,
+        lsl: float | None = None,
+        usl: float | None = None,
+        last: int | None = None,
+        since: float | None = None,
+    ) -> Dict[str, Any]:
+        """
+        Process capability of a measured parameter against its specification limits, one sided
+        when only one limit is given.
+        """
+        if lsl is None and usl is None:
+            raise ValueError("Cpk needs at least one specification limit")
+        rows = self._rows(self._measurements, test_case, parameter, last, since)
+        values = self._measurements.column("value")[rows]
+        values = values[np.isfinite(values)]
+        n = int(values.size)
+        if n < 2:
+            return {"n": n, "mean": None, "std": None, "cpk": None}
+        mean = float(values.mean())
+        std = float(values.std(ddof=1))
+        margins = []
+        if usl is not None:
+            margins.append(usl - mean)
+        if lsl is not None:
+            margins.append(mean - lsl)
+        cpk = min(margins) / (3 * std) if std > 0 else None
+        return {"n": n, "mean": mean, "std": std, "cpk": cpk}
+
+    def failure_pareto(
+        self,
+        by: str = "test_case",
+        last: int | None = None,
+        since: float | None = None,
+        top: int = 10,
+    ) -> List[Dict[str, Any]]:
+        """
+        Failure counts, largest first: failed executions per test case, or failed measurements
+        per test case and parameter.
+        """
+        if by == "test_case":
+            rows = self._rows(self._units, last=last, since=since)
+            codes = self._units.column("test_case")[rows]
+            failures = (
+                self._units.column("attempts")[rows].astype(np.int64)
+                - 1
+                + self._units.column("failed")[rows]
+            )
+            counts = np.bincount(codes, weights=failures, minlength=len(self._names))
+            order = np.argsort(counts, kind="stable")[::-1][:top]
+            return [
+                {"test_case": self._names[code], "failures": int(counts[code])}
+                for code in order
+                if counts[code] > 0
+            ]
+        if by == "parameter":
+            rows = self._rows(self._measurements, last=last, since=since)
+            failed = self._measurements.column("passed")[rows] == 0
+            pairs = (
+                self._measurements.column("test_case")[rows][failed].astype(np.int64)
+                * len(self._names)
+                + self._measurements.column("parameter")[rows][failed]
+            )
+            keys, counts = np.unique(pairs, return_counts=True)
+            order = np.argsort(counts, kind="stable")[::-1][:top]
+            return [
+                {
+                    "test_case": self._names[int(keys[i]) // len(self._names)],
+                    "parameter": self._names[int(keys[i]) % len(self._names)],
+                    "failures": int(counts[i]),
+                }
+                for i in order
+            ]
+        raise ValueError(f"Unknown pareto grouping {by}")
+
+    def query(self, name: str, args: Dict[str, Any]) -> Any:
+        """
+        Entry point of the websocket "query" message.
+        """
+        if name == "yield":
+            return self.yield_(**args)
+        if name == "cpk":
+            return self.cpk(**args)
+        if name == "pareto":
+            return self.failure_pareto(**args)
+        raise ValueError(f"Unknown query {name}")
+
+
+def _as_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
@@ -0,0 +1,360 @@
+from _Application._SystemEvent import (
+    BaseEvent,
+    NewTestCaseEvent,
+    NewTestExecutionEvent,
+    ParameterUpdateEvent,
+    TestCaseFailEvent,
+    TestRunTerminationEvent,
+)
+from _Application._SystemEventBus import SystemEventBus
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Tuple, TYPE_CHECKING
+import logging
+import struct
+import json
+import time
+import zlib
+import os
+import trio
+
+if TYPE_CHECKING:
+    from _Application._ResultIndex import ResultIndex
+
+MAGIC = b"TAGRLOG1"
+# COMMENT: Payload length and CRC32 of the payload
+_RECORD_HEADER = struct.Struct(">II")
+
+
+def encode_record(record: Dict[str, Any]) -> bytes:
+    payload = json.dumps(record, separators=(",", ":"), default=str).encode()
+    return _RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _payloads(data: bytes, offset: int) -> Iterator[Tuple[bytes, int]]:
+    """
+    The payloads of the records of data from offset on, each with the offset of its end. Stops at
+    the first truncated or corrupt record.
+    """
+    while offset + _RECORD_HEADER.size <= len(data):
+        length, crc = _RECORD_HEADER.unpack_from(data, offset)
+        start = offset + _RECORD_HEADER.size
+        payload = data[start : start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            return
+        offset = start + length
+        yield payload, offset
+
+
+def _scan(data: bytes, decode: bool = True) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Decodes the records of a result log, returns them with the length of the valid prefix.
+    Without decode only the CRCs are checked and no records are returned, which is all opening
+    the store needs.
+    """
+    if not data.startswith(MAGIC):
+        raise ValueError("Not a result log")
+    records: List[Dict[str, Any]] = []
+    offset = len(MAGIC)
+    for payload, offset in _payloads(data, offset):
+        if decode:
+            records.append(json.loads(payload))
+    return records, offset
+
+
+def _valid_length(f: BinaryIO, start: int, size: int) -> int:
+    """
+    The end of the last valid record of an open result log, checked record by record from the
+    record boundary start, so that only one record is held in memory at a time.
+    """
+    f.seek(start)
+    offset = start
+    while offset + _RECORD_HEADER.size <= size:
+        length, crc = _RECORD_HEADER.unpack(f.read(_RECORD_HEADER.size))
+        if offset + _RECORD_HEADER.size + length > size:
+            break
+        if zlib.crc32(f.read(length)) != crc:
+            break
+        offset += _RECORD_HEADER.size + length
+    return offset
+
+
+def read_records(path: str, length: int | None = None) -> Iterator[Dict[str, Any]]:
+    """
+    The records of a result log, of its first length bytes when given.
+    """
+    with open(path, "rb") as f:
+        records, _ = _scan(f.read(length))
+    return iter(records)
+
+
+def read_records_between(
+    path: str, start: int, end: int
+) -> Iterator[Tuple[Dict[str, Any], int]]:
+    """
+    The records of a result log from the offset start, a record boundary, up to the offset end,
+    each with the offset of its end in the log.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not a result log")
+        f.seek(start)
+        data = f.read(max(end - start, 0))
+    return ((json.loads(payload), start + offset) for payload, offset in _payloads(data, 0))
+
+
+class ResultStore:
+    """
+    Persists test results to an append-only binary log as they happen, so they survive a crash
+    and do not have to be kept in memory once a test run is finished.
+
+    The log starts with MAGIC, then one record per event: payload length, CRC32 and the payload,
+    compact JSON with a "kind" of test_case, execution, parameter, test_case_fail or test_run_end.
+    test_case records carry the test run, panel and session of a test case, the other records
+    only refer to it by tc_id. Records are buffered and written, then fsynced, in batches: every
+    flush_interval or as soon as flush_records are waiting. A crash loses at most the last batch,
+    a torn record at the end of the log is truncated when the store is opened again.
+
+    Nothing is read at construction. start() opens the log in a worker thread (or the first
+    write, without start), checking only the records after the checkpoint: a side file holding
+    the length of the log after the last fsync.
+
+    With an index_opener, the index is opened (or rebuilt) in a worker thread when the store
+    starts instead of at construction, while records are already written. The opener is called
+    with the length of the log when the store was opened and reads no further, the records
+    appended since are replayed into the index once open, so none is ingested twice. The index
+    is given the log offset of the end of every record, see ResultIndex.open, and writes its rows
+    in the flush thread, after the records they come from.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 0.5,
+        flush_records: int = 256,
+        index: "ResultIndex | None" = None,
+        index_opener: "Callable[[int], ResultIndex] | None" = None,
+    ) -> None:
+        self._path = path
+        self._flush_interval = flush_interval
+        self._flush_records = flush_records
+        self._pending: List[bytes] = []
+        self._flush_needed = trio.Event()
+        self._checkpoint_path = path + ".checkpoint"
+        # COMMENT: Fed with every record as it is appended, see ResultIndex
+        self._index = index
+        self._index_opener = index_opener
+        # COMMENT: Records appended before the log is open and the index attached, with the
+        #   number of bytes appended up to their end
+        self._index_backlog: List[Tuple[Dict[str, Any], int]] | None = (
+            [] if index is not None or index_opener is not None else None
+        )
+        self._index_opened = trio.Event()
+        self._written = 0
+        self._flushes = 0
+        self._logger = logging.getLogger("ResultStore")
+        self._file: BinaryIO | None = None
+        # COMMENT: Length of the valid log when opened, and of the log written so far
+        self._opened_length = len(MAGIC)
+        self._durable_length = len(MAGIC)
+        self._appended = 0
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def index(self) -> "ResultIndex | None":
+        return self._index
+
+    async def wait_index(self) -> "ResultIndex | None":
+        """
+        Waits for the index_opener to be done, returns None when opening failed.
+        """
+        if self._index_opener is not None:
+            await self._index_opened.wait()
+        return self._index
+
+    async def _open_index(self) -> None:
+        assert self._index_opener is not None and self._index_backlog is not None
+        try:
+            index = await trio.to_thread.run_sync(self._index_opener, self._opened_length)
+            self._attach_index(index)
+        except Exception as e:
+            self._logger.error(f"Result index unavailable: {e}")
+        finally:
+            self._index_backlog = None
+            self._index_opened.set()
+
+    def _attach_index(self, index: "ResultIndex") -> None:
+        assert self._index_backlog is not None
+        for record, appended in self._index_backlog:
+            index.ingest(record, self._opened_length + appended)
+        self._index = index
+        self._index_backlog = None
+
+    def open(self) -> None:
+        """
+        Opens the log and attaches the index given at construction. Done by start, only needed
+        to write without it.
+        """
+        if self._file is None:
+            self._open_file()
+        if self._index is not None and self._index_backlog is not None:
+            self._attach_index(self._index)
+
+    def _checkpoint(self, size: int) -> int:
+        try:
+            with open(self._checkpoint_path) as f:
+                checkpoint = int(f.read())
+        except (OSError, ValueError):
+            return len(MAGIC)
+        # COMMENT: A checkpoint beyond the end belongs to another log
+        return checkpoint if len(MAGIC) <= checkpoint <= size else len(MAGIC)
+
+    def _write_checkpoint(self) -> None:
+        temporary_path = self._checkpoint_path + ".tmp"
+        with open(temporary_path, "w") as f:
+            f.write(str(self._durable_length))
+        os.replace(temporary_path, self._checkpoint_path)
+
+    def _open_file(self) -> None:
+        size = os.path.getsize(self._path) if os.path.exists(self._path) else 0
+        if size > 0:
+            with open(self._path, "rb") as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(f"{self._path} is not a result log")
+                valid_length = _valid_length(f, self._checkpoint(size), size)
+            if valid_length < size:
+                self._logger.warning(
+                    f"Truncating torn tail of {self._path} after {valid_length} bytes"
+                )
+                os.truncate(self._path, valid_length)
+            self._file = open(self._path, "ab")
+        else:
+            self._file = open(self._path, "wb")
+            self._file.write(MAGIC)
+            self._file.flush()
+            valid_length = len(MAGIC)
+        self._opened_length = self._durable_length = valid_length
+
+    def subscribe(self, event_bus: SystemEventBus) -> None:
+        event_bus.subscribe(self._on_new_test_case, NewTestCaseEvent)
+        event_bus.subscribe(self._on_new_test_execution, NewTestExecutionEvent)
+        event_bus.subscribe(self._on_parameter_update, ParameterUpdateEvent)
+        event_bus.subscribe(self._on_test_case_fail, TestCaseFailEvent)
+        event_bus.subscribe(self._on_test_run_termination, TestRunTerminationEvent)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        data = encode_record(record)
+        self._pending.append(data)
+        self._appended += len(data)
+        if self._index_backlog is not None:
+            self._index_backlog.append((record, self._appended))
+        elif self._index is not None:
+            self._index.ingest(record, self._opened_length + self._appended)
+        if len(self._pending) >= self._flush_records:
+            self._flush_needed.set()
+
+    def statistics(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "written": self._written,
+            "flushes": self._flushes,
+        }
+
+    async def _on_new_test_case(self, event: BaseEvent):
+        tc_node = event.payload
+        data_model = tc_node.data_model
+        self.append(
+            {
+                "kind": "test_case",
+                "tc_id": tc_node.id,
+                "name": tc_node.name,
+                "tr_id": data_model.parent_tr_id,
+                "panel_id": data_model.parent_panel_id,
+                "session_id": data_model.parent_session_id,
+            }
+        )
+
+    async def _on_new_test_execution(self, event: BaseEvent):
+        self.append(
+            {
+                "kind": "execution",
+                "tc_id": event.payload["tc_id"],
+                "execution_id": event.payload["execution_id"],
+                "timestamp": time.time(),
+            }
+        )
+
+    async def _on_parameter_update(self, event: BaseEvent):
+        for name, parameter in event.payload["parameter"].items():
+            self.append(
+                {
+                    "kind": "parameter",
+                    "tc_id": event.payload["tc_id"],
+                    "execution_id": event.payload["execution_id"],
+                    "name": name,
+                    "value": parameter,
+                }
+            )
+
+    async def _on_test_case_fail(self, event: BaseEvent):
+        self.append({"kind": "test_case_fail", "tc_id": event.payload["tc_id"]})
+
+    async def _on_test_run_termination(self, event: BaseEvent):
+        self.append(
+            {"kind": "test_run_end", "tr_id": event.payload["tr_id"], "timestamp": time.time()}
+        )
+        # COMMENT: The end of a test run is written right away, its results are final
+        self._flush_needed.set()
+
+    def _write(
+        self, chunks: List[bytes], index_writes: Callable[[], None] | None = None
+    ) -> None:
+        if self._file is None:
+            self.open()
+        assert self._file is not None
+        if chunks:
+            data = b"".join(chunks)
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._durable_length += len(data)
+            self._write_checkpoint()
+        # COMMENT: The index never covers records that are not durable yet
+        if index_writes is not None:
+            index_writes()
+
+    def _take_writes(self) -> Tuple[List[bytes], Callable[[], None] | None]:
+        chunks, self._pending = self._pending, []
+        if self._index is None or self._index_backlog is not None:
+            return chunks, None
+        return chunks, self._index.take_writes()
+
+    async def flush(self) -> None:
+        chunks, index_writes = self._take_writes()
+        if not chunks and index_writes is None:
+            return
+        await trio.to_thread.run_sync(self._write, chunks, index_writes)
+        self._written += len(chunks)
+        self._flushes += 1
+
+    async def start(self) -> None:
+        try:
+            if self._file is None:
+                await trio.to_thread.run_sync(self._open_file)
+            self.open()
+            async with trio.open_nursery() as nursery:
+                if self._index_backlog is not None:
+                    nursery.start_soon(self._open_index)
+                while True:
+                    with trio.move_on_after(self._flush_interval):
+                        await self._flush_needed.wait()
+                    self._flush_needed = trio.Event()
+                    await self.flush()
+        finally:
+            # COMMENT: Cancelled on shutdown, whatever is still buffered is written synchronously
+            if self._file is not None:
+                chunks, index_writes = self._take_writes()
+                self._write(chunks, index_writes)
+                self._written += len(chunks)
+                self._file.close()
@@ -1,5 +1,5 @@
 from abc import ABC
-from typing import TYPE_CHECKING
+from typing import Hashable, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from _Node._TCNode import TCNode
@@ -14,6 +14,13 @@ class BaseEvent(ABC):
     def payload(self):
         return self._payload
 
+    @property
+    def coalesce_key(self) -> Hashable | None:
+        """
+        Events with the same key supersede each other while queued on a batched SystemEventBus.
+        """
+        return None
+
 
 class NewTestCaseEvent(BaseEvent):
     def __init__(self, payload: "TCNode"):  
@@ -34,6 +41,11 @@ class ProgressUpdateEvent(BaseEvent):
     def __init__(self, payload: "TestCaseDataModel"):
         super().__init__(payload)
 
+    @property
+    def coalesce_key(self) -> Hashable | None:
+        # COMMENT: The payload is the live data model, only the latest progress is ever sent
+        return ("progress", self._payload.id)
+
 class TestCaseFailEvent(BaseEvent):
     def __init__(self, payload):  # type: ignore
         super().__init__(payload)   
@@ -1,17 +1,187 @@
 from _Application._SystemEvent import BaseEvent
-from typing import Callable, List, Coroutine, Any
+from typing import Callable, Dict, Hashable, List, Coroutine, Any, Tuple, Type
+from collections import OrderedDict
+import itertools
+import logging
+import trio
+
+
+Listener = Callable[[BaseEvent], Coroutine[Any, Any, None]]
+
+
+class _SubscriberQueue:
+    """
+    Events waiting for one subscriber. A queued event with a coalesce_key is replaced by a newer
+    one with the same key, a new event that finds the queue full is dropped.
+    """
+
+    def __init__(self, size: int) -> None:
+        self._size = size
+        self._events: "OrderedDict[Hashable, Tuple[BaseEvent, List[Listener]]]" = OrderedDict()
+        self._unique_keys = itertools.count()
+        self._ready = trio.Event()
+        self.coalesced = 0
+        self.dropped = 0
+
+    def put(self, event: BaseEvent, listeners: List[Listener]) -> bool:
+        key = event.coalesce_key
+        if key is not None and key in self._events:
+            self._events.move_to_end(key)
+            self.coalesced += 1
+        elif len(self._events) >= self._size:
+            self.dropped += 1
+            return False
+        if key is None:
+            key = next(self._unique_keys)
+        self._events[key] = (event, listeners)
+        self._ready.set()
+        return True
+
+    async def get(self) -> Tuple[BaseEvent, List[Listener]]:
+        while not self._events:
+            await self._ready.wait()
+            self._ready = trio.Event()
+        return self._events.popitem(last=False)[1]
 
 
 class SystemEventBus:
-    def __init__(self):
-        self._listeners: List[Callable[[BaseEvent], Coroutine[Any, Any, None]]] = []
+    """
+    Listeners subscribe to an event class and receive the events of that class and its
+    subclasses, by default BaseEvent, i.e. every event.
+
+    Without a batch_window, publish awaits every listener in turn. With a batch_window, publish
+    queues the event, replacing a queued one with the same coalesce_key, and start() dispatches
+    the queue once per window. Each subscriber, the object its listeners are bound to, has its
+    own task and queue of at most subscriber_queue_size events, so it gets the events in
+    publishing order without holding up the others. The dispatch never waits on a subscriber:
+    a lagging one has its queued events coalesced, then new ones dropped and counted. publish
+    waits while max_pending events are queued.
+    """
+
+    def __init__(
+        self,
+        batch_window: float | None = None,
+        subscriber_queue_size: int = 1000,
+        max_pending: int = 10000,
+    ):
+        self._listeners: Dict[Type[BaseEvent], List[Listener]] = {}
+        # COMMENT: type(event) -> listeners to call, cleared whenever a listener subscribes
+        self._dispatch_table: Dict[type, List[Listener]] = {}
+        # COMMENT: type(event) -> (subscriber, its listeners) pairs, cleared along with the above
+        self._subscriber_table: Dict[type, List[Tuple[Hashable, List[Listener]]]] = {}
+        self._batch_window = batch_window
+        self._subscriber_queue_size = subscriber_queue_size
+        self._max_pending = max_pending
+        # COMMENT: Dicts keep insertion order, events without a coalesce_key get a unique key
+        self._pending: Dict[Hashable, BaseEvent] = {}
+        self._unique_keys = itertools.count()
+        self._pending_event = trio.Event()
+        # COMMENT: Set whenever the pending events are taken, wakes up the publishers waiting on room
+        self._room_event = trio.Event()
+        self._subscriber_queues: Dict[Hashable, _SubscriberQueue] = {}
+        self._published = 0
+        self._coalesced = 0
+        self._dispatched = 0
+        self._max_queue_depth = 0
+        self._logger = logging.getLogger("SystemEventBus")
+
+    @property
+    def batch_window(self) -> float | None:
+        return self._batch_window
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
 
     def subscribe(
-        self, listener: Callable[[BaseEvent], Coroutine[Any, Any, None]]
+        self, listener: Listener, event_type: Type[BaseEvent] = BaseEvent
     ):
-        self._listeners.append(listener)
-        
+        self._listeners.setdefault(event_type, []).append(listener)
+        self._dispatch_table.clear()
+        self._subscriber_table.clear()
+
+    def listeners_for(self, event_type: type) -> List[Listener]:
+        listeners = self._dispatch_table.get(event_type)
+        if listeners is None:
+            listeners = []
+            for cls in event_type.__mro__:
+                for listener in self._listeners.get(cls, ()):
+                    if listener not in listeners:
+                        listeners.append(listener)
+            self._dispatch_table[event_type] = listeners
+        return listeners
+
+    def _subscribers_for(self, event_type: type) -> List[Tuple[Hashable, List[Listener]]]:
+        subscribers = self._subscriber_table.get(event_type)
+        if subscribers is None:
+            grouped: Dict[Hashable, List[Listener]] = {}
+            for listener in self.listeners_for(event_type):
+                grouped.setdefault(getattr(listener, "__self__", listener), []).append(listener)
+            subscribers = self._subscriber_table[event_type] = list(grouped.items())
+        return subscribers
 
     async def publish(self, event: BaseEvent):
-        for listener in self._listeners:
-            await listener(event)
+        if self._batch_window is None:
+            for listener in self.listeners_for(type(event)):
+                await listener(event)
+            return
+        while len(self._pending) >= self._max_pending:
+            await self._room_event.wait()
+        self._published += 1
+        key = event.coalesce_key
+        if key is None:
+            key = next(self._unique_keys)
+        elif self._pending.pop(key, None) is not None:
+            self._coalesced += 1
+        self._pending[key] = event
+        self._max_queue_depth = max(self._max_queue_depth, len(self._pending))
+        self._pending_event.set()
+
+    async def start(self):
+        if self._batch_window is None:
+            return
+        async with trio.open_nursery() as nursery:
+            while True:
+                await self._pending_event.wait()
+                await trio.sleep(self._batch_window)
+                batch = list(self._pending.values())
+                self._pending = {}
+                self._pending_event = trio.Event()
+                self._room_event.set()
+                self._room_event = trio.Event()
+                for event in batch:
+                    for subscriber, listeners in self._subscribers_for(type(event)):
+                        queue = self._subscriber_queues.get(subscriber)
+                        if queue is None:
+                            queue = _SubscriberQueue(self._subscriber_queue_size)
+                            self._subscriber_queues[subscriber] = queue
+                            nursery.start_soon(self._serve_subscriber, queue)
+                        if not queue.put(event, listeners) and queue.dropped == 1:
+                            self._logger.warning(
+                                f"{subscriber!r} lags {self._subscriber_queue_size} events "
+                                "behind, events for it are dropped"
+                            )
+                self._dispatched += len(batch)
+
+    async def _serve_subscriber(self, queue: _SubscriberQueue):
+        while True:
+            event, listeners = await queue.get()
+            for listener in listeners:
+                try:
+                    await listener(event)
+                except Exception as e:
+                    # COMMENT: The publisher is gone, a failing listener must not stop the bus
+                    self._logger.error(
+                        f"Listener failed on {type(event).__name__}: {e}", exc_info=True
+                    )
+
+    def statistics(self) -> Dict[str, int]:
+        return {
+            "queue_depth": len(self._pending),
+            "max_queue_depth": self._max_queue_depth,
+            "published": self._published,
+            "coalesced": self._coalesced,
+            "dispatched": self._dispatched,
+            "subscriber_coalesced": sum(q.coalesced for q in self._subscriber_queues.values()),
+            "dropped": sum(q.dropped for q in self._subscriber_queues.values()),
+        }
@@ -0,0 +1,94 @@
+from typing import Any, Dict, List
+import json
+
+
+def json_pointer(*tokens: Any) -> str:
+    """
+    Builds a JSON pointer (RFC 6901) from unescaped tokens, e.g. json_pointer("test_cases", "a/b").
+    """
+    return "".join(
+        "/" + str(token).replace("~", "~0").replace("/", "~1") for token in tokens
+    )
+
+
+class UIStateStore:
+    """
+    The state shown by the UI, kept as one JSON document and changed through JSON patches
+    (RFC 6902, add / replace / remove).
+
+    Every applied patch gets the next sequence number and is sent to the clients as is, so the
+    size of an update does not depend on the size of the test run. A client that connects gets a
+    snapshot of the document with the sequence number of the last patch it contains, and skips
+    patches with a sequence number that is not greater. Sequence numbers are strictly increasing,
+    a lagging connection may skip progress patches that were superseded before they were sent.
+
+    A patch that cannot be applied may have been applied in part, the clients are then brought
+    back in line with a resync snapshot instead of the patch.
+    """
+
+    def __init__(self) -> None:
+        self._state: Dict[str, Any] = {"test_runs": {}, "test_cases": {}}
+        self._seq = 0
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        return self._state
+
+    def apply(self, event_type: str, patch: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Applies the patch and returns the message that carries it to the clients.
+        """
+        for operation in patch:
+            self._apply_operation(operation)
+        self._seq += 1
+        return {
+            "type": "tc_data",
+            "event_type": event_type,
+            "seq": self._seq,
+            "patch": patch,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "type": "tc_data",
+            "event_type": "snapshot",
+            "seq": self._seq,
+            "state": self._state,
+        }
+
+    def resync(self) -> Dict[str, Any]:
+        """
+        A snapshot under a new sequence number, which replaces the state of every client.
+        """
+        self._seq += 1
+        snapshot = self.snapshot()
+        # COMMENT: Not shared with the store, the message is serialized later by another task
+        snapshot["state"] = json.loads(json.dumps(self._state))
+        return snapshot
+
+    def _apply_operation(self, operation: Dict[str, Any]) -> None:
+        tokens = [
+            token.replace("~1", "/").replace("~0", "~")
+            for token in operation["path"].split("/")[1:]
+        ]
+        if not tokens:
+            raise ValueError("The root of the UI state cannot be patched")
+        parent = self._state
+        for token in tokens[:-1]:
+            parent = parent[token]
+        key = tokens[-1]
+        op = operation["op"]
+        if op == "add" or op == "replace":
+            if op == "replace" and key not in parent:
+                raise KeyError(f"Cannot replace missing {operation['path']}")
+            # COMMENT: Stored as it appears on the wire, and not shared with the patch, which is
+            #   serialized later by another task
+            parent[key] = json.loads(json.dumps(operation["value"]))
+        elif op == "remove":
+            del parent[key]
+        else:
+            raise ValueError(f"Unsupported patch operation {op}")
@@ -0,0 +1,119 @@
+from trio_websocket import ConnectionClosed, WebSocketConnection  # type: ignore
+from collections import OrderedDict
+from typing import Dict, Hashable
+import itertools
+import logging
+import math
+import trio
+
+
+class ConnectionWriter:
+    """
+    Bounded outbound queue of one websocket connection, drained by its own task, so a slow client
+    only ever delays its own messages.
+
+    Messages are queued already serialized. A queued message with a coalesce_key is replaced by a
+    newer message with the same key (e.g. progress updates of one test case), which downsamples
+    a connection that falls behind. A connection whose queue still overflows, or whose send does
+    not complete within send_timeout, is closed. A connection that is not droppable, the control
+    connection, is never closed for lagging: its sends are waited for and its queue grows beyond
+    max_queue_size instead, so that no prompt or command reply is lost.
+    """
+
+    def __init__(
+        self,
+        connection: WebSocketConnection,
+        max_queue_size: int = 1000,
+        send_timeout: float = 5.0,
+        droppable: bool = True,
+    ) -> None:
+        self._connection = connection
+        self._max_queue_size = max_queue_size
+        self._send_timeout = send_timeout
+        self._droppable = droppable
+        self._pending: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._unique_keys = itertools.count()
+        self._pending_event = trio.Event()
+        self._overflowed = False
+        self._closed = False
+        self._sent = 0
+        self._sent_bytes = 0
+        self._coalesced = 0
+        self._logger = logging.getLogger("ConnectionWriter")
+
+    @property
+    def connection(self) -> WebSocketConnection:
+        return self._connection
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def put(self, message: str, coalesce_key: Hashable | None = None) -> bool:
+        """
+        Queues a message without blocking, returns False if the connection is being dropped.
+        """
+        if self._closed or self._overflowed:
+            return False
+        if coalesce_key is None:
+            coalesce_key = next(self._unique_keys)
+        elif self._pending.pop(coalesce_key, None) is not None:
+            self._coalesced += 1
+        self._pending[coalesce_key] = message
+        if len(self._pending) > self._max_queue_size:
+            if self._droppable:
+                self._overflowed = True
+            elif len(self._pending) == self._max_queue_size + 1:
+                self._logger.warning(
+                    f"Outbound queue of {self._connection} holds more than {self._max_queue_size} messages"
+                )
+        self._pending_event.set()
+        return not self._overflowed
+
+    async def run(self) -> None:
+        try:
+            while True:
+                await self._pending_event.wait()
+                if self._overflowed:
+                    self._logger.error(
+                        f"Outbound queue of {self._connection} overflowed, dropping connection"
+                    )
+                    await self._close()
+                    return
+                if not self._pending:
+                    self._pending_event = trio.Event()
+                    continue
+                _, message = self._pending.popitem(last=False)
+                send_timeout = self._send_timeout if self._droppable else math.inf
+                with trio.move_on_after(send_timeout) as cancel_scope:
+                    await self._connection.send_message(message)  # type: ignore
+                if cancel_scope.cancelled_caught:
+                    self._logger.error(
+                        f"Send to {self._connection} timed out, dropping connection"
+                    )
+                    await self._close()
+                    return
+                self._sent += 1
+                self._sent_bytes += len(message)
+        except ConnectionClosed:
+            self._logger.info(f"Connection {self._connection} closed")
+        finally:
+            self._closed = True
+            self._pending.clear()
+
+    async def _close(self) -> None:
+        self._closed = True
+        with trio.move_on_after(1):
+            await self._connection.aclose()  # type: ignore
+
+    def statistics(self) -> Dict[str, int]:
+        return {
+            "queue_depth": len(self._pending),
+            "sent": self._sent,
+            "sent_bytes": self._sent_bytes,
+            "coalesced": self._coalesced,
+        }
@@ -4,29 +4,81 @@ from trio_websocket import ( # type: ignore
     WebSocketRequest,
     WebSocketConnection, # type: ignore
 )  
-from typing import TYPE_CHECKING
+from _CommunicationModules._ConnectionWriter import ConnectionWriter
+from _Application._DomainEntity._Session import ControlSession, Session
+from typing import Any, Callable, Dict, Hashable, List, TYPE_CHECKING
 import logging
 import json
 import trio
 
 if TYPE_CHECKING:
     from _Application._AppStateManager import ApplicationStateManager
+    from _Application._ResultIndex import ResultIndex
+    from util.latency import LatencyRecorder
+
+
+class ConnectionMetrics:
+    def __init__(self, role: str) -> None:
+        self.role = role
+        self.connected_at = trio.current_time()
+        self.received = 0
+        self.received_bytes = 0
+        self.rejected = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "role": self.role,
+            "connected_for": trio.current_time() - self.connected_at,
+            "received": self.received,
+            "received_bytes": self.received_bytes,
+            "rejected": self.rejected,
+        }
 
 
 # TODO: all comm modules should implement an interface
 class WSCommModule:
+    """
+    Runs one reader and one writer task per websocket connection.
+
+    The reader routes incoming messages by the role of the connection's session: commands and
+    prompt responses are only accepted from the control session, view sessions can only ask for
+    a fresh snapshot. Forwarding a message waits on the application's channels, which only holds
+    up the connection that sent it. The writer drains the connection's bounded outbound queue,
+    see ConnectionWriter.
+    """
+
     def __init__(
         self,
         command_send_channel: trio.MemorySendChannel[str],
-        ui_response_send_channel: trio.MemorySendChannel[str],
+        ui_response_send_channel: trio.MemorySendChannel[Dict[str, Any]],
         asm: "ApplicationStateManager",
+        max_outbound_queue_size: int = 1000,
+        send_timeout: float = 5.0,
+        result_index: "ResultIndex | None" = None,
+        latency_recorder: "LatencyRecorder | None" = None,
     ):
         self._command_send_channel = command_send_channel
         self._ui_response_send_channel = ui_response_send_channel
         self._server_cancel_scope: trio.CancelScope | None = None
         self._asm = asm
+        self._max_outbound_queue_size = max_outbound_queue_size
+        self._send_timeout = send_timeout
+        self._result_index = result_index
+        self._latency_recorder = latency_recorder
+        self._writers: Dict[WebSocketConnection, ConnectionWriter] = {}
+        self._metrics: Dict[WebSocketConnection, ConnectionMetrics] = {}
+        self._control_connected_callbacks: List[Callable[[], None]] = []
         self._logger = logging.getLogger("WSCommModule")
 
+    # COMMENT: Set by the application once the index is open, queries are refused until then
+    @property
+    def result_index(self) -> "ResultIndex | None":
+        return self._result_index
+
+    @result_index.setter
+    def result_index(self, value: "ResultIndex | None"):
+        self._result_index = value
+
     @property
     def ws_control_connection(self):
         if self._asm.control_session is not None:
@@ -39,23 +91,162 @@ class WSCommModule:
     def all_ws_connection(self):
         return list(self._asm.sessions.keys())
 
+    def broadcast(self, message: str, coalesce_key: Hashable | None = None) -> None:
+        """
+        Queues an already serialized message on every connection, never blocks.
+        """
+        for writer in list(self._writers.values()):
+            writer.put(message, coalesce_key)
+
+    def send_to_control(self, message: str) -> bool:
+        """
+        Queues an already serialized message on the control connection, never blocks.
+        Returns False if there is no control connection to send to.
+        """
+        control_session = self._asm.control_session
+        if control_session is None:
+            return False
+        writer = self._writers.get(control_session.connection)
+        if writer is None:
+            return False
+        return writer.put(message)
+
+    def on_control_connected(self, callback: Callable[[], None]) -> None:
+        """
+        Registers a callback run whenever a control connection is established, once its snapshot
+        is queued.
+        """
+        self._control_connected_callbacks.append(callback)
+
+    def statistics(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {}
+        for connection, writer in self._writers.items():
+            connection_stats = writer.statistics()
+            metrics = self._metrics.get(connection)
+            if metrics is not None:
+                connection_stats.update(metrics.as_dict())
+            stats[str(connection)] = connection_stats
+        return stats
+
+    async def _run_writer(self, writer: ConnectionWriter, cancel_scope: trio.CancelScope):
+        await writer.run()
+        # COMMENT: The writer only returns once the connection is closed or dropped
+        cancel_scope.cancel()
+
+    async def _run_reader(
+        self,
+        ws: WebSocketConnection,
+        session: Session,
+        writer: ConnectionWriter,
+        metrics: ConnectionMetrics,
+        cancel_scope: trio.CancelScope,
+    ):
+        try:
+            while True:
+                message = await ws.get_message()  # type: ignore
+                metrics.received += 1
+                metrics.received_bytes += len(message)  # type: ignore
+                try:
+                    data = json.loads(message)  # type: ignore
+                    message_type = data["type"]
+                except (ValueError, TypeError, KeyError):
+                    self._logger.error(f"Malformed message from {ws}")
+                    metrics.rejected += 1
+                    continue
+                await self._route(session, writer, metrics, message_type, data)
+        except ConnectionClosed:
+            self._logger.info(f"WS connection closed with {ws}")
+        finally:
+            cancel_scope.cancel()
+
+    async def _route(
+        self,
+        session: Session,
+        writer: ConnectionWriter,
+        metrics: ConnectionMetrics,
+        message_type: str,
+        data: Dict[str, Any],
+    ):
+        if message_type == "snapshot":
+            writer.put(json.dumps(self._asm.ui_state.snapshot()))
+        elif message_type == "query":
+            writer.put(json.dumps(self._answer_query(data)))
+        elif message_type == "latency":
+            # COMMENT: Per-stage p50 / p95 / p99 in milliseconds, see util.latency
+            writer.put(
+                json.dumps(
+                    {
+                        "type": "latency",
+                        "stages": (
+                            self._latency_recorder.summary()
+                            if self._latency_recorder is not None
+                            else {}
+                        ),
+                    }
+                )
+            )
+        elif not isinstance(session, ControlSession):
+            metrics.rejected += 1
+            writer.put(
+                json.dumps(
+                    {"type": "error", "message": f"{message_type} requires the control session"}
+                )
+            )
+        elif message_type == "command":
+            await self._command_send_channel.send(data)  # type: ignore
+        elif message_type == "ui-response":
+            # COMMENT: {"type": "ui-response", "id": <prompt id>, "value": ...}
+            await self._ui_response_send_channel.send(data)
+        else:
+            metrics.rejected += 1
+            self._logger.error(f"Unknown message type {message_type}")
+
+    def _answer_query(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        # COMMENT: {"type": "query", "id": ..., "query": "yield" | "cpk" | "pareto", "args": {...}},
+        #   read only, so any session may ask. Answered from the memory mapped index in place.
+        reply: Dict[str, Any] = {"type": "query_result", "id": data.get("id")}
+        if self._result_index is None:
+            reply["error"] = "No result index"
+            return reply
+        try:
+            reply["result"] = self._result_index.query(data["query"], data.get("args", {}))
+        except (KeyError, TypeError, ValueError) as e:
+            reply["error"] = f"Invalid query: {e}"
+        return reply
+
     async def ws_connection_handler(self, request: WebSocketRequest):
         ws = await request.accept()  # type: ignore
         self._asm.add_session(ws)
-        self._logger.info(f"WS connection established with: {ws}")
-        while True:
-            try:
-                message = await self._asm.control_session.connection.get_message()  # type: ignore
-                data = json.loads(message)  # type: ignore
-                if data["type"] == "command":
-                    await self._command_send_channel.send(data)
-                elif data["type"] == "ui-response":
-                    await self._ui_response_send_channel.send(data["value"])
-
-            except ConnectionClosed:
-                self._logger.info(f"WS connection closed with {ws}")
+        session = self._asm.sessions[ws]
+        metrics = ConnectionMetrics(
+            "control" if isinstance(session, ControlSession) else "view"
+        )
+        # COMMENT: Only view connections are dropped when they lag, see ConnectionWriter
+        writer = ConnectionWriter(
+            ws,
+            self._max_outbound_queue_size,
+            self._send_timeout,
+            droppable=metrics.role != "control",
+        )
+        self._writers[ws] = writer
+        self._metrics[ws] = metrics
+        # COMMENT: The client starts from a snapshot and then applies the broadcast patches
+        writer.put(json.dumps(self._asm.ui_state.snapshot()))
+        self._logger.info(f"WS {metrics.role} connection established with: {ws}")
+        if metrics.role == "control":
+            for callback in self._control_connected_callbacks:
+                callback()
+        try:
+            async with trio.open_nursery() as nursery:
+                nursery.start_soon(self._run_writer, writer, nursery.cancel_scope)
+                nursery.start_soon(
+                    self._run_reader, ws, session, writer, metrics, nursery.cancel_scope
+                )
+        finally:
+            self._writers.pop(ws, None)
+            self._metrics.pop(ws, None)
+            if ws in self._asm.sessions:
                 self._asm.remove_session(ws)
-                break
 
     async def start(self):
         self._server_cancel_scope = trio.CancelScope()
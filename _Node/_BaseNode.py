@@ -1,9 +1,13 @@
-from typing import List, Any, Callable, Awaitable, Optional, TYPE_CHECKING
+from typing import List, Any, Callable, Awaitable, Optional, Iterable, FrozenSet, Dict, TYPE_CHECKING
 from abc import ABC, abstractmethod
 from enum import Enum
-from uuid import uuid4
+from _Node._NodeGraph import NodeGraph
 import trio
+from util.structured_log import log_event
+from util.latency import Stage
+from util.node_id import new_node_id, node_id_string
 import logging
+import time
 
 if TYPE_CHECKING:
     from _Application._SystemEventBus import SystemEventBus
@@ -20,33 +24,80 @@ class NodeState(Enum):
     FAILED = "failed"
 
 
+_NO_RESOURCES: FrozenSet[str] = frozenset()
+
+
 class BaseNode(ABC):
     """
     A node represents a single unit of job.
     """
 
+    # COMMENT: Profiles create tens of thousands of nodes, slots keep them small. Subclasses
+    #   declare their own attributes in __slots__ too.
+    __slots__ = (
+        "_name",
+        "_dependencies",
+        "_dependents",
+        "_state",
+        "_scheduling_callback",
+        "_result",
+        "_error",
+        "_error_traceback",
+        "_func_parameter_label",
+        "_ui_request_send_channel",
+        "_event_bus",
+        "_id",
+        "_resources",
+        "_pending_dependencies",
+        "_counted_as_cleared",
+        "_graph",
+        "_topo_index",
+        "_stage_ns",
+        "_ui_wait_ns",
+        "__weakref__",
+    )
+
+    # COMMENT: Shared by all the nodes, looked up once
+    _logger = logging.getLogger("BaseNode")
+    _logger.setLevel(logging.DEBUG)
+
     def __init__(
         self, 
         name: str,
         event_bus: "SystemEventBus | None" = None,
-        func_parameter_label: str | None = None
+        func_parameter_label: str | None = None,
+        resources: Iterable[str] | None = None,
     ) -> None:
         self._name: str = name
         self._dependencies: List["BaseNode"] = []
         self._dependents: List["BaseNode"] = []
         self._state: NodeState = NodeState.NOT_PROCESSED
-        self._scheduling_callback: Callable[["BaseNode"], Awaitable[None]] = (
-            self._default_on_ready_callback
-        )
+        # COMMENT: None until set, see scheduling_callback
+        self._scheduling_callback: Callable[["BaseNode"], Awaitable[None]] | None = None
         self._result: Any = None
         self._error: Optional[Exception] = None
         self._error_traceback: Optional[str] = ""
         self._func_parameter_label: str | None = func_parameter_label
-        self._logger = logging.getLogger("BaseNode")
-        self._logger.setLevel(logging.DEBUG)
         self._ui_request_send_channel: trio.MemorySendChannel[str]
         self._event_bus: "SystemEventBus | None" = event_bus
-        self._id = uuid4().hex
+        # COMMENT: See util.node_id, the id property is the string form
+        self._id: int = new_node_id()
+        # COMMENT: Names of the shared resources (instruments, fixtures) this node holds while executing
+        #   Shared when already a frozenset, e.g. from a ProfileTemplate, an empty frozenset is not free.
+        self._resources: FrozenSet[str] = (
+            resources if isinstance(resources, frozenset) else frozenset(resources or ())
+        ) or _NO_RESOURCES
+        # COMMENT: Number of dependencies that are not cleared yet, the node is ready when it drops to 0.
+        #   _counted_as_cleared records whether the dependents' counters currently treat this node as cleared.
+        self._pending_dependencies: int = 0
+        self._counted_as_cleared: bool = False
+        # COMMENT: Maintained by NodeGraph, the node's position in the topological order of its graph
+        self._graph: NodeGraph | None = None
+        self._topo_index: int = 0
+        # COMMENT: time.perf_counter_ns() of the transitions of the current execution, from READY
+        #   on, see util.latency. Time the execution spent waiting on operator prompts.
+        self._stage_ns: Dict[Stage, int] = {}
+        self._ui_wait_ns: int = 0
 
     @property
     def event_bus(self) -> "SystemEventBus | None":
@@ -57,7 +108,11 @@ class BaseNode(ABC):
         self._event_bus = value
 
     @property
-    def id(self):
+    def id(self) -> str:
+        return node_id_string(self._id)
+
+    @property
+    def int_id(self) -> int:
         return self._id
 
     @property
@@ -104,6 +159,10 @@ class BaseNode(ABC):
     def error_traceback(self, value: Optional[str]) -> None:
         self._error_traceback = value
 
+    @property
+    def resources(self) -> FrozenSet[str]:
+        return self._resources
+
     @property
     def name(self) -> str:
         return self._name
@@ -116,54 +175,162 @@ class BaseNode(ABC):
     def dependents(self) -> List["BaseNode"]:
         return self._dependents
 
+    @property
+    def pending_dependencies(self) -> int:
+        return self._pending_dependencies
+
+    @property
+    def graph(self) -> NodeGraph | None:
+        return self._graph
+
+    @property
+    def run_id(self) -> str | None:
+        """
+        Id of the test run the node belongs to, if any, used in log fields.
+        """
+        return None
+
+    @property
+    def panel_id(self) -> Any:
+        """
+        Id of the panel the node belongs to, if any, used in traces.
+        """
+        return None
+
+    @property
+    def ready_at_ns(self) -> int | None:
+        return self._stage_ns.get(Stage.READY)
+
+    @property
+    def stage_ns(self) -> Dict[Stage, int]:
+        return self._stage_ns
+
+    @property
+    def ui_wait_ns(self) -> int:
+        return self._ui_wait_ns
+
+    def mark(self, stage: Stage) -> None:
+        self._stage_ns[stage] = time.perf_counter_ns()
+
+    def _log(self, level: int, event: str, template: str, **fields: Any) -> None:
+        # COMMENT: Checked first, the fields are not even collected when the level is disabled
+        if self._logger.isEnabledFor(level):
+            log_event(
+                self._logger,
+                level,
+                event,
+                template,
+                node_id=self.id,
+                node_name=self._name,
+                run_id=self.run_id,
+                state=self.state.value,
+                **fields,
+            )
+
     @property
     def scheduling_callback(self) -> Callable[["BaseNode"], Awaitable[None]]:
-        return self._scheduling_callback
+        return self._scheduling_callback or self._default_on_ready_callback
 
     async def _default_on_ready_callback(self, node: "BaseNode") -> None:
         pass
 
     def add_dependency(self, node: "BaseNode") -> None:
-        if self._is_reachable(node):
-            raise ValueError("Cyclic dependency detected")
-        if node in self._dependencies:
-            self._logger.info(f"{node.name} is already a dependency to {self.name}")
+        graph = NodeGraph.join(self, node)
+        if graph.has_edge(node, self):
+            self._log(
+                logging.INFO,
+                "dependency_exists",
+                "{dependency} is already a dependency to {node_name}",
+                dependency=node.name,
+            )
             return
+        # COMMENT: Raises ValueError on a cyclic dependency
+        graph.insert_edge(node, self)
         self._dependencies.append(node)
         node._dependents.append(self)
-        self._logger.info(f"{node.name} added as a dependency to {self.name}")
+        if not node._counted_as_cleared:
+            self._pending_dependencies += 1
+        self._log(
+            logging.INFO,
+            "dependency_added",
+            "{dependency} added as a dependency to {node_name}",
+            dependency=node.name,
+        )
+        self._on_dependencies_changed()
+        self._uncount_cleared()
         self.state = NodeState.NOT_PROCESSED
 
+    def _link_dependency(self, node: "BaseNode") -> None:
+        # COMMENT: Fast path for copying a validated DAG, both nodes must already be in the same
+        #   graph in topological order. Skips the cycle check and the per-edge logging.
+        assert self._graph is not None and node._graph is self._graph
+        self._graph.add_ordered_edge(node, self)
+        self._dependencies.append(node)
+        node._dependents.append(self)
+        if not node._counted_as_cleared:
+            self._pending_dependencies += 1
+        self._on_dependencies_changed()
+
     def remove_dependency(self, node: "BaseNode") -> None:
-        self._logger.info(f"{node.name} removed as a dependency to {self.name}")
+        self._log(
+            logging.INFO,
+            "dependency_removed",
+            "{dependency} removed as a dependency to {node_name}",
+            dependency=node.name,
+        )
         self._dependencies.remove(node)
         node._dependents.remove(self)
+        if self._graph is not None:
+            self._graph.remove_edge(node, self)
+        self._on_dependencies_changed()
+        if not node._counted_as_cleared:
+            self._pending_dependencies -= 1
 
-    # COMMENT: when a node is cleared, notify all dependents
+    # COMMENT: when a node is cleared, notify the dependents whose last pending dependency it was
     async def set_cleared(self) -> None:
-        self._logger.info(f"{self.name} node is cleared")
+        self.mark(Stage.CLEARED)
         self.state = NodeState.CLEARED
+        self._log(logging.INFO, "node_cleared", "{node_name} node is cleared")
+        if self._counted_as_cleared:
+            return
+        self._counted_as_cleared = True
         for dep in self._dependents:
-            await dep.check_dependency_and_schedule_self()
+            dep._pending_dependencies -= 1
+            if dep._pending_dependencies == 0:
+                await dep.check_dependency_and_schedule_self()
+
+    def _on_dependencies_changed(self) -> None:
+        # COMMENT: Hook for subclasses that cache anything derived from the dependency list
+        pass
+
+    def _uncount_cleared(self) -> None:
+        # COMMENT: Called whenever the node leaves the cleared state, its dependents wait on it again
+        if self._counted_as_cleared:
+            self._counted_as_cleared = False
+            for dep in self._dependents:
+                dep._pending_dependencies += 1
 
     def is_cleared(self) -> bool:
         return self.state == NodeState.CLEARED
 
     def ready_to_process(self) -> bool:
-        if all([node.is_cleared() for node in self._dependencies]):
+        if self._pending_dependencies == 0:
             self.state = NodeState.READY_TO_PROCESS
-            self._logger.info(f"{self.name} is ready to process")
+            self._log(logging.INFO, "node_ready", "{node_name} is ready to process")
             return True
         return False
 
     async def check_dependency_and_schedule_self(self) -> None:
-        if all(dep.is_cleared() for dep in self.dependencies):
-            self._logger.info(f"{self.name} is ready to process")
+        if self._pending_dependencies == 0:
             self.state = NodeState.READY_TO_PROCESS
+            self._log(logging.INFO, "node_ready", "{node_name} is ready to process")
             # TODO: This needs to be handled atop
             try:
-                await self._scheduling_callback(self)
-                self._logger.info(f"{self.name} is scheduled")
+                # COMMENT: A new execution starts, the marks of the previous one are dropped
+                self._stage_ns = {Stage.READY: time.perf_counter_ns()}
+                self._ui_wait_ns = 0
+                await self.scheduling_callback(self)
+                self._log(logging.INFO, "node_scheduled", "{node_name} is scheduled")
             except Exception as e:
                 self._logger.error(
                     f"Error while scheduling {self.name}: {e}", exc_info=True
@@ -179,13 +346,14 @@ class BaseNode(ABC):
         # COMMENT: If the node is processing, label is set as CANCELLED. 
         #   Its results upon completion will be ignored and the node will be rescheduled. 
         #   The result processing consumer should change the
+        self._uncount_cleared()
         if self.state == NodeState.PROCESSING:
             self.state = NodeState.CANCEL
-            self._logger.info(f"{self.name} node cancelled.")
+            self._log(logging.INFO, "node_cancelled", "{node_name} node cancelled.")
         else:
             self.state = NodeState.NOT_PROCESSED
             self._result = None
-            self._logger.info(f"{self.name} node reset.")
+            self._log(logging.INFO, "node_reset", "{node_name} node reset.")
             # TODO: determine if this needs to be in a try block
             await self.check_dependency_and_schedule_self()
         for dependent in self.dependents:
@@ -198,17 +366,3 @@ class BaseNode(ABC):
         Every node must have a execute() method. Based on the different job type, the implementation of this method will differ.
         """
         raise NotImplementedError("execute() not implemented")
-
-    def _is_reachable(self, node: "BaseNode") -> bool:
-        visited: set["BaseNode"] = set()
-
-        def _dfs(current_node: "BaseNode"):
-            if current_node == node:
-                return True
-            visited.add(current_node)
-            for dependent in current_node.dependents:
-                if dependent not in visited and _dfs(dependent):
-                    return True
-            return False
-
-        return _dfs(self)
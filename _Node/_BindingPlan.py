@@ -0,0 +1,100 @@
+from _Application._DomainEntity._TestCaseDataModel import TestCaseDataModel
+from util.ui_request import UIRequest
+from typing import Any, Callable, Iterable, Tuple
+from weakref import WeakKeyDictionary
+import inspect
+
+
+class BindingPlan:
+    """
+    Describes how TCNode fills in the arguments of a test case callable: which arguments get a
+    UIRequest, which get the TestCaseDataModel and which get the result of the dependency whose
+    func_parameter_label matches the argument name. Resolved once per callable.
+    """
+
+    _cache: "WeakKeyDictionary[Callable[..., Any], BindingPlan]" = WeakKeyDictionary()
+
+    def __init__(
+        self,
+        ui_request_args: Tuple[str, ...],
+        data_model_args: Tuple[str, ...],
+        dependency_args: Tuple[str, ...],
+        required_dependency_args: Tuple[str, ...],
+        is_coroutine: bool,
+    ) -> None:
+        self._ui_request_args = ui_request_args
+        self._data_model_args = data_model_args
+        self._dependency_args = dependency_args
+        self._required_dependency_args = required_dependency_args
+        self._is_coroutine = is_coroutine
+
+    @property
+    def ui_request_args(self) -> Tuple[str, ...]:
+        return self._ui_request_args
+
+    @property
+    def data_model_args(self) -> Tuple[str, ...]:
+        return self._data_model_args
+
+    @property
+    def dependency_args(self) -> Tuple[str, ...]:
+        return self._dependency_args
+
+    @property
+    def required_dependency_args(self) -> Tuple[str, ...]:
+        return self._required_dependency_args
+
+    @property
+    def is_coroutine(self) -> bool:
+        return self._is_coroutine
+
+    @classmethod
+    def for_callable(cls, callable_object: Callable[..., Any]) -> "BindingPlan":
+        try:
+            plan = cls._cache.get(callable_object)
+        except TypeError:
+            # COMMENT: Not weak-referenceable, e.g. a builtin, resolve without caching
+            return cls._resolve(callable_object)
+        if plan is None:
+            plan = cls._resolve(callable_object)
+            cls._cache[callable_object] = plan
+        return plan
+
+    @classmethod
+    def _resolve(cls, callable_object: Callable[..., Any]) -> "BindingPlan":
+        ui_request_args = []
+        data_model_args = []
+        dependency_args = []
+        required_dependency_args = []
+        for p_name, p_obj in inspect.signature(callable_object).parameters.items():
+            if p_obj.kind in (p_obj.VAR_POSITIONAL, p_obj.VAR_KEYWORD):
+                continue
+            if p_obj.annotation is UIRequest or p_obj.annotation == "UIRequest":
+                ui_request_args.append(p_name)
+            elif (
+                p_obj.annotation is TestCaseDataModel
+                or p_obj.annotation == "TestCaseDataModel"
+            ):
+                data_model_args.append(p_name)
+            else:
+                dependency_args.append(p_name)
+                if p_obj.default is p_obj.empty:
+                    required_dependency_args.append(p_name)
+        return cls(
+            tuple(ui_request_args),
+            tuple(data_model_args),
+            tuple(dependency_args),
+            tuple(required_dependency_args),
+            inspect.iscoroutinefunction(callable_object),
+        )
+
+    def validate(self, node_name: str, dependency_labels: Iterable[str]) -> None:
+        """
+        Raises ValueError if an argument without a default value has no dependency to take its value from.
+        """
+        labels = set(dependency_labels)
+        unbound = [name for name in self._required_dependency_args if name not in labels]
+        if unbound:
+            raise ValueError(
+                f"{node_name}: no dependency with func_parameter_label {', '.join(unbound)}"
+            )
@@ -0,0 +1,172 @@
+from typing import List, Set, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from _Node._BaseNode import BaseNode
+
+
+class NodeGraph:
+    """
+    Keeps a topological order of a node DAG up to date while edges are inserted
+    (Pearce-Kelly dynamic topological sort).
+
+    Every node belongs to at most one graph, nodes that get connected end up in the same graph:
+    NodeGraph.join moves the nodes of the smaller graph into the larger one. An edge insert
+    that agrees with the current order costs O(1); otherwise only the nodes between the two
+    endpoints that are reachable from them are visited and reordered. Traversals are iterative.
+    """
+
+    def __init__(self) -> None:
+        self._nodes: List["BaseNode"] = []
+        self._edges: Set[Tuple["BaseNode", "BaseNode"]] = set()
+        # COMMENT: Indices in use are in [_min_index, _next_index)
+        self._min_index: int = 0
+        self._next_index: int = 0
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, node: "BaseNode") -> bool:
+        return node._graph is self
+
+    @property
+    def nodes(self) -> List["BaseNode"]:
+        return self._nodes
+
+    def add_node(self, node: "BaseNode") -> None:
+        if node._graph is self:
+            return
+        if node._graph is not None:
+            self._absorb(node._graph)
+            return
+        node._graph = self
+        node._topo_index = self._next_index
+        self._next_index += 1
+        self._nodes.append(node)
+
+    @staticmethod
+    def join(first: "BaseNode", second: "BaseNode") -> "NodeGraph":
+        """
+        Returns the graph holding both nodes, creating or merging graphs as needed.
+        """
+        first_graph = first._graph
+        second_graph = second._graph
+        if first_graph is None and second_graph is None:
+            graph = NodeGraph()
+            graph.add_node(first)
+            graph.add_node(second)
+            return graph
+        if first_graph is None:
+            assert second_graph is not None
+            second_graph.add_node(first)
+            return second_graph
+        if second_graph is None or second_graph is first_graph:
+            first_graph.add_node(second)
+            return first_graph
+        # COMMENT: Move the smaller graph, a node changes graph O(log N) times at most
+        if len(first_graph) >= len(second_graph):
+            first_graph._absorb(second_graph)
+            return first_graph
+        second_graph._absorb(first_graph)
+        return second_graph
+
+    def has_edge(self, dependency: "BaseNode", dependent: "BaseNode") -> bool:
+        return (dependency, dependent) in self._edges
+
+    def insert_edge(self, dependency: "BaseNode", dependent: "BaseNode") -> None:
+        """
+        Records the edge dependency -> dependent and reorders the affected nodes.
+        Raises ValueError if the edge would close a cycle, the graph is left unchanged in that case.
+        The caller is responsible for linking the nodes' dependency lists.
+        """
+        assert dependency._graph is self and dependent._graph is self, (
+            "Both nodes must be in the graph"
+        )
+        if dependency is dependent:
+            raise ValueError("Cyclic dependency detected")
+        # COMMENT: A node without edges can move anywhere, putting it at the front (or the back)
+        #   keeps the usual "new node depends on / is depended on by" inserts O(1)
+        if not dependency._dependencies and not dependency._dependents:
+            self._min_index -= 1
+            dependency._topo_index = self._min_index
+        elif not dependent._dependencies and not dependent._dependents:
+            dependent._topo_index = self._next_index
+            self._next_index += 1
+        lower_bound = dependent._topo_index
+        upper_bound = dependency._topo_index
+        if lower_bound < upper_bound:
+            # COMMENT: Nodes reachable from the dependent that currently sit before the dependency
+            forward = self._collect(
+                dependent, upper_bound, forward=True, target=dependency
+            )
+            # COMMENT: Nodes reaching the dependency that currently sit after the dependent
+            backward = self._collect(
+                dependency, lower_bound, forward=False, target=None
+            )
+            self._reorder(backward, forward)
+        self._edges.add((dependency, dependent))
+
+    def add_ordered_edge(self, dependency: "BaseNode", dependent: "BaseNode") -> None:
+        """
+        Records an edge that is known to agree with the current order, e.g. while copying a DAG
+        that was already validated. No cycle check is done.
+        """
+        assert dependency._topo_index < dependent._topo_index, (
+            "Edge does not agree with the topological order"
+        )
+        self._edges.add((dependency, dependent))
+
+    def remove_edge(self, dependency: "BaseNode", dependent: "BaseNode") -> None:
+        # COMMENT: Removing an edge never invalidates a topological order
+        self._edges.discard((dependency, dependent))
+
+    def topological_order(self) -> List["BaseNode"]:
+        return sorted(self._nodes, key=lambda node: node._topo_index)
+
+    def _collect(
+        self,
+        start: "BaseNode",
+        bound: int,
+        forward: bool,
+        target: "BaseNode | None",
+    ) -> List["BaseNode"]:
+        visited: Set["BaseNode"] = {start}
+        stack: List["BaseNode"] = [start]
+        collected: List["BaseNode"] = []
+        while stack:
+            current = stack.pop()
+            collected.append(current)
+            neighbours = current._dependents if forward else current._dependencies
+            for neighbour in neighbours:
+                if neighbour is target:
+                    raise ValueError("Cyclic dependency detected")
+                if neighbour in visited:
+                    continue
+                index = neighbour._topo_index
+                if (forward and index < bound) or (not forward and index > bound):
+                    visited.add(neighbour)
+                    stack.append(neighbour)
+        return collected
+
+    def _reorder(
+        self, backward: List["BaseNode"], forward: List["BaseNode"]
+    ) -> None:
+        backward.sort(key=lambda node: node._topo_index)
+        forward.sort(key=lambda node: node._topo_index)
+        affected = backward + forward
+        indices = sorted(node._topo_index for node in affected)
+        for node, index in zip(affected, indices):
+            node._topo_index = index
+
+    def _absorb(self, other: "NodeGraph") -> None:
+        # COMMENT: The two graphs share no edges, so concatenating their orders is a valid order of the union
+        offset = self._next_index - other._min_index
+        for node in other._nodes:
+            node._graph = self
+            node._topo_index += offset
+        self._nodes.extend(other._nodes)
+        self._edges.update(other._edges)
+        self._next_index += other._next_index - other._min_index
+        other._nodes = []
+        other._edges = set()
+        other._min_index = 0
+        other._next_index = 0
@@ -1,38 +1,76 @@
 from _Application._DomainEntity._TestCaseDataModel import TestCaseDataModel
-from typing import Callable, Any
+from typing import Callable, Any, Iterable, Dict, List, Tuple, TYPE_CHECKING
 from _Application._SystemEvent import TestCaseFailEvent
-from util.async_timing import async_timed
+from util.process_runner import default_process_runner
 from util.ui_request import UIRequest
+from util.latency import Stage
 from _Node._BaseNode import BaseNode, NodeState
+from _Node._BindingPlan import BindingPlan
 from functools import partial
+from enum import Enum
 import traceback
+import pickle
 import logging
-import inspect
 import trio
 import sys
 
+if TYPE_CHECKING:
+    from util.process_runner import ProcessRunner
+    from util.remote_worker import RemoteRunner
+
+
+class ExecutionMode(Enum):
+    # COMMENT: Synchronous callables run in a worker thread
+    THREAD = "thread"
+    # COMMENT: Synchronous callables run in a worker process, for CPU-bound test cases. The
+    #   process is local unless the executor hands the node a RemoteRunner.
+    PROCESS = "process"
+
 
 class TCNode(BaseNode):
     """
     A wrapper around test cases.
     """
 
+    __slots__ = (
+        "_data_model",
+        "_callable_object",
+        "_execution_mode",
+        "_process_runner",
+        "_auto_retry_count",
+        "_dependency_bindings",
+        "_dependency_args",
+    )
+
+    _logger = logging.getLogger("TCNode")
+
     def __init__(
         self,
         callable_object: Callable[..., Any],
         name: str,
         func_parameter_label: str | None = None,
         description: str = "",
+        resources: Iterable[str] | None = None,
+        execution_mode: ExecutionMode = ExecutionMode.THREAD,
     ) -> None:
-        super().__init__(name=name, func_parameter_label=func_parameter_label)
+        super().__init__(
+            name=name,
+            func_parameter_label=func_parameter_label,
+            resources=resources,
+        )
         self._data_model = TestCaseDataModel(self._id, self._name, description)
         self._callable_object = callable_object
-        self.execute = async_timed(self.name)(self.execute)
-        self._logger = logging.getLogger("TCNode")
-        self._logger.info(f"TCNode {self.id} created")
+        self._execution_mode = execution_mode
+        # COMMENT: Runs the callable in process mode, None for the default local process pool
+        self._process_runner: "ProcessRunner | RemoteRunner | None" = None
         self._auto_retry_count: int = 1
         self._data_model.state = NodeState.NOT_PROCESSED
-
+        self._log(logging.INFO, "node_created", "TCNode {node_id} created")
+        # COMMENT: func_parameter_label -> dependency providing that argument, resolved lazily or
+        #   handed over by a ProfileTemplate
+        self._dependency_bindings: Dict[str, BaseNode] | None = None
+        # COMMENT: (argument name, dependency) pairs, derived from the binding plan and the bindings above
+        self._dependency_args: List[Tuple[str, BaseNode]] | None = None
 
     @property
     def state(self) -> NodeState:
@@ -42,6 +80,90 @@ class TCNode(BaseNode):
     def state(self, value: NodeState) -> None:
         self._data_model.state = value
 
+    @property
+    def callable_object(self) -> Callable[..., Any]:
+        return self._callable_object
+
+    @property
+    def run_id(self) -> str | None:
+        parent_test_run = self._data_model.parent_test_run
+        return parent_test_run.id if parent_test_run else None
+
+    @property
+    def panel_id(self) -> int | None:
+        parent_test_run = self._data_model.parent_test_run
+        return parent_test_run.parent_panel_id if parent_test_run else None
+
+    @property
+    def execution_mode(self) -> ExecutionMode:
+        return self._execution_mode
+
+    @property
+    def process_runner(self) -> "ProcessRunner | RemoteRunner":
+        return self._process_runner or default_process_runner()
+
+    @process_runner.setter
+    def process_runner(self, value: "ProcessRunner | RemoteRunner | None") -> None:
+        self._process_runner = value
+
+    @property
+    def dependency_bindings(self) -> Dict[str, BaseNode]:
+        if self._dependency_bindings is None:
+            self._dependency_bindings = {
+                d.func_parameter_label: d
+                for d in self.dependencies
+                if d.func_parameter_label is not None
+            }
+        return self._dependency_bindings
+
+    @dependency_bindings.setter
+    def dependency_bindings(self, value: Dict[str, BaseNode]) -> None:
+        self._dependency_bindings = value
+        self._dependency_args = None
+
+    @property
+    def binding_plan(self) -> BindingPlan:
+        return BindingPlan.for_callable(self._callable_object)
+
+    def validate_bindings(self) -> None:
+        """
+        Fails fast, with a ValueError, if the callable's arguments cannot be bound from the dependencies.
+        """
+        plan = self.binding_plan
+        labels = [
+            d.func_parameter_label
+            for d in self.dependencies
+            if d.func_parameter_label is not None
+        ]
+        ambiguous = {
+            label for label in labels if labels.count(label) > 1
+        } & set(plan.dependency_args)
+        if ambiguous:
+            raise ValueError(
+                f"{self.name}: several dependencies provide {', '.join(sorted(ambiguous))}"
+            )
+        plan.validate(self.name, labels)
+        if self._execution_mode is ExecutionMode.PROCESS:
+            self._validate_process_mode(plan)
+
+    def _validate_process_mode(self, plan: BindingPlan) -> None:
+        if plan.is_coroutine:
+            raise ValueError(f"{self.name}: coroutines cannot run in process mode")
+        if plan.ui_request_args:
+            raise ValueError(
+                f"{self.name}: UIRequest arguments are not available in process mode"
+            )
+        try:
+            pickle.dumps(self._callable_object)
+        except Exception as e:
+            raise ValueError(
+                f"{self.name}: callable cannot be sent to a worker process: {e}"
+            ) from e
+
+    def _on_dependencies_changed(self) -> None:
+        self._dependency_bindings = None
+        self._dependency_args = None
+
     @property
     def auto_retry_count(self) -> int:
         return self._auto_retry_count
@@ -58,6 +180,10 @@ class TCNode(BaseNode):
         assert self.event_bus is not None, "TCNode must be connected to a system event bus"
         await self.event_bus.publish(test_case_failed_event)
 
+    def _call_in_thread(self, func_parameters: Dict[str, Any]) -> Any:
+        self.mark(Stage.THREAD_ACQUIRED)
+        return self._callable_object(**func_parameters)
+
     async def execute(self):
         self.state = NodeState.PROCESSING
         self._data_model.event_bus = self.event_bus
@@ -71,38 +197,63 @@ class TCNode(BaseNode):
         ), "TCNode must be associated with a test run"
 
         try:
-            # TODO: Update unit test to cover function signature check
-            func_parameters = {}
-            dependency_parameter_labels = [
-                d.func_parameter_label
-                for d in self.dependencies
-                if d.func_parameter_label is not None  # type: ignore
-            ]
-            for p_name, p_obj in inspect.signature(
-                self._callable_object
-            ).parameters.items():
-                if p_obj.annotation is UIRequest:
-                    func_parameters[p_name] = UIRequest(self._ui_request_send_channel)
-                elif p_obj.annotation is TestCaseDataModel:
+            plan = self.binding_plan
+            if self._dependency_args is None:
+                dependency_bindings = self.dependency_bindings
+                self._dependency_args = [
+                    (p_name, dependency_bindings[p_name])
+                    for p_name in plan.dependency_args
+                    if p_name in dependency_bindings
+                ]
+            func_parameters: Dict[str, Any] = {
+                p_name: dependency.result for p_name, dependency in self._dependency_args
+            }
+            if self._execution_mode is ExecutionMode.PROCESS:
+                # Execute synchronous function in a worker process, the worker passes a proxy
+                # of the data model to the callable
+                self._log(
+                    logging.INFO,
+                    "node_executing",
+                    "Executing synchronous function in worker process",
+                    mode="process",
+                )
+                self._result = await self.process_runner.run(
+                    self._callable_object,
+                    func_parameters,
+                    plan.data_model_args,
+                    self.data_model,
+                )
+            else:
+                ui_requests = [
+                    UIRequest(self._ui_request_send_channel) for _ in plan.ui_request_args
+                ]
+                func_parameters.update(zip(plan.ui_request_args, ui_requests))
+                for p_name in plan.data_model_args:
                     func_parameters[p_name] = self.data_model
+
+                if plan.is_coroutine:
+                    # Execute coroutine
+                    self._log(
+                        logging.INFO,
+                        "node_executing",
+                        "Executing coroutine",
+                        mode="coroutine",
+                    )
+                    async with trio.open_nursery() as nursery:  # type: ignore
+                        self._result = await self._callable_object(**func_parameters)
                 else:
-                    if p_name in dependency_parameter_labels:
-                        for d in self.dependencies:
-                            if d.func_parameter_label == p_name:
-                                func_parameters[p_name] = d.result
-
-            if inspect.iscoroutinefunction(self._callable_object):
-                # Execute coroutine
-                self._logger.info("Executing coroutine")
-                async with trio.open_nursery() as nursery:  # type: ignore
-                    self._result = await self._callable_object(**func_parameters)
-            else:
-                # Execute synchronous function
-                self._logger.info("Executing synchronous function")
-                async with trio.open_nursery() as nursery:  # type: ignore
-                    self._result = await trio.to_thread.run_sync(
-                        partial(self._callable_object, **func_parameters)
-                    )  # type: ignore
+                    # Execute synchronous function
+                    self._log(
+                        logging.INFO,
+                        "node_executing",
+                        "Executing synchronous function",
+                        mode="thread",
+                    )
+                    async with trio.open_nursery() as nursery:  # type: ignore
+                        self._result = await trio.to_thread.run_sync(
+                            partial(self._call_in_thread, func_parameters)
+                        )  # type: ignore
+                self._ui_wait_ns = sum(ui_request.wait_ns for ui_request in ui_requests)
         except Exception as e:
             self.error = e
             _, _, tb = sys.exc_info()
@@ -8,10 +8,20 @@ if TYPE_CHECKING:
 
 
 class TestRunTerminalNode(BaseNode):
+    __slots__ = ("_test_run",)
+
     def __init__(self, test_run: "TestRun"):
         super().__init__("TestRunTerminalNode")
         self._test_run = test_run
 
+    @property
+    def run_id(self) -> str | None:
+        return self._test_run.id
+
+    @property
+    def panel_id(self) -> int | None:
+        return self._test_run.parent_panel_id
+
     @property
     def state(self):
         return self._state
@@ -25,7 +35,7 @@ class TestRunTerminalNode(BaseNode):
             self.event_bus is not None
         ), "TestRunTerminalNode must be connected to an event bus"
         test_run_termination_event = TestRunTerminationEvent(
-            {"tr_id": self._test_run.id}
+            {"tr_id": self._test_run.id, "panel_id": self._test_run.parent_panel_id}
         )  # type: ignore
         assert (
             self._test_run.parent_panel is not None
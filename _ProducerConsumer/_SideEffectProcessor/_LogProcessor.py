@@ -1,7 +1,6 @@
-from typing import Set
-from trio_websocket import WebSocketConnection, ConnectionClosed  # type: ignore
-from queue import Queue
-from _Node._TestRunTerminalNode import TestRunTerminalNode
+from typing import Any, Dict, List
+from util.log_buffer import LogBuffer
+from util.structured_log import LogEvent
 from _CommunicationModules._WSCommModule import WSCommModule
 import json
 import trio
@@ -9,46 +8,69 @@ import logging
 
 
 class LogProcessor:
+    """
+    Drains the LogBuffer in batches, formats every record once and broadcasts one frame per batch,
+    a frame holds at most max_frame_bytes of formatted messages. Structured records (LogEvent)
+    carry their fields along, so the UI can filter on them.
+    """
+
     def __init__(
         self,
-        log_queue: Queue[
-            logging.LogRecord | TestRunTerminalNode
-        ],  # REMOVE: remove terminal node from the type
+        log_buffer: LogBuffer,
         comm_module: WSCommModule,
+        max_batch_records: int = 200,
+        max_latency: float = 0.1,
+        max_frame_bytes: int = 64 * 1024,
     ):
-        self._log_queue = log_queue
+        self._log_buffer = log_buffer
         self._comm_module = comm_module
-        self._cancel_scope: trio.CancelScope | None = None
-        self._stop_flag = False
+        self._max_batch_records = max_batch_records
+        self._max_latency = max_latency
+        self._max_frame_bytes = max_frame_bytes
+        self._formatter = logging.Formatter(
+            "%(asctime)s - %(threadName)s - %(name)s - %(levelname)s - %(message)s"
+        )
         self._logger = logging.getLogger("LogProcessor")    
 
-    async def send_message(self, connection: WebSocketConnection, message: str):  # type: ignore
-        try:
-            await connection.send_message(message)  # type: ignore
-        except ConnectionClosed:
-            self._logger.error(
-                f"Connection {connection} closed, removing from connection list"
-            )
-
     async def start(self):
-        formatter = logging.Formatter(
-            "%(asctime)s - %(threadName)s - %(name)s - %(levelname)s - %(message)s"
-        )
-        async with trio.open_nursery() as nursery:
-            self._cancel_scope = nursery.cancel_scope
-            while True:
-                try:
-                    record = await trio.to_thread.run_sync(self._log_queue.get)
-                    if isinstance(record, TestRunTerminalNode):
-                        break
-                    message = formatter.format(record)
-                    json_message = json.dumps({"type": "log", "message": message})
-                    for connection in self._comm_module.all_ws_connection:
-                        nursery.start_soon(self.send_message, connection, json_message)
-                except trio.Cancelled:
-                    self._logger.error("Log processor cancelled")
+        while True:
+            batch = await self._log_buffer.get_batch(
+                self._max_batch_records, self._max_latency
+            )
+            if not batch:
+                if self._log_buffer.closed:
                     break
-                await trio.sleep(0)
+                continue
+            messages = [self._entry(record) for record in batch]
+            for frame in self._frames(messages):
+                self._comm_module.broadcast(
+                    json.dumps({"type": "log", "messages": frame})
+                )
+
+    def _entry(self, record: logging.LogRecord) -> Dict[str, Any]:
+        entry: Dict[str, Any] = {
+            "level": record.levelname,
+            "message": self._formatter.format(record),
+        }
+        if isinstance(record.msg, LogEvent):
+            entry["fields"] = record.msg.fields
+        return entry
+
+    def _frames(self, messages: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        frames: List[List[Dict[str, Any]]] = []
+        frame: List[Dict[str, Any]] = []
+        frame_bytes = 0
+        for message in messages:
+            message_bytes = len(message["message"])
+            if frame and frame_bytes + message_bytes > self._max_frame_bytes:
+                frames.append(frame)
+                frame = []
+                frame_bytes = 0
+            frame.append(message)
+            frame_bytes += message_bytes
+        if frame:
+            frames.append(frame)
+        return frames
 
     def stop(self):
-        self._log_queue.put(TestRunTerminalNode())
+        self._log_buffer.close()
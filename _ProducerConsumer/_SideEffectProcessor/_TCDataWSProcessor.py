@@ -1,6 +1,5 @@
 from typing import Dict
 from _CommunicationModules._WSCommModule import WSCommModule
-import trio_websocket # type: ignore
 import logging
 import json
 import trio
@@ -16,10 +15,13 @@ class TCDataWSProcessor:
 
     async def start(self):
         try:
-            async with trio.open_nursery() as nursery: # type: ignore
-                async for tc_data in self._tc_data_receive_channel:
-                    for connection in self._comm_module.all_ws_connection:  
-                        await connection.send_message(json.dumps(tc_data)) # type: ignore
+            async for tc_data in self._tc_data_receive_channel:
+                # COMMENT: Serialized once, each connection's writer sends it at its own pace. A
+                #   connection that falls behind only keeps the latest progress of each test case.
+                coalesce_key = None
+                if tc_data.get("event_type") == "progressUpdate":
+                    coalesce_key = ("progress", tc_data["patch"][0]["path"])  # type: ignore
+                self._comm_module.broadcast(json.dumps(tc_data), coalesce_key)
         except Exception as e:
             self._logger.error(e)
             raise
\ No newline at end of file
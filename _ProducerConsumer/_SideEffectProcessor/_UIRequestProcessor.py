@@ -1,46 +1,83 @@
+from _Application._DomainEntity._InteractionContext import InteractionContext
 from _CommunicationModules._WSCommModule import WSCommModule
+from typing import Any, Dict
 import json
-import trio_websocket  # type: ignore
 import trio
 import logging
 
 
 class UIRequestProcessor:
+    """
+    Brokers operator prompts. Prompts are sent as they arrive and responses are matched to their
+    prompt by InteractionContext id, so prompts from parallel test cases do not queue behind each
+    other. A prompt with a timeout is answered with its default response when the time is up, and
+    the UI is told to close it. Prompts still waiting for a response are sent again to every new
+    control connection, so none is lost while there is no control connection.
+    """
+
     def __init__(
         self,
-        ui_request_receive_channel: trio.MemoryReceiveChannel[str],
-        ui_response_receive_channel: trio.MemoryReceiveChannel[str],
+        ui_request_receive_channel: trio.MemoryReceiveChannel[InteractionContext],
+        ui_response_receive_channel: trio.MemoryReceiveChannel[Dict[str, Any]],
         comm_module: WSCommModule,
     ):
-        self._ui_request_receive_channel: trio.MemoryReceiveChannel[str] = (
+        self._ui_request_receive_channel: trio.MemoryReceiveChannel[InteractionContext] = (
             ui_request_receive_channel
         )
-        self._ui_response_receive_channel: trio.MemoryReceiveChannel[str] = (
+        self._ui_response_receive_channel: trio.MemoryReceiveChannel[Dict[str, Any]] = (
             ui_response_receive_channel
         )
         self._comm_module: WSCommModule = comm_module
+        self._pending: Dict[str, InteractionContext] = {}
         self._logger = logging.getLogger("UIRequestProcessor")
+        self._comm_module.on_control_connected(self._resend_pending)
 
-    # @property
-    # def ws_connection(self) -> trio_websocket.WebSocketConnection:
-    #     return self._ws_connection
-
-    # @ws_connection.setter
-    # def ws_connection(self, value: trio_websocket.WebSocketConnection) -> None:
-    #     self._ws_connection = value
+    @property
+    def pending(self) -> Dict[str, InteractionContext]:
+        return self._pending
 
     async def start(self):
         try:
-            async with trio.open_nursery() as nursery:  # type: ignore
-                async for ui_request in self._ui_request_receive_channel:
-                    await self._comm_module.ws_control_connection.send_message(  # type: ignore
-                        json.dumps(ui_request.message)  # type: ignore
-                    )
-                    response = await self._ui_response_receive_channel.receive()
-                    ui_request.response = response  # type: ignore
-        except trio_websocket.ConnectionClosed as e:
-            self._logger.error(f"WS connection closed with {self._comm_module.ws_control_connection}")
-            raise
+            async with trio.open_nursery() as nursery:
+                nursery.start_soon(self._handle_responses)
+                async for interaction_context in self._ui_request_receive_channel:
+                    self._pending[interaction_context.id] = interaction_context
+                    if not self._comm_module.send_to_control(
+                        json.dumps(interaction_context.message)
+                    ):
+                        self._logger.warning(
+                            f"Prompt {interaction_context.id} waits for a control connection"
+                        )
+                    if interaction_context.timeout is not None:
+                        nursery.start_soon(self._expire, interaction_context)
+                nursery.cancel_scope.cancel()
         except Exception as e:
-            print(e)
+            self._logger.error(e)
             raise
+
+    def _resend_pending(self):
+        for interaction_context in list(self._pending.values()):
+            self._comm_module.send_to_control(json.dumps(interaction_context.message))
+
+    async def _handle_responses(self):
+        async for response in self._ui_response_receive_channel:
+            interaction_context = self._pending.pop(response.get("id"), None)
+            if interaction_context is None:
+                self._logger.warning(
+                    f"Response to unknown or expired prompt {response.get('id')}"
+                )
+                continue
+            interaction_context.response = response.get("value")
+
+    async def _expire(self, interaction_context: InteractionContext):
+        assert interaction_context.timeout is not None
+        await trio.sleep(interaction_context.timeout)
+        if self._pending.pop(interaction_context.id, None) is None:
+            return
+        self._logger.info(
+            f"Prompt {interaction_context.id} timed out, using the default response"
+        )
+        interaction_context.expire()
+        self._comm_module.send_to_control(
+            json.dumps({"type": "prompt_cancel", "id": interaction_context.id})
+        )
@@ -1,5 +1,11 @@
 from _Node._BaseNode import BaseNode
 from _Node._TestRunTerminalNode import TestRunTerminalNode
+from _Node._TCNode import TCNode, ExecutionMode
+from _ProducerConsumer._WorkflowProcessor._ResourcePool import ResourcePool
+from _ProducerConsumer._WorkflowProcessor._NodeScheduler import CriticalPathScheduler
+from util.remote_worker import RemoteRunner
+from util.tracer import Tracer
+from util.latency import Stage
 import trio
 import logging
 
@@ -9,14 +15,76 @@ class NodeExecutor:
         self,
         receive_channel: trio.MemoryReceiveChannel[BaseNode],
         send_channel: trio.MemorySendChannel[BaseNode],
+        resource_pool: ResourcePool | None = None,
+        scheduler: CriticalPathScheduler | None = None,
+        remote_runner: RemoteRunner | None = None,
+        tracer: Tracer | None = None,
     ):
         self._receive_channel = receive_channel
         self._send_channel = send_channel
+        # COMMENT: Without a resource pool every received node is executed right away
+        self._resource_pool = resource_pool
+        # COMMENT: The scheduler ranks nodes waiting on the resource pool, and learns node durations
+        self._scheduler = scheduler
+        # COMMENT: When set, process mode test cases run on remote workers instead of the local pool
+        self._remote_runner = remote_runner
+        # COMMENT: Records a span per executed node, its queue wait includes waiting on the pool
+        self._tracer = tracer
         self._logger = logging.getLogger("NodeExecutor")
 
-    async def _execute_node(self, node: BaseNode):
+    @property
+    def resource_pool(self) -> ResourcePool | None:
+        return self._resource_pool
+
+    @property
+    def scheduler(self) -> CriticalPathScheduler | None:
+        return self._scheduler
+
+    @property
+    def remote_runner(self) -> RemoteRunner | None:
+        return self._remote_runner
+
+    @property
+    def tracer(self) -> Tracer | None:
+        return self._tracer
+
+    async def _execute_traced(self, node: BaseNode):
+        node.mark(Stage.STARTED)
         try:
             await node.execute()
+        finally:
+            node.mark(Stage.RETURNED)
+            if self._tracer is not None:
+                stages = node.stage_ns
+                self._tracer.record_node(
+                    node,
+                    stages.get(Stage.READY, stages[Stage.STARTED]),
+                    stages[Stage.STARTED],
+                    stages[Stage.RETURNED],
+                )
+
+    async def _execute_node(self, node: BaseNode):
+        if (
+            self._remote_runner is not None
+            and isinstance(node, TCNode)
+            and node.execution_mode is ExecutionMode.PROCESS
+        ):
+            node.process_runner = self._remote_runner
+        try:
+            if self._resource_pool is None:
+                await self._execute_traced(node)
+            else:
+                priority = (
+                    self._scheduler.priority(node) if self._scheduler is not None else 0.0
+                )
+                # COMMENT: Grouped by test run, panels sharing the executor take turns
+                async with self._resource_pool.acquire(
+                    node.resources, priority, node.run_id
+                ):
+                    start = trio.current_time()
+                    await self._execute_traced(node)
+                    if self._scheduler is not None:
+                        self._scheduler.record(node, trio.current_time() - start)
             await self._send_channel.send(node)
         # TODO: Need to handle BrokenResourceError and CloseResourceError properly, need to make sure the application does not crash, and able to recover from channel related errors
         except Exception as e:
@@ -27,6 +95,7 @@ class NodeExecutor:
         async with trio.open_nursery() as nursery:
             async with self._receive_channel:
                 async for node in self._receive_channel:
+                    node.mark(Stage.DEQUEUED)
                     nursery.start_soon(self._execute_node, node)
 
     async def stop(self):
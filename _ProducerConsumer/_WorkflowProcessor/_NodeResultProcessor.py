@@ -1,4 +1,5 @@
 from _Node._BaseNode import BaseNode
+from util.latency import LatencyRecorder, Stage
 import trio
 
 
@@ -7,16 +8,34 @@ class NodeResultProcessor:
         self,
         receive_channel: trio.MemoryReceiveChannel[BaseNode],
         send_channel: trio.MemorySendChannel[BaseNode],
+        latency_recorder: LatencyRecorder | None = None,
     ):
         self._receive_channel = receive_channel
         self._send_channel = send_channel
+        # COMMENT: Fed with the stage timestamps of every node once its result is handled
+        self._latency_recorder = latency_recorder
+
+    @property
+    def latency_recorder(self) -> LatencyRecorder | None:
+        return self._latency_recorder
+
+    async def _clear(self, node: BaseNode):
+        await node.set_cleared()
+        if self._latency_recorder is not None:
+            self._latency_recorder.record_node(node)
+
+    async def _fail(self, node: BaseNode):
+        if self._latency_recorder is not None:
+            self._latency_recorder.record_node(node)
+        await self._send_channel.send(node)
 
     # TODO: Write unit function for this
     async def start(self):
         async with trio.open_nursery() as nursery:
             async with self._receive_channel:
                 async for node in self._receive_channel:
+                    node.mark(Stage.RESULT_PROCESSED)
                     if node.result:
-                        nursery.start_soon(node.set_cleared)
+                        nursery.start_soon(self._clear, node)
                     else:
-                        nursery.start_soon(self._send_channel.send, node)
+                        nursery.start_soon(self._fail, node)
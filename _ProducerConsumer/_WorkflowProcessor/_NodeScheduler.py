@@ -0,0 +1,113 @@
+from typing import Dict, List, Tuple, TYPE_CHECKING
+from weakref import WeakKeyDictionary
+import json
+import os
+import logging
+
+if TYPE_CHECKING:
+    from _Node._BaseNode import BaseNode
+
+
+class DurationHistory:
+    """
+    Exponentially weighted average of node execution times, keyed by node name and optionally
+    persisted to a json file so that estimates carry over between runs.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        smoothing: float = 0.3,
+        default_duration: float = 1.0,
+    ) -> None:
+        self._path = path
+        self._smoothing = smoothing
+        self._default_duration = default_duration
+        self._durations: Dict[str, float] = {}
+        self._logger = logging.getLogger("DurationHistory")
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    @property
+    def durations(self) -> Dict[str, float]:
+        return self._durations
+
+    def duration(self, name: str) -> float:
+        return self._durations.get(name, self._default_duration)
+
+    def record(self, name: str, duration: float) -> None:
+        previous = self._durations.get(name)
+        if previous is None:
+            self._durations[name] = duration
+        else:
+            self._durations[name] = (
+                self._smoothing * duration + (1 - self._smoothing) * previous
+            )
+
+    def load(self) -> None:
+        assert self._path is not None, "DurationHistory has no file to load from"
+        try:
+            with open(self._path, "r") as history_file:
+                self._durations.update(json.load(history_file))
+        except (OSError, ValueError) as e:
+            self._logger.error(f"Failed to load duration history {self._path}: {e}")
+
+    def save(self) -> None:
+        if self._path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+            with open(self._path, "w") as history_file:
+                json.dump(self._durations, history_file)
+        except OSError as e:
+            self._logger.error(f"Failed to save duration history {self._path}: {e}")
+
+
+class CriticalPathScheduler:
+    """
+    Ranks ready nodes by the length of the longest path from the node to the end of the DAG,
+    weighted by the durations recorded in a DurationHistory. The rank is used as the waiting
+    priority in the ResourcePool, so under contention the node that starts the longest remaining
+    chain runs first.
+    """
+
+    def __init__(self, duration_history: DurationHistory | None = None) -> None:
+        self._duration_history = duration_history or DurationHistory()
+        # COMMENT: Ranks are computed once per node, the DAG of a test run does not change shape
+        #   while it executes. Weak keys let the ranks go away with the test run.
+        self._ranks: "WeakKeyDictionary[BaseNode, float]" = WeakKeyDictionary()
+
+    @property
+    def duration_history(self) -> DurationHistory:
+        return self._duration_history
+
+    def priority(self, node: "BaseNode") -> float:
+        rank = self._ranks.get(node)
+        if rank is not None:
+            return rank
+        # COMMENT: Iterative post-order over the dependents, deep chains must not hit the recursion limit
+        stack: List[Tuple["BaseNode", bool]] = [(node, False)]
+        while stack:
+            current, expanded = stack.pop()
+            if current in self._ranks:
+                continue
+            if expanded:
+                downstream = max(
+                    (self._ranks[dependent] for dependent in current.dependents),
+                    default=0.0,
+                )
+                self._ranks[current] = (
+                    self._duration_history.duration(current.name) + downstream
+                )
+            else:
+                stack.append((current, True))
+                for dependent in current.dependents:
+                    if dependent not in self._ranks:
+                        stack.append((dependent, False))
+        return self._ranks[node]
+
+    def record(self, node: "BaseNode", duration: float) -> None:
+        self._duration_history.record(node.name, duration)
+
+    def invalidate(self) -> None:
+        self._ranks.clear()
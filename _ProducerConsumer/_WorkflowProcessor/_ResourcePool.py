@@ -0,0 +1,162 @@
+from contextlib import asynccontextmanager, AsyncExitStack
+from typing import AsyncIterator, Deque, Dict, Hashable, Iterable, Any, List
+from collections import deque
+import itertools
+import heapq
+import trio
+import logging
+
+
+class PriorityLimiter:
+    """
+    A capacity limiter whose waiters are served highest priority first, and in arrival order
+    among waiters of equal priority. A released token is handed straight to the next waiter.
+
+    Waiters can belong to a group (e.g. the test run of a panel). Groups with waiters are served
+    round-robin, priorities only order the waiters within a group, so a large DAG cannot starve
+    the other panels sharing the executor.
+    """
+
+    def __init__(self, total_tokens: int) -> None:
+        if total_tokens < 1:
+            raise ValueError("total_tokens must be >= 1")
+        self._total_tokens = total_tokens
+        self._borrowed_tokens = 0
+        # COMMENT: group -> heap of [-priority, arrival, event], event is None once the waiter is cancelled
+        self._waiters: Dict[Hashable, List[List[Any]]] = {}
+        # COMMENT: Groups with waiters in the order they are served next
+        self._group_order: Deque[Hashable] = deque()
+        self._waiting = 0
+        self._arrival = itertools.count()
+
+    @property
+    def total_tokens(self) -> int:
+        return self._total_tokens
+
+    @property
+    def borrowed_tokens(self) -> int:
+        return self._borrowed_tokens
+
+    @property
+    def tasks_waiting(self) -> int:
+        return self._waiting
+
+    async def acquire(self, priority: float = 0.0, group: Hashable = None) -> None:
+        await trio.lowlevel.checkpoint_if_cancelled()
+        if self._borrowed_tokens < self._total_tokens and self._waiting == 0:
+            self._borrowed_tokens += 1
+            await trio.lowlevel.cancel_shielded_checkpoint()
+            return
+        event = trio.Event()
+        entry = [-priority, next(self._arrival), event]
+        waiters = self._waiters.get(group)
+        if waiters is None:
+            waiters = self._waiters[group] = []
+            self._group_order.append(group)
+        heapq.heappush(waiters, entry)
+        self._waiting += 1
+        try:
+            await event.wait()
+        except BaseException:
+            if event.is_set():
+                # COMMENT: the token was handed over just before the cancellation, pass it on
+                self.release()
+            else:
+                entry[2] = None
+                self._waiting -= 1
+            raise
+
+    def release(self) -> None:
+        while self._group_order:
+            group = self._group_order.popleft()
+            waiters = self._waiters[group]
+            event = None
+            while waiters and event is None:
+                _, _, event = heapq.heappop(waiters)
+            if waiters:
+                # COMMENT: Back of the line, the group's next waiter is served after the other groups'
+                self._group_order.append(group)
+            else:
+                del self._waiters[group]
+            if event is None:
+                # COMMENT: Only cancelled waiters were left in the group
+                continue
+            self._waiting -= 1
+            event.set()
+            return
+        self._borrowed_tokens -= 1
+
+
+class ResourcePool:
+    """
+    Concurrency limits applied by the NodeExecutor.
+
+    max_concurrency caps the number of nodes executing at the same time, resource_limits caps the
+    number of nodes holding a named resource (e.g. {"dmm": 1}) at the same time. Resources that
+    are not listed in resource_limits are not limited. Waiting groups are served round-robin,
+    within a group waiters with a higher priority are served first, waiters with the same
+    priority are served in arrival order.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int | None = None,
+        resource_limits: Dict[str, int] | None = None,
+    ) -> None:
+        self._global_limiter: PriorityLimiter | None = (
+            PriorityLimiter(max_concurrency) if max_concurrency is not None else None
+        )
+        self._resource_limiters: Dict[str, PriorityLimiter] = {
+            name: PriorityLimiter(limit)
+            for name, limit in (resource_limits or {}).items()
+        }
+        self._logger = logging.getLogger("ResourcePool")
+
+    @property
+    def max_concurrency(self) -> int | None:
+        if self._global_limiter is None:
+            return None
+        return self._global_limiter.total_tokens
+
+    @property
+    def resource_limits(self) -> Dict[str, int]:
+        return {
+            name: limiter.total_tokens
+            for name, limiter in self._resource_limiters.items()
+        }
+
+    @asynccontextmanager
+    async def acquire(
+        self, resources: Iterable[str], priority: float = 0.0, group: Hashable = None
+    ) -> AsyncIterator[None]:
+        # COMMENT: Resources are always acquired in sorted order so that two nodes sharing
+        #   resources can never deadlock each other. The global slot is acquired last, a node
+        #   queued on a busy instrument must not occupy a slot other nodes could run in.
+        limiters = [
+            self._resource_limiters[name]
+            for name in sorted(set(resources))
+            if name in self._resource_limiters
+        ]
+        if self._global_limiter is not None:
+            limiters.append(self._global_limiter)
+        async with AsyncExitStack() as stack:
+            for limiter in limiters:
+                await limiter.acquire(priority, group)
+                stack.callback(limiter.release)
+            yield
+
+    def statistics(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {}
+        if self._global_limiter is not None:
+            stats["global"] = self._limiter_statistics(self._global_limiter)
+        for name, limiter in self._resource_limiters.items():
+            stats[name] = self._limiter_statistics(limiter)
+        return stats
+
+    @staticmethod
+    def _limiter_statistics(limiter: PriorityLimiter) -> Dict[str, int]:
+        return {
+            "in_use": limiter.borrowed_tokens,
+            "limit": limiter.total_tokens,
+            "waiting": limiter.tasks_waiting,
+        }
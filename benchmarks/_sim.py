@@ -0,0 +1,93 @@
+# type: ignore
+from _Node._BaseNode import BaseNode, NodeState
+from typing import List
+import random
+import trio
+
+
+class SimNode(BaseNode):
+    """
+    A node that only sleeps for its duration, used to measure scheduling on virtual time.
+    """
+
+    def __init__(self, name: str, duration: float) -> None:
+        super().__init__(name)
+        self.duration = duration
+
+    @property
+    def state(self) -> NodeState:
+        return self._state
+
+    @state.setter
+    def state(self, value: NodeState) -> None:
+        self._state = value
+
+    async def execute(self):
+        self.state = NodeState.PROCESSING
+        await trio.sleep(self.duration)
+        self._result = True
+
+
+def random_layered_dag(
+    node_count: int, layers: int, max_fan_in: int, seed: int
+) -> List[SimNode]:
+    rng = random.Random(seed)
+    nodes: List[SimNode] = []
+    layer_of: List[int] = []
+    for i in range(node_count):
+        nodes.append(SimNode(f"n{i}", rng.choice([1, 1, 1, 2, 3, 5, 8])))
+        layer_of.append(rng.randrange(layers))
+    by_layer: List[List[SimNode]] = [[] for _ in range(layers)]
+    for node, layer in zip(nodes, layer_of):
+        by_layer[layer].append(node)
+    for layer in range(1, layers):
+        for node in by_layer[layer]:
+            for _ in range(rng.randint(0, max_fan_in)):
+                source_layer = rng.randrange(layer)
+                if by_layer[source_layer]:
+                    node.add_dependency(rng.choice(by_layer[source_layer]))
+    return nodes
+
+
+def chain_and_fan_dag(chain_length: int, fan_width: int) -> List[SimNode]:
+    # COMMENT: Many short independent nodes next to one long chain, FIFO tends to start the chain last
+    nodes: List[SimNode] = [SimNode(f"fan{i}", 1) for i in range(fan_width)]
+    previous = None
+    for i in range(chain_length):
+        node = SimNode(f"chain{i}", 2)
+        if previous is not None:
+            node.add_dependency(previous)
+        nodes.append(node)
+        previous = node
+    return nodes
+
+
+async def run_dag(nodes: List[SimNode], node_executor_factory) -> float:
+    """
+    Executes the DAG with the executor built by node_executor_factory(receive, send), returns the
+    makespan in (virtual) seconds.
+    """
+    node_send, node_receive = trio.open_memory_channel(len(nodes) + 1)
+    result_send, result_receive = trio.open_memory_channel(len(nodes) + 1)
+    node_executor = node_executor_factory(node_receive, result_send)
+
+    async def _schedule(node):
+        await node_send.send(node)
+
+    start = trio.current_time()
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(node_executor.start)
+        for node in nodes:
+            node.set_scheduling_callback(_schedule)
+        for node in nodes:
+            if not node.dependencies:
+                await node.check_dependency_and_schedule_self()
+        remaining = len(nodes)
+        async for node in result_receive:
+            await node.set_cleared()
+            remaining -= 1
+            if remaining == 0:
+                break
+        end = trio.current_time()
+        nursery.cancel_scope.cancel()
+    return end - start
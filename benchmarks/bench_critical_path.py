@@ -0,0 +1,59 @@
+# type: ignore
+"""
+Makespan of FIFO versus critical-path priority scheduling on synthetic DAGs.
+
+Run from the repository root: python -m benchmarks.bench_critical_path
+Durations are simulated on trio's MockClock, so the benchmark finishes instantly and the
+makespans are exact.
+"""
+from _ProducerConsumer._WorkflowProcessor._NodeExecutor import NodeExecutor
+from _ProducerConsumer._WorkflowProcessor._ResourcePool import ResourcePool
+from _ProducerConsumer._WorkflowProcessor._NodeScheduler import (
+    CriticalPathScheduler,
+    DurationHistory,
+)
+from benchmarks._sim import random_layered_dag, chain_and_fan_dag, run_dag
+import trio.testing
+import logging
+import trio
+
+
+def makespan(dag_factory, workers: int, critical_path: bool) -> float:
+    nodes = dag_factory()
+    scheduler = None
+    if critical_path:
+        # COMMENT: Durations "from past runs", the scheduler has seen every node once
+        history = DurationHistory()
+        for node in nodes:
+            history.record(node.name, node.duration)
+        scheduler = CriticalPathScheduler(history)
+
+    def _executor(receive_channel, send_channel):
+        return NodeExecutor(
+            receive_channel, send_channel, ResourcePool(max_concurrency=workers), scheduler
+        )
+
+    clock = trio.testing.MockClock(autojump_threshold=0)
+    return trio.run(run_dag, nodes, _executor, clock=clock)
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    cases = [
+        ("chain 20 + fan 60", lambda: chain_and_fan_dag(20, 60)),
+        ("layered 200/8", lambda: random_layered_dag(200, 8, 3, seed=1)),
+        ("layered 500/20", lambda: random_layered_dag(500, 20, 2, seed=2)),
+        ("layered 1000/30", lambda: random_layered_dag(1000, 30, 3, seed=3)),
+    ]
+    print(f"{'dag':<20}{'workers':>8}{'fifo':>10}{'crit-path':>12}{'speedup':>10}")
+    for label, dag_factory in cases:
+        for workers in (2, 4, 8):
+            fifo = makespan(dag_factory, workers, critical_path=False)
+            ranked = makespan(dag_factory, workers, critical_path=True)
+            print(
+                f"{label:<20}{workers:>8}{fifo:>10.1f}{ranked:>12.1f}{fifo / ranked:>9.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
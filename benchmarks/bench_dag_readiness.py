@@ -0,0 +1,92 @@
+# type: ignore
+"""
+Cost of propagating readiness through 10k-node DAGs.
+
+Run from the repository root: python -m benchmarks.bench_dag_readiness
+ScanNode re-implements the previous all()-scan readiness check for comparison.
+"""
+from _Node._BaseNode import NodeState
+from benchmarks._sim import SimNode, random_layered_dag
+from collections import deque
+from typing import List
+import logging
+import time
+import trio
+
+
+class ScanNode(SimNode):
+    async def set_cleared(self) -> None:
+        self.state = NodeState.CLEARED
+        for dep in self._dependents:
+            await dep.check_dependency_and_schedule_self()
+
+    async def check_dependency_and_schedule_self(self) -> None:
+        if all(dep.is_cleared() for dep in self.dependencies):
+            self.state = NodeState.READY_TO_PROCESS
+            await self._scheduling_callback(self)
+
+
+def fan_in_dag(node_cls, node_count: int) -> List[SimNode]:
+    # COMMENT: Same shape as a test run, the terminal node depends on every test case
+    terminal = node_cls("terminal", 0)
+    nodes = [node_cls(f"n{i}", 0) for i in range(node_count)]
+    for node in nodes:
+        terminal._dependencies.append(node)
+        node._dependents.append(terminal)
+        terminal._pending_dependencies += 1
+    return nodes + [terminal]
+
+
+def layered_dag(node_cls, node_count: int) -> List[SimNode]:
+    nodes = random_layered_dag(node_count, 50, 4, seed=0)
+    if node_cls is SimNode:
+        return nodes
+    for node in nodes:
+        node.__class__ = node_cls
+    return nodes
+
+
+async def clear_all(nodes: List[SimNode]) -> int:
+    # COMMENT: First in, first out, like the executor channel
+    scheduled = deque()
+
+    async def _schedule(node):
+        scheduled.append(node)
+
+    for node in nodes:
+        node.set_scheduling_callback(_schedule)
+    for node in nodes:
+        if not node.dependencies:
+            await node.check_dependency_and_schedule_self()
+    cleared = 0
+    while scheduled:
+        node = scheduled.popleft()
+        await node.set_cleared()
+        cleared += 1
+    return cleared
+
+
+def measure(dag_factory, node_cls, node_count: int) -> float:
+    nodes = dag_factory(node_cls, node_count)
+    start = time.perf_counter()
+    cleared = trio.run(clear_all, nodes)
+    elapsed = time.perf_counter() - start
+    assert cleared == len(nodes), f"only {cleared} of {len(nodes)} nodes cleared"
+    return elapsed
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    print(f"{'dag':<12}{'nodes':>8}{'all()-scan':>14}{'counters':>12}{'speedup':>10}")
+    for label, dag_factory in (("fan-in", fan_in_dag), ("layered", layered_dag)):
+        for node_count in (1000, 10000):
+            scan = measure(dag_factory, ScanNode, node_count)
+            counters = measure(dag_factory, SimNode, node_count)
+            print(
+                f"{label:<12}{node_count:>8}{scan * 1000:>12.1f}ms"
+                f"{counters * 1000:>10.1f}ms{scan / counters:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
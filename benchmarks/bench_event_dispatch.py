@@ -0,0 +1,90 @@
+# type: ignore
+"""
+Event throughput through SystemEventBus and ApplicationStateManager.
+
+Run from the repository root: python -m benchmarks.bench_event_dispatch
+ChainStateManager re-implements the previous isinstance chain, with a nursery per send, for
+comparison.
+"""
+from _Application._AppStateManager import ApplicationStateManager
+from _Application._SystemEventBus import SystemEventBus
+from _Application._SystemEvent import (
+    BaseEvent,
+    NewTestCaseEvent,
+    NewTestExecutionEvent,
+    ParameterUpdateEvent,
+    ProgressUpdateEvent,
+    TestCaseFailEvent,
+    TestRunTerminationEvent,
+)
+import logging
+import time
+import trio
+
+
+class ChainStateManager:
+    def __init__(self, event_bus, tc_data_send_channel):
+        self._tc_data_send_channel = tc_data_send_channel
+        event_bus.subscribe(self.event_handler)
+
+    async def event_handler(self, event: BaseEvent):
+        if isinstance(event, NewTestCaseEvent):
+            event_type = "newTC"
+        elif isinstance(event, ParameterUpdateEvent):
+            event_type = "parameterUpdate"
+        elif isinstance(event, ProgressUpdateEvent):
+            event_type = "progressUpdate"
+        elif isinstance(event, NewTestExecutionEvent):
+            event_type = "newExecution"
+        elif isinstance(event, TestRunTerminationEvent):
+            event_type = "testRunTermination"
+        elif isinstance(event, TestCaseFailEvent):
+            event_type = "testCaseFail"
+        else:
+            return
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(
+                self._tc_data_send_channel.send,
+                {"type": "tc_data", "event_type": event_type, "payload": event.payload},
+            )
+
+
+async def drain(receive_channel):
+    async for _ in receive_channel:
+        pass
+
+
+async def publish_events(make_manager, event_count: int) -> float:
+    bus = SystemEventBus()
+    send_channel, receive_channel = trio.open_memory_channel(0)
+    make_manager(bus, send_channel)
+    # COMMENT: Parameter updates are the most frequent event during a test run
+    event = ParameterUpdateEvent({"tc_id": "tc", "execution_id": 0, "parameter": {}})
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(drain, receive_channel)
+        start = time.perf_counter()
+        for _ in range(event_count):
+            await bus.publish(event)
+        elapsed = time.perf_counter() - start
+        nursery.cancel_scope.cancel()
+    return elapsed
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    event_count = 50_000
+
+    def chain(bus, send_channel):
+        ChainStateManager(bus, send_channel)
+
+    def typed(bus, send_channel):
+        ApplicationStateManager(bus, send_channel, None, None, None)
+
+    print(f"{'dispatch':>10}{'events/s':>12}")
+    for name, make_manager in (("isinstance", chain), ("typed", typed)):
+        elapsed = trio.run(publish_events, make_manager, event_count)
+        print(f"{name:>10}{event_count / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
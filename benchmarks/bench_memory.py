@@ -0,0 +1,80 @@
+# type: ignore
+"""
+Memory held by a test run of 500 test cases measuring 100 parameters each, 50k parameters in
+total: the TCNodes with their data models, executions and parameters, as traced by tracemalloc.
+
+Run from the repository root: python -m benchmarks.bench_memory
+"""
+from _Application._DomainEntity._ProfileTemplate import ProfileTemplate
+from _Application._DomainEntity._Parameter import SingleValueParameter
+from _Node._TCNode import TCNode
+import tracemalloc
+import gc
+import trio
+
+TEST_CASES = 500
+PARAMETERS = 100
+
+
+def _task(data_model=None):
+    return True
+
+
+class WideProfile:
+    def __init__(self):
+        self.test_case_list = []
+        for i in range(TEST_CASES):
+            tc = TCNode(_task, f"Test Case {i}")
+            if i:
+                tc.add_dependency(self.test_case_list[i - 1])
+            self.test_case_list.append(tc)
+
+
+class SilentEventBus:
+    async def publish(self, event):
+        pass
+
+
+async def run(template: ProfileTemplate, parameters: int = PARAMETERS):
+    tc_nodes = template.instantiate()
+    event_bus = SilentEventBus()
+    for tc_node in tc_nodes:
+        data_model = tc_node.data_model
+        data_model.event_bus = event_bus
+        await data_model.add_execution()
+        for i in range(parameters):
+            parameter = SingleValueParameter(f"parameter {i}")
+            parameter.start_measurement(5.0)
+            parameter.stop_measurement(5.0 + i / 1000, "", True)
+            await data_model.update_parameter(parameter)
+    return tc_nodes
+
+
+def held(template: ProfileTemplate, parameters: int):
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tc_nodes = trio.run(run, template, parameters)
+    gc.collect()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tc_nodes
+    return after - before, peak - before
+
+
+def main():
+    template = ProfileTemplate.compile(WideProfile)
+    # COMMENT: A first run warms up the caches (loggers, interned names) that outlive a run
+    trio.run(run, template)
+    nodes_only, _ = held(template, 0)
+    total, peak = held(template, PARAMETERS)
+    parameters = TEST_CASES * PARAMETERS
+    print(f"{TEST_CASES} test cases, {parameters} parameters")
+    print(f"{'held by the run':<30}{total / 2**20:>8.2f} MiB")
+    print(f"{'peak while running':<30}{peak / 2**20:>8.2f} MiB")
+    print(f"{'per test case, no parameters':<30}{nodes_only / TEST_CASES:>8.0f} B")
+    print(f"{'per parameter':<30}{(total - nodes_only) / parameters:>8.0f} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# type: ignore
+"""
+Throughput of N panels sharing one executor: test runs executed one panel after another versus
+all panels at once, each panel owning its own instrument and the executor capped at 2 nodes
+per panel.
+
+Run from the repository root: python -m benchmarks.bench_multi_panel
+Durations are simulated on trio's MockClock.
+"""
+from _ProducerConsumer._WorkflowProcessor._NodeExecutor import NodeExecutor
+from _ProducerConsumer._WorkflowProcessor._ResourcePool import ResourcePool
+from benchmarks._sim import SimNode, random_layered_dag, run_dag
+import trio.testing
+import logging
+import trio
+
+
+class PanelNode(SimNode):
+    @property
+    def run_id(self):
+        return self.panel
+
+
+def panel_dag(panel: int):
+    nodes = random_layered_dag(100, 8, 2, seed=panel)
+    for i, node in enumerate(nodes):
+        node.__class__ = PanelNode
+        node.panel = f"panel{panel}"
+        if i % 2 == 0:
+            node._resources = frozenset({f"dmm{panel}"})
+    return nodes
+
+
+def makespan(nodes, panel_count: int) -> float:
+    resource_limits = {f"dmm{panel}": 1 for panel in range(panel_count)}
+
+    def _executor(receive_channel, send_channel):
+        return NodeExecutor(
+            receive_channel,
+            send_channel,
+            ResourcePool(max_concurrency=2 * panel_count, resource_limits=resource_limits),
+        )
+
+    clock = trio.testing.MockClock(autojump_threshold=0)
+    return trio.run(run_dag, nodes, _executor, clock=clock)
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    print(f"{'panels':>8}{'one by one':>12}{'parallel':>10}{'speedup':>10}")
+    for panel_count in (1, 2, 4, 8):
+        one_by_one = sum(
+            makespan(panel_dag(panel), panel_count) for panel in range(panel_count)
+        )
+        parallel = makespan(
+            [node for panel in range(panel_count) for node in panel_dag(panel)],
+            panel_count,
+        )
+        print(
+            f"{panel_count:>8}{one_by_one:>12.1f}{parallel:>10.1f}{one_by_one / parallel:>9.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
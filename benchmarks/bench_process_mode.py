@@ -0,0 +1,67 @@
+# type: ignore
+"""
+CPU-bound test cases: the same batch of fib calls run concurrently in worker threads (serialized
+by the GIL) and in the ProcessRunner's worker processes.
+
+Run from the repository root: python -m benchmarks.bench_process_mode
+"""
+from util.process_runner import ProcessRunner
+from functools import partial
+import logging
+import os
+import time
+import trio
+
+
+def fib(n: int) -> int:
+    if n <= 1:
+        return n
+    return fib(n - 1) + fib(n - 2)
+
+
+class _NullDataModel:
+    id = "bench"
+    name = "bench"
+
+    async def update_parameter(self, parameter):
+        pass
+
+    async def update_progress(self, progress):
+        pass
+
+
+async def run_threads(task_count: int, n: int) -> float:
+    start = time.perf_counter()
+    async with trio.open_nursery() as nursery:
+        for _ in range(task_count):
+            nursery.start_soon(partial(trio.to_thread.run_sync, fib, n))
+    return time.perf_counter() - start
+
+
+async def run_processes(runner: ProcessRunner, task_count: int, n: int) -> float:
+    start = time.perf_counter()
+    async with trio.open_nursery() as nursery:
+        for _ in range(task_count):
+            nursery.start_soon(runner.run, fib, {"n": n}, (), _NullDataModel())
+    return time.perf_counter() - start
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    task_count = os.cpu_count() or 1
+    runner = ProcessRunner()
+    try:
+        # COMMENT: Start the workers before timing
+        trio.run(run_processes, runner, task_count, 1)
+        print(f"{task_count} tasks, {task_count} cores")
+        print(f"{'n':>4}{'threads':>12}{'processes':>12}")
+        for n in (24, 27, 30):
+            threads = trio.run(run_threads, task_count, n)
+            processes = trio.run(run_processes, runner, task_count, n)
+            print(f"{n:>4}{threads * 1000:>10.0f}ms{processes * 1000:>10.0f}ms")
+    finally:
+        runner.shutdown()
+
+
+if __name__ == "__main__":
+    main()
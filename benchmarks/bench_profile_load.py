@@ -0,0 +1,62 @@
+# type: ignore
+"""
+Unit-to-unit changeover: loading a test run from the profile class versus from a compiled
+ProfileTemplate.
+
+Run from the repository root: python -m benchmarks.bench_profile_load
+"""
+from _Application._DomainEntity._ProfileTemplate import ProfileTemplate
+from _Application._DomainEntity._TestRun import TestRun
+from _Application._SystemEventBus import SystemEventBus
+from _Node._TCNode import TCNode
+import logging
+import random
+import time
+import trio
+
+
+def _task(data_model=None, upstream=None):
+    return True
+
+
+def make_profile(node_count: int):
+    class SyntheticProfile:
+        def __init__(self):
+            rng = random.Random(node_count)
+            self.test_case_list = []
+            for i in range(node_count):
+                tc = TCNode(_task, f"Test Case {i}", f"tc{i}")
+                for _ in range(min(i, 3)):
+                    tc.add_dependency(self.test_case_list[rng.randrange(i)])
+                self.test_case_list.append(tc)
+
+    return SyntheticProfile
+
+
+async def load(test_profile, node_count: int) -> float:
+    node_send, _node_receive = trio.open_memory_channel(node_count + 1)
+    ui_send, _ui_receive = trio.open_memory_channel(0)
+    test_run = TestRun(node_send, ui_send, SystemEventBus(), test_profile)
+    start = time.perf_counter()
+    await test_run.load_test_case()
+    return time.perf_counter() - start
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    print(f"{'nodes':>8}{'profile class':>16}{'template':>12}{'compile once':>15}")
+    for node_count in (100, 1000, 5000):
+        profile = make_profile(node_count)
+        from_class = trio.run(load, profile, node_count)
+        start = time.perf_counter()
+        template = ProfileTemplate.compile(profile)
+        compile_time = time.perf_counter() - start
+        from_template = trio.run(load, template, node_count)
+        print(
+            f"{node_count:>8}{from_class * 1000:>14.1f}ms{from_template * 1000:>10.1f}ms"
+            f"{compile_time * 1000:>13.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# type: ignore
+"""
+Switching between product profiles at loadTC: loading 24 profiles of 300 test cases each from a
+profile directory with and without the on-disk template cache, then switching between them once
+loaded. Profile modules are dropped from sys.modules before each pass, as after a restart.
+
+Run from the repository root: python -m benchmarks.bench_profile_switch
+"""
+from _Application._ProfileRegistry import ProfileRegistry
+import tempfile
+import time
+import sys
+import os
+
+PROFILES = 24
+NODES = 300
+
+HEADER = """
+from _Node._TCNode import TCNode
+
+
+def measure(data_model=None):
+    return True
+
+
+def check(upstream, data_model=None):
+    return upstream
+"""
+
+
+def write_profile(directory: str, index: int) -> None:
+    lines = [HEADER, f"class Product{index}TestProfile:", "    def __init__(self):", "        nodes = []"]
+    for i in range(NODES):
+        if i % 3 == 0:
+            lines.append(f"        nodes.append(TCNode(measure, 'TC {i}', 'upstream'))")
+        else:
+            lines.append(f"        nodes.append(TCNode(check, 'TC {i}', 'upstream'))")
+            lines.append(f"        nodes[{i}].add_dependency(nodes[{i - i % 3}])")
+    lines.append("        self.test_case_list = nodes")
+    with open(os.path.join(directory, f"product{index}.py"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def forget_modules() -> None:
+    for index in range(PROFILES):
+        sys.modules.pop(f"tag_profile_product{index}", None)
+
+
+def load_all(directory: str, cache: str | None) -> float:
+    forget_modules()
+    registry = ProfileRegistry([directory], cache)
+    start = time.perf_counter()
+    for index in range(PROFILES):
+        registry.template(f"product{index}")
+    return (time.perf_counter() - start) / PROFILES
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        profiles = os.path.join(directory, "profiles")
+        os.mkdir(profiles)
+        for index in range(PROFILES):
+            write_profile(profiles, index)
+        cache = os.path.join(directory, "cache")
+
+        print(f"{'compile, no cache':<40}{load_all(profiles, None) * 1000:>8.2f} ms per profile")
+        print(f"{'compile, writing the cache':<40}{load_all(profiles, cache) * 1000:>8.2f} ms per profile")
+        print(f"{'restart, from the cache':<40}{load_all(profiles, cache) * 1000:>8.2f} ms per profile")
+
+        registry = ProfileRegistry([profiles], cache)
+        for index in range(PROFILES):
+            registry.template(f"product{index}")
+        start = time.perf_counter()
+        for _ in range(100):
+            for index in range(PROFILES):
+                registry.template(f"product{index}")
+        elapsed = (time.perf_counter() - start) / (100 * PROFILES)
+        print(f"{'switch, loaded':<40}{elapsed * 1e6:>8.2f} us per profile")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# type: ignore
+"""
+Query latency of the historical results index: yield, Cpk and failure Pareto over a synthetic
+history of 200k units of 20 test cases with 2M measurements.
+
+Run from the repository root: python -m benchmarks.bench_result_index
+"""
+from _Application._ResultIndex import ResultIndex
+import numpy as np
+import tempfile
+import json
+import time
+
+UNITS = 200_000
+TEST_CASES = 20
+PARAMETERS_PER_UNIT = 10
+
+
+def build(directory: str) -> ResultIndex:
+    index = ResultIndex(directory)
+    for i in range(TEST_CASES):
+        index._code(f"Test Case {i}")
+    for i in range(PARAMETERS_PER_UNIT):
+        index._code(f"parameter {i}")
+    with open(index._names_path, "w") as f:
+        json.dump(index._names, f)
+    rng = np.random.default_rng(0)
+    units = UNITS
+    index.units.append(
+        {
+            "timestamp": np.arange(units, dtype=np.float64),
+            "test_case": rng.integers(0, TEST_CASES, units),
+            "attempts": rng.choice([1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 3], units),
+            "failed": (rng.random(units) < 0.01).astype(np.uint8),
+        }
+    )
+    measurements = units * PARAMETERS_PER_UNIT
+    values = rng.normal(5.0, 0.1, measurements)
+    index.measurements.append(
+        {
+            "timestamp": np.repeat(np.arange(units, dtype=np.float64), PARAMETERS_PER_UNIT),
+            "test_case": np.repeat(rng.integers(0, TEST_CASES, units), PARAMETERS_PER_UNIT),
+            "parameter": TEST_CASES + np.tile(np.arange(PARAMETERS_PER_UNIT), units),
+            "value": values,
+            "passed": (np.abs(values - 5.0) < 0.25).astype(np.uint8),
+        }
+    )
+    return index
+
+
+def timed(label: str, query, repeat: int = 20):
+    query()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = query()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<50}{elapsed * 1000:>8.2f} ms")
+    return result
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        build(directory)
+        # COMMENT: Reopened, the queries read the column files through memory maps
+        index = ResultIndex(directory)
+        print(f"{len(index.units)} units, {len(index.measurements)} measurements")
+        timed("yield, one test case, last 10k units", lambda: index.yield_("Test Case 4", last=10_000))
+        timed("yield, all units", lambda: index.yield_())
+        timed(
+            "cpk, one parameter of one test case",
+            lambda: index.cpk("Test Case 4", "parameter 3", lsl=4.5, usl=5.5),
+        )
+        timed("failure pareto by test case", lambda: index.failure_pareto())
+        timed("failure pareto by parameter", lambda: index.failure_pareto(by="parameter"))
+
+
+if __name__ == "__main__":
+    main()
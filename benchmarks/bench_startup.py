@@ -0,0 +1,113 @@
+# type: ignore
+"""
+Controller reboot: time from launching the application process until the websocket server
+accepts connections. Measured as shipped, where plotting, numpy and the test profiles are
+imported on first use and the result index is opened once the server runs, and with those
+modules imported and the index rebuilt from a 20k unit result log at construction, as before.
+
+Run from the repository root: python -m benchmarks.bench_startup
+"""
+from _Application._ResultStore import ResultStore
+import subprocess
+import statistics
+import shutil
+import tempfile
+import socket
+import json
+import sys
+import os
+import time
+
+REPEAT = 5
+PORT = 8000
+UNITS = 20_000
+
+# COMMENT: Imported at startup before they were deferred
+EAGER_MODULES = ["sample_profile.profile", "graphviz", "numpy", "_Application._ResultIndex"]
+
+CHILD = """
+import time, sys, os
+start = time.perf_counter()
+for module in sys.argv[2:]:
+    __import__(module)
+from _Application._Application import Application, _open_result_index
+import trio
+imported = time.perf_counter()
+log_path = os.path.join(sys.argv[1], "test_results.bin")
+app = Application(result_store_path=log_path, latency_dump_file=None)
+if len(sys.argv) > 2:
+    _open_result_index(log_path + ".index", log_path, os.path.getsize(log_path))
+constructed = time.perf_counter()
+print(json.dumps({"import": imported - start, "construct": constructed - imported}), flush=True)
+trio.run(app.start)
+""".replace("import time", "import json, time", 1)
+
+
+def wait_for_port(deadline: float) -> None:
+    while time.perf_counter() < deadline:
+        try:
+            with socket.create_connection(("localhost", PORT), timeout=0.1):
+                return
+        except OSError:
+            time.sleep(0.002)
+    raise TimeoutError(f"Nothing listening on port {PORT}")
+
+
+def write_log(path: str) -> None:
+    store = ResultStore(path)
+    for unit in range(UNITS):
+        tr_id = f"tr{unit}"
+        tc_id = f"{tr_id}-tc"
+        store.append({"kind": "test_case", "tc_id": tc_id, "name": "Test Case", "tr_id": tr_id})
+        store.append({"kind": "execution", "tc_id": tc_id, "execution_id": 0, "timestamp": unit})
+        store.append(
+            {
+                "kind": "parameter",
+                "tc_id": tc_id,
+                "execution_id": 0,
+                "name": "voltage",
+                "value": {"measured": 5.0, "result": True},
+            }
+        )
+        store.append({"kind": "test_run_end", "tr_id": tr_id, "timestamp": unit})
+    store._write(store._pending)
+
+
+def launch(directory: str, modules) -> dict:
+    start = time.perf_counter()
+    child = subprocess.Popen(
+        [sys.executable, "-c", CHILD, directory, *modules],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    try:
+        wait_for_port(start + 30)
+        ready = time.perf_counter() - start
+        timings = json.loads(child.stdout.readline())
+    finally:
+        child.terminate()
+        child.wait()
+    timings["ready"] = ready
+    return timings
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        write_log(os.path.join(directory, "test_results.bin"))
+        # COMMENT: The index is removed before every start, so that it is rebuilt from the log
+        for label, modules in (("deferred", []), ("at startup", EAGER_MODULES)):
+            runs = []
+            for _ in range(REPEAT):
+                shutil.rmtree(os.path.join(directory, "test_results.bin.index"), ignore_errors=True)
+                runs.append(launch(directory, modules))
+            print(
+                f"{label:<16}"
+                f"import {statistics.median(r['import'] for r in runs) * 1000:>7.1f} ms   "
+                f"construct {statistics.median(r['construct'] for r in runs) * 1000:>7.1f} ms   "
+                f"accepting connections {statistics.median(r['ready'] for r in runs) * 1000:>7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,14 @@ class ConcreteNode(BaseNode):
         super().__init__(name)
         self._result = None
 
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, value: NodeState):
+        self._state = value
+
     async def execute(self):
         self._result = True
 
@@ -232,4 +240,67 @@ def test_error_property():
 
     node.error = value_error
     with pytest.raises(ValueError):
-        raise node.error   
\ No newline at end of file
+        raise node.error   
+
+
+async def test_pending_dependencies_count(mocker):
+    node1 = ConcreteNode("Node 1")
+    node2 = ConcreteNode("Node 2")
+    node3 = ConcreteNode("Node 3")
+
+    await node3.set_cleared()
+    node1.add_dependency(node2)
+    node1.add_dependency(node3)
+    assert node1.pending_dependencies == 1
+
+    on_ready_callback = mocker.AsyncMock()
+    node1.set_scheduling_callback(on_ready_callback)
+
+    await node2.set_cleared()
+    assert node1.pending_dependencies == 0
+    on_ready_callback.assert_called_once_with(node1)
+
+    # COMMENT: clearing a node twice must not be counted twice
+    await node2.set_cleared()
+    assert node1.pending_dependencies == 0
+    assert on_ready_callback.call_count == 1
+
+    await node2.reset()
+    assert node1.pending_dependencies == 1
+
+    node1.remove_dependency(node2)
+    assert node1.pending_dependencies == 0
+
+
+async def test_add_dependency_to_cleared_node_blocks_dependents():
+    node1 = ConcreteNode("Node 1")
+    node2 = ConcreteNode("Node 2")
+    node3 = ConcreteNode("Node 3")
+
+    node1.add_dependency(node2)
+    await node2.set_cleared()
+    assert node1.ready_to_process()
+
+    node2.add_dependency(node3)
+    assert not node2.is_cleared()
+    assert not node1.ready_to_process()
+
+
+def test_ids_are_integers_formatted_for_the_ui():
+    first, second = ConcreteNode("Node 1"), ConcreteNode("Node 2")
+    assert isinstance(first.int_id, int) and second.int_id > first.int_id
+    assert first.id != second.id
+    assert first.id.endswith(f"-{first.int_id:x}")
+    assert first.id.split("-")[0] == second.id.split("-")[0]
+
+
+def test_tc_nodes_and_their_data_are_slotted():
+    from _Node._TCNode import TCNode
+    from _Application._DomainEntity._Parameter import SingleValueParameter
+    from _Application._DomainEntity._TestCaseDataModel import TestExecution
+
+    tc_node = TCNode(lambda: True, "Test Case 1")
+    for obj in (tc_node, tc_node.data_model, TestExecution(0), SingleValueParameter("p1")):
+        assert not hasattr(obj, "__dict__")
+    assert tc_node.data_model.id == tc_node.id
+    assert not ConcreteNode().resources and tc_node.resources is ConcreteNode().resources
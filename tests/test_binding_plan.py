@@ -0,0 +1,81 @@
+# type: ignore
+from _Application._DomainEntity._ProfileTemplate import ProfileTemplate
+from _Application._DomainEntity import _TestCaseDataModel
+from _Application._SystemEventBus import SystemEventBus
+from _Node._BindingPlan import BindingPlan
+from _Node._TCNode import TCNode
+from util.ui_request import UIRequest
+from functools import partial
+import pytest
+
+
+def measure(data_model: _TestCaseDataModel.TestCaseDataModel, ui_request: UIRequest, supply_voltage, gain=1, *args, **kwargs):
+    return supply_voltage * gain
+
+
+async def async_measure(supply_voltage):
+    return supply_voltage
+
+
+def supply():
+    return 5
+
+
+def test_binding_plan_classifies_arguments():
+    plan = BindingPlan.for_callable(measure)
+    assert plan.data_model_args == ("data_model",)
+    assert plan.ui_request_args == ("ui_request",)
+    assert plan.dependency_args == ("supply_voltage", "gain")
+    assert plan.required_dependency_args == ("supply_voltage",)
+    assert not plan.is_coroutine
+    assert BindingPlan.for_callable(async_measure).is_coroutine
+
+
+def test_binding_plan_is_cached_per_callable():
+    assert BindingPlan.for_callable(measure) is BindingPlan.for_callable(measure)
+    bound = partial(measure, gain=2)
+    assert BindingPlan.for_callable(bound) is BindingPlan.for_callable(bound)
+
+
+def test_validate_reports_unbound_arguments():
+    node = TCNode(measure, "Measure")
+    with pytest.raises(ValueError, match="supply_voltage"):
+        node.validate_bindings()
+
+    node.add_dependency(TCNode(supply, "Supply", "supply_voltage"))
+    node.validate_bindings()
+
+
+def test_validate_reports_ambiguous_labels():
+    node = TCNode(async_measure, "Measure")
+    node.add_dependency(TCNode(supply, "Supply 1", "supply_voltage"))
+    node.add_dependency(TCNode(supply, "Supply 2", "supply_voltage"))
+    with pytest.raises(ValueError, match="several dependencies"):
+        node.validate_bindings()
+
+
+def test_profile_with_unbound_arguments_fails_to_compile():
+    class BrokenProfile:
+        def __init__(self):
+            self.test_case_list = [TCNode(async_measure, "Measure")]
+
+    with pytest.raises(ValueError):
+        ProfileTemplate.compile(BrokenProfile)
+
+
+async def test_execute_passes_dependency_results(mocker):
+    supply_node = TCNode(supply, "Supply", "supply_voltage")
+    node = TCNode(async_measure, "Measure")
+    node.add_dependency(supply_node)
+    for tc_node in (supply_node, node):
+        tc_node.event_bus = SystemEventBus()
+        tc_node.data_model.parent_test_run = mocker.Mock()
+
+    await supply_node.execute()
+    await node.execute()
+    assert node.result == 5
+
+    # COMMENT: a retry reuses the resolved bindings
+    supply_node._result = 7
+    await node.execute()
+    assert node.result == 7
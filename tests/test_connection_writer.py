@@ -0,0 +1,113 @@
+# type: ignore
+from _CommunicationModules._ConnectionWriter import ConnectionWriter
+from _ProducerConsumer._SideEffectProcessor._TCDataWSProcessor import TCDataWSProcessor
+import json
+import trio
+
+
+class FakeConnection:
+    def __init__(self, send_delay=0):
+        self.send_delay = send_delay
+        self.messages = []
+        self.closed = False
+
+    async def send_message(self, message):
+        await trio.sleep(self.send_delay)
+        self.messages.append(message)
+
+    async def aclose(self):
+        self.closed = True
+
+
+async def test_slow_connection_does_not_delay_fast_one(autojump_clock):
+    fast, slow = FakeConnection(), FakeConnection(send_delay=1)
+    writers = [ConnectionWriter(fast), ConnectionWriter(slow)]
+    async with trio.open_nursery() as nursery:
+        for writer in writers:
+            nursery.start_soon(writer.run)
+        start = trio.current_time()
+        for i in range(5):
+            for writer in writers:
+                assert writer.put(f"m{i}")
+        await trio.sleep(0.1)
+        assert fast.messages == [f"m{i}" for i in range(5)]
+        assert trio.current_time() - start < 1
+        await trio.sleep(10)
+        assert slow.messages == fast.messages
+        nursery.cancel_scope.cancel()
+
+
+async def test_coalescing_downsamples_a_lagging_connection(autojump_clock):
+    connection = FakeConnection(send_delay=1)
+    writer = ConnectionWriter(connection)
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(writer.run)
+        writer.put("first")
+        await trio.sleep(0.5)
+        for progress in range(10):
+            writer.put(f"progress {progress}", ("progress", "tc1"))
+        writer.put("last")
+        await trio.sleep(10)
+        nursery.cancel_scope.cancel()
+    assert connection.messages == ["first", "progress 9", "last"]
+    assert writer.statistics()["coalesced"] == 9
+
+
+async def test_overflow_drops_connection(autojump_clock):
+    connection = FakeConnection(send_delay=100)
+    writer = ConnectionWriter(connection, max_queue_size=3)
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(writer.run)
+        results = [writer.put(f"m{i}") for i in range(5)]
+        await trio.sleep(1)
+    assert results == [True, True, True, False, False]
+    assert connection.closed
+    assert writer.closed
+    assert not writer.put("late")
+
+
+async def test_send_timeout_drops_connection(autojump_clock):
+    connection = FakeConnection(send_delay=100)
+    writer = ConnectionWriter(connection, send_timeout=2)
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(writer.run)
+        writer.put("m0")
+        await trio.sleep(5)
+    assert connection.closed
+    assert connection.messages == []
+
+
+async def test_control_connection_is_not_dropped_when_flooded(autojump_clock):
+    connection = FakeConnection(send_delay=10)
+    writer = ConnectionWriter(connection, max_queue_size=3, send_timeout=2, droppable=False)
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(writer.run)
+        assert all(writer.put(f"m{i}") for i in range(10))
+        await trio.sleep(200)
+        nursery.cancel_scope.cancel()
+    assert not connection.closed
+    assert connection.messages == [f"m{i}" for i in range(10)]
+
+
+class RecordingCommModule:
+    def __init__(self):
+        self.broadcasts = []
+
+    def broadcast(self, message, coalesce_key=None):
+        self.broadcasts.append((message, coalesce_key))
+
+
+async def test_tc_data_is_serialized_once_with_progress_key():
+    send_channel, receive_channel = trio.open_memory_channel(10)
+    comm_module = RecordingCommModule()
+    processor = TCDataWSProcessor(receive_channel, comm_module)
+    progress = {"type": "tc_data", "event_type": "progressUpdate", "seq": 1, "patch": [{"op": "replace", "path": "/test_cases/tc1/progress", "value": 50}]}
+    fail = {"type": "tc_data", "event_type": "testCaseFail", "seq": 2, "patch": [{"op": "replace", "path": "/test_cases/tc1/tc_state", "value": "failed"}]}
+    async with send_channel:
+        await send_channel.send(progress)
+        await send_channel.send(fail)
+    await processor.start()
+    assert comm_module.broadcasts == [
+        (json.dumps(progress), ("progress", "/test_cases/tc1/progress")),
+        (json.dumps(fail), None),
+    ]
@@ -0,0 +1,93 @@
+# type: ignore
+from util.latency import LatencyHistogram, LatencyRecorder, Stage
+from _ProducerConsumer._WorkflowProcessor._NodeExecutor import NodeExecutor
+from _ProducerConsumer._WorkflowProcessor._NodeResultProcessor import NodeResultProcessor
+from _ProducerConsumer._WorkflowProcessor._ResourcePool import ResourcePool
+from _CommunicationModules._WSCommModule import WSCommModule
+from _Application._AppStateManager import ApplicationStateManager
+from _Application._SystemEventBus import SystemEventBus
+from tests.test_tracer import SleepNode
+from tests.test_ws_comm_module import FakeRequest, FakeWebSocket
+import pytest
+import json
+import trio
+
+
+def test_percentiles_are_within_a_bucket():
+    histogram = LatencyHistogram()
+    for ms in range(1, 1001):
+        histogram.record(ms * 1_000_000)
+    assert histogram.count == 1000
+    for p in (50, 95, 99):
+        assert histogram.percentile(p) == pytest.approx(p * 10_000_000, rel=0.1)
+    assert histogram.percentile(100) == 1_000_000_000
+    summary = histogram.summary()
+    assert summary["min"] == 1.0 and summary["max"] == 1000.0
+    assert summary["mean"] == pytest.approx(500.5)
+    assert LatencyHistogram().summary()["p50"] is None
+
+
+def test_instrument_time_excludes_operator_waits():
+    recorder = LatencyRecorder()
+    node = SleepNode("node", 0)
+    node._stage_ns = {
+        Stage.READY: 0,
+        Stage.DEQUEUED: 1_000,
+        Stage.STARTED: 2_000,
+        Stage.THREAD_ACQUIRED: 3_000,
+        Stage.RETURNED: 10_000,
+    }
+    node._ui_wait_ns = 4_000
+    recorder.record_node(node)
+    summary = recorder.summary()
+    assert summary["instrument"]["max"] == 3_000 / 1e6
+    assert summary["ui_wait"]["max"] == 4_000 / 1e6
+    assert summary["thread_wait"]["max"] == 1_000 / 1e6
+    # COMMENT: The node was never cleared
+    assert "total" not in summary
+
+
+async def test_stages_from_ready_to_cleared():
+    recorder = LatencyRecorder()
+    executor_send, executor_receive = trio.open_memory_channel(10)
+    result_send, result_receive = trio.open_memory_channel(10)
+    failure_send, failure_receive = trio.open_memory_channel(10)
+    executor = NodeExecutor(executor_receive, result_send, ResourcePool(max_concurrency=1))
+    processor = NodeResultProcessor(result_receive, failure_send, recorder)
+    first, second = SleepNode("first", 0.05), SleepNode("second", 0.05)
+    for node in (first, second):
+        node.set_scheduling_callback(executor_send.send)
+        await node.check_dependency_and_schedule_self()
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(executor.start)
+        nursery.start_soon(processor.start)
+        await trio.sleep(0.5)
+        nursery.cancel_scope.cancel()
+    assert list(first.stage_ns) == [
+        Stage.READY, Stage.DEQUEUED, Stage.STARTED, Stage.RETURNED, Stage.RESULT_PROCESSED, Stage.CLEARED
+    ]
+    summary = recorder.summary()
+    assert summary["total"]["count"] == 2
+    assert summary["run"]["min"] >= 50
+    # COMMENT: The second node waited on the pool while the first one ran
+    assert summary["resource_wait"]["max"] >= 45
+
+
+async def test_latency_over_the_websocket_and_dump(tmp_path, autojump_clock):
+    recorder = LatencyRecorder()
+    recorder.histogram("run").record(2_000_000)
+    asm = ApplicationStateManager(SystemEventBus(), None, None, None, None)
+    comm_module = WSCommModule(None, None, asm, latency_recorder=recorder)
+    ws = FakeWebSocket()
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(comm_module.ws_connection_handler, FakeRequest(ws))
+        await ws.incoming_send.send(json.dumps({"type": "latency"}))
+        await trio.sleep(1)
+        await ws.incoming_send.aclose()
+    replies = [m for m in ws.sent if m["type"] == "latency"]
+    assert replies[0]["stages"]["run"]["count"] == 1
+    assert replies[0]["stages"]["run"]["p99"] == 2.0
+
+    path = tmp_path / "latency.json"
+    recorder.dump(str(path))
+    assert json.loads(path.read_text()) == replies[0]["stages"]
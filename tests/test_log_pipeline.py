@@ -0,0 +1,72 @@
+# type: ignore
+from _ProducerConsumer._SideEffectProcessor._LogProcessor import LogProcessor
+from util.log_buffer import LogBuffer
+import logging
+import json
+import trio
+
+
+def make_record(level, message):
+    return logging.LogRecord("test", level, __file__, 1, message, None, None)
+
+
+def test_overflow_drops_lowest_severity_first():
+    log_buffer = LogBuffer(capacity=3)
+    log_buffer.put(make_record(logging.DEBUG, "debug 1"))
+    log_buffer.put(make_record(logging.ERROR, "error 1"))
+    log_buffer.put(make_record(logging.DEBUG, "debug 2"))
+    log_buffer.put(make_record(logging.INFO, "info 1"))
+    log_buffer.put(make_record(logging.WARNING, "warning 1"))
+    # COMMENT: Lower than everything left in the buffer, dropped itself
+    log_buffer.put(make_record(logging.DEBUG, "debug 3"))
+    assert len(log_buffer) == 3
+    assert log_buffer.statistics()["dropped"] == {"DEBUG": 3}
+    log_buffer.put(make_record(logging.CRITICAL, "critical 1"))
+    assert log_buffer.statistics()["dropped"] == {"DEBUG": 3, "INFO": 1}
+    batch = trio.run(log_buffer.get_batch, 10, 0)
+    assert [r.getMessage() for r in batch] == ["error 1", "warning 1", "critical 1"]
+
+
+async def test_get_batch_is_woken_from_a_thread(autojump_clock):
+    log_buffer = LogBuffer()
+
+    def emit():
+        for i in range(5):
+            log_buffer.put(make_record(logging.INFO, f"message {i}"))
+
+    batches = []
+    async with trio.open_nursery() as nursery:
+
+        async def consume():
+            batches.append(await log_buffer.get_batch(100, 0.1))
+
+        nursery.start_soon(consume)
+        await trio.sleep(1)
+        assert not batches
+        await trio.to_thread.run_sync(emit)
+    assert [r.getMessage() for r in batches[0]] == [f"message {i}" for i in range(5)]
+
+
+class RecordingCommModule:
+    def __init__(self):
+        self.frames = []
+
+    def broadcast(self, message, coalesce_key=None):
+        self.frames.append(json.loads(message))
+
+
+async def test_processor_sends_size_bounded_batches(autojump_clock):
+    log_buffer = LogBuffer()
+    comm_module = RecordingCommModule()
+    processor = LogProcessor(log_buffer, comm_module, max_batch_records=50, max_frame_bytes=2000)
+    for i in range(120):
+        log_buffer.put(make_record(logging.INFO, f"message {i:03d}"))
+    processor.stop()
+    await processor.start()
+    messages = [m for frame in comm_module.frames for m in frame["messages"]]
+    assert len(messages) == 120
+    assert all(m["message"].endswith(f"message {i:03d}") for i, m in enumerate(messages))
+    assert all(
+        sum(len(m["message"]) for m in frame["messages"]) <= 2000 for frame in comm_module.frames
+    )
+    assert len(comm_module.frames) < 20
@@ -0,0 +1,30 @@
+# type: ignore
+from util.log_setup import setup_logging
+import logging
+import gzip
+
+
+def test_records_are_written_by_the_listener_and_rotated(tmp_path):
+    root_logger = logging.getLogger()
+    handlers, level = list(root_logger.handlers), root_logger.level
+    log_file = tmp_path / "app.log"
+    listener = setup_logging(str(log_file), max_bytes=2000, backup_count=2, console=False)
+    listener.start()
+    try:
+        logger = logging.getLogger("TestLogSetup")
+        for i in range(100):
+            logger.info(f"line {i:03d}")
+        logging.getLogger("trio-websocket").info("filtered out")
+    finally:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        root_logger.handlers = handlers
+        root_logger.setLevel(level)
+    archives = sorted(tmp_path.glob("app.log.*.gz"))
+    assert len(archives) == 2
+    with gzip.open(archives[0], "rt") as archive:
+        assert "TestLogSetup - INFO - line" in archive.read()
+    content = log_file.read_text()
+    assert "line 099" in content
+    assert "filtered out" not in content
@@ -1,5 +1,6 @@
 # type: ignore
-from _ProducerConsumer.node_executor import NodeExecutor
+from _ProducerConsumer._WorkflowProcessor._NodeExecutor import NodeExecutor
+from _ProducerConsumer._WorkflowProcessor._ResourcePool import ResourcePool
 from _Node._BaseNode import BaseNode
 import trio
 import trio.testing
@@ -55,4 +56,25 @@ async def test_process_receive_channel(mocker):
 
     await node_executor.start()
 
-    NodeExecutor._execute_node.assert_called_once_with(mock_node)
\ No newline at end of file
+    NodeExecutor._execute_node.assert_called_once_with(mock_node)
+
+@pytest.mark.trio
+async def test_execute_node_holds_declared_resources(mocker):
+    resource_pool = ResourcePool(resource_limits={"dmm": 1})
+    node_executor = NodeExecutor(
+        node_executor_receive_channel, result_processor_send_channel, resource_pool
+    )
+    mock_node = mocker.Mock(spec=BaseNode)
+    mock_node.name = "MockNode"
+    mock_node.resources = frozenset(["dmm"])
+
+    async def _execute():
+        assert resource_pool.statistics()["dmm"]["in_use"] == 1
+
+    mock_node.execute.side_effect = _execute
+
+    await node_executor._execute_node(mock_node)
+
+    mock_node.execute.assert_called_once()
+    assert resource_pool.statistics()["dmm"]["in_use"] == 0
+    assert await result_processor_receive_channel.receive() == mock_node
@@ -0,0 +1,104 @@
+# type: ignore
+from _Node._BaseNode import BaseNode, NodeState
+from _Node._NodeGraph import NodeGraph
+import random
+import pytest
+
+
+class ConcreteNode(BaseNode):
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, value: NodeState):
+        self._state = value
+
+    async def execute(self):
+        self._result = True
+
+
+def assert_topological(graph: NodeGraph):
+    for node in graph.nodes:
+        for dependency in node.dependencies:
+            assert dependency._topo_index < node._topo_index
+
+
+def test_connected_nodes_share_a_graph():
+    node1 = ConcreteNode("Node 1")
+    node2 = ConcreteNode("Node 2")
+    node3 = ConcreteNode("Node 3")
+    node4 = ConcreteNode("Node 4")
+    assert node1.graph is None
+
+    node1.add_dependency(node2)
+    node3.add_dependency(node4)
+    assert node1.graph is node2.graph
+    assert node1.graph is not node3.graph
+
+    node2.add_dependency(node3)
+    graph = node1.graph
+    assert all(node.graph is graph for node in (node1, node2, node3, node4))
+    assert len(graph) == 4
+    assert graph.topological_order() == [node4, node3, node2, node1]
+
+
+def test_duplicate_edge_is_ignored():
+    node1 = ConcreteNode("Node 1")
+    node2 = ConcreteNode("Node 2")
+    node1.add_dependency(node2)
+    node1.add_dependency(node2)
+    assert node1.dependencies == [node2]
+    assert node1.pending_dependencies == 1
+
+
+def test_cycle_is_rejected_and_graph_unchanged():
+    nodes = [ConcreteNode(f"Node {i}") for i in range(4)]
+    for previous, node in zip(nodes, nodes[1:]):
+        node.add_dependency(previous)
+    order = nodes[0].graph.topological_order()
+
+    with pytest.raises(ValueError):
+        nodes[0].add_dependency(nodes[3])
+    with pytest.raises(ValueError):
+        nodes[0].add_dependency(nodes[0])
+
+    assert nodes[0].dependencies == []
+    assert nodes[0].graph.topological_order() == order
+
+
+def test_remove_dependency_allows_reverse_edge():
+    node1 = ConcreteNode("Node 1")
+    node2 = ConcreteNode("Node 2")
+    node1.add_dependency(node2)
+    node1.remove_dependency(node2)
+    node2.add_dependency(node1)
+    assert node1.graph.topological_order() == [node1, node2]
+
+
+def test_random_inserts_keep_a_topological_order():
+    rng = random.Random(0)
+    nodes = [ConcreteNode(f"Node {i}") for i in range(200)]
+    # COMMENT: edges only go from a lower rank to a higher one, nodes are inserted in shuffled order
+    rank = list(range(200))
+    rng.shuffle(rank)
+    for _ in range(1000):
+        a, b = rng.sample(nodes, 2)
+        ra, rb = rank[nodes.index(a)], rank[nodes.index(b)]
+        dependency, dependent = (a, b) if ra < rb else (b, a)
+        dependent.add_dependency(dependency)
+        with pytest.raises(ValueError):
+            dependency.add_dependency(dependent)
+    graphs = {node.graph for node in nodes if node.graph is not None}
+    for graph in graphs:
+        assert_topological(graph)
+
+
+def test_deep_chain_does_not_recurse():
+    nodes = [ConcreteNode(f"Node {i}") for i in range(20000)]
+    # COMMENT: inserted back to front, the cycle check at the end walks the whole chain
+    for i in range(len(nodes) - 1, 0, -1):
+        nodes[i].add_dependency(nodes[i - 1])
+    with pytest.raises(ValueError):
+        nodes[0].add_dependency(nodes[-1])
+    assert_topological(nodes[0].graph)
@@ -0,0 +1,99 @@
+# type: ignore
+from _ProducerConsumer._WorkflowProcessor._NodeScheduler import (
+    CriticalPathScheduler,
+    DurationHistory,
+)
+from _ProducerConsumer._WorkflowProcessor._ResourcePool import ResourcePool
+from _Node._BaseNode import BaseNode, NodeState
+import trio
+
+
+class ConcreteNode(BaseNode):
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, value: NodeState):
+        self._state = value
+
+    async def execute(self):
+        self._result = True
+
+
+def test_duration_history_smoothing():
+    history = DurationHistory(smoothing=0.5, default_duration=2.0)
+    assert history.duration("Test Case 1") == 2.0
+    history.record("Test Case 1", 4.0)
+    assert history.duration("Test Case 1") == 4.0
+    history.record("Test Case 1", 2.0)
+    assert history.duration("Test Case 1") == 3.0
+
+
+def test_duration_history_persistence(tmp_path):
+    path = str(tmp_path / "data" / "durations.json")
+    history = DurationHistory(path)
+    history.record("Test Case 1", 1.5)
+    history.save()
+    assert DurationHistory(path).duration("Test Case 1") == 1.5
+
+
+def test_critical_path_priority():
+    history = DurationHistory(default_duration=1.0)
+    history.record("tc1", 5.0)
+    scheduler = CriticalPathScheduler(history)
+
+    tc1 = ConcreteNode("tc1")
+    tc2 = ConcreteNode("tc2")
+    tc3 = ConcreteNode("tc3")
+    tc4 = ConcreteNode("tc4")
+    # COMMENT: tc4 -> tc2 -> tc1 is the long chain, tc3 -> tc1 is short
+    tc1.add_dependency(tc2)
+    tc1.add_dependency(tc3)
+    tc2.add_dependency(tc4)
+
+    assert scheduler.priority(tc1) == 5.0
+    assert scheduler.priority(tc2) == 6.0
+    assert scheduler.priority(tc3) == 6.0
+    assert scheduler.priority(tc4) == 7.0
+
+
+def test_critical_path_priority_deep_chain():
+    scheduler = CriticalPathScheduler()
+    nodes = [ConcreteNode(f"n{i}") for i in range(5000)]
+    for previous, node in zip(nodes, nodes[1:]):
+        node._dependencies.append(previous)
+        previous._dependents.append(node)
+    assert scheduler.priority(nodes[0]) == 5000.0
+
+
+async def test_waiters_are_served_by_priority(autojump_clock):
+    pool = ResourcePool(max_concurrency=1)
+    order = []
+
+    async def _job(name, priority):
+        async with pool.acquire([], priority):
+            order.append(name)
+            await trio.sleep(1)
+
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(_job, "first", 0.0)
+        await trio.sleep(0.1)
+        nursery.start_soon(_job, "low", 1.0)
+        await trio.sleep(0.1)
+        nursery.start_soon(_job, "high", 10.0)
+        await trio.sleep(0.1)
+        nursery.start_soon(_job, "low 2", 1.0)
+    assert order == ["first", "high", "low", "low 2"]
+
+
+async def test_cancelled_waiter_does_not_leak_token(autojump_clock):
+    pool = ResourcePool(max_concurrency=1)
+    async with pool.acquire([]):
+        with trio.move_on_after(1):
+            async with pool.acquire([]):
+                pass
+        assert pool.statistics()["global"]["waiting"] == 0
+    assert pool.statistics()["global"]["in_use"] == 0
+    async with pool.acquire([]):
+        assert pool.statistics()["global"]["in_use"] == 1
@@ -0,0 +1,22 @@
+# type: ignore
+from util.output_path import output_path
+import pytest
+import os
+
+
+def test_bare_file_names_are_joined(tmp_path):
+    assert output_path(str(tmp_path), "trace.json") == os.path.join(str(tmp_path), "trace.json")
+
+
+@pytest.mark.parametrize("file_name", ["", ".", "..", "../trace.json", "sub/trace.json", "/etc/passwd"])
+def test_paths_are_rejected(tmp_path, file_name):
+    with pytest.raises(ValueError):
+        output_path(str(tmp_path), file_name)
+
+
+def test_symlink_out_of_the_directory_is_rejected(tmp_path):
+    directory = tmp_path / "output"
+    directory.mkdir()
+    (directory / "trace.json").symlink_to(tmp_path / "elsewhere.json")
+    with pytest.raises(ValueError):
+        output_path(str(directory), "trace.json")
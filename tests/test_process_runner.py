@@ -0,0 +1,101 @@
+# type: ignore
+from _Application._DomainEntity import _TestCaseDataModel
+from _Node._TCNode import TCNode, ExecutionMode
+from util.process_runner import ProcessRunner
+from util.ui_request import UIRequest
+import pytest
+import trio
+import os
+
+
+def fib(n: int) -> int:
+    if n <= 1:
+        return n
+    return fib(n - 1) + fib(n - 2)
+
+
+def cpu_task(n, data_model: _TestCaseDataModel.TestCaseDataModel):
+    data_model.update_progress(50)
+    data_model.update_parameter({"name": "fib", "value": fib(n)})
+    data_model.update_progress(100)
+    return fib(n), os.getpid()
+
+
+def failing_task():
+    raise RuntimeError("worker failure")
+
+
+class RecordingDataModel:
+    def __init__(self):
+        self.id = "tc"
+        self.name = "Test Case"
+        self.updates = []
+
+    async def update_parameter(self, parameter):
+        self.updates.append(("parameter", parameter))
+
+    async def update_progress(self, progress):
+        self.updates.append(("progress", progress))
+
+
+@pytest.fixture
+def runner():
+    runner = ProcessRunner(max_workers=2)
+    yield runner
+    runner.shutdown()
+
+
+async def test_result_and_updates_come_back(runner):
+    data_model = RecordingDataModel()
+    result, pid = await runner.run(cpu_task, {"n": 15}, ("data_model",), data_model)
+    assert result == 610
+    assert pid != os.getpid()
+    assert data_model.updates == [
+        ("progress", 50),
+        ("parameter", {"name": "fib", "value": 610}),
+        ("progress", 100),
+    ]
+
+
+async def test_worker_exception_is_raised(runner):
+    with pytest.raises(RuntimeError, match="worker failure"):
+        await runner.run(failing_task, {}, (), RecordingDataModel())
+
+
+async def test_waiting_calls_take_no_worker_threads(runner):
+    limiter = trio.to_thread.current_default_thread_limiter()
+    data_models = [RecordingDataModel() for _ in range(50)]
+    borrowed = []
+    async with trio.open_nursery() as nursery:
+        for data_model in data_models:
+            nursery.start_soon(runner.run, cpu_task, {"n": 10}, ("data_model",), data_model)
+        await trio.sleep(0.2)
+        borrowed.append(limiter.borrowed_tokens)
+    # COMMENT: Updates are demultiplexed to their call
+    assert all(data_model.updates[-1] == ("progress", 100) for data_model in data_models)
+    assert all(len(data_model.updates) == 3 for data_model in data_models)
+    assert borrowed == [0]
+
+
+def test_process_mode_rejects_unsupported_callables():
+    async def coroutine_task():
+        return 1
+
+    def ui_task(ui_request: UIRequest):
+        return 1
+
+    def local_task():
+        return 1
+
+    for task in (coroutine_task, ui_task, local_task):
+        with pytest.raises(ValueError):
+            TCNode(task, "tc", execution_mode=ExecutionMode.PROCESS).validate_bindings()
+
+
+def test_process_mode_accepts_module_level_function():
+    def supply():
+        return 15
+
+    tc_node = TCNode(cpu_task, "tc", execution_mode=ExecutionMode.PROCESS)
+    tc_node.add_dependency(TCNode(supply, "supply", "n"))
+    tc_node.validate_bindings()
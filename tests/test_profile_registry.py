@@ -0,0 +1,142 @@
+# type: ignore
+from _Application._ProfileRegistry import ProfileRegistry
+from _Application._DomainEntity._ProfileTemplate import ProfileTemplate
+from sample_profile.profile import SampleTestProfile
+import threading
+import textwrap
+import pytest
+import json
+import time
+import sys
+
+PROFILE = """
+from _Node._TCNode import TCNode
+
+
+def measure():
+    return {value}
+
+
+def check(measured):
+    return measured > 0
+
+
+class WidgetTestProfile:
+    def __init__(self):
+        tc1 = TCNode(measure, "Measure", "measured")
+        tc2 = TCNode(check, "Check")
+        tc2.add_dependency(tc1)
+        self.test_case_list = [tc1, tc2]
+"""
+
+
+@pytest.fixture
+def profile_directory(tmp_path):
+    directory = tmp_path / "profiles"
+    directory.mkdir()
+    (directory / "widget.py").write_text(PROFILE.format(value=1))
+    (directory / "helpers.py").write_text("def helper():\n    pass\n")
+    (directory / "_private.py").write_text("class HiddenProfile:\n    pass\n")
+    yield directory
+    sys.modules.pop("tag_profile_widget", None)
+
+
+def test_profiles_are_discovered_without_importing_them(profile_directory):
+    registry = ProfileRegistry([str(profile_directory)])
+    assert {"sample", "widget"} <= set(registry.names())
+    assert "helpers" not in registry.names() and "_private" not in registry.names()
+    assert "tag_profile_widget" not in sys.modules
+    assert registry.template("sample").name == "SampleTestProfile"
+    template = registry.template("sample_profile.profile:SampleTestProfile")
+    assert template.node_specs == registry.template("sample").node_specs
+    with pytest.raises(KeyError):
+        registry.template("no_such_profile")
+    with pytest.raises(AttributeError):
+        registry.template("sample_profile.profile:NoSuchProfile")
+
+
+def test_templates_are_compiled_once_and_cached_on_disk(profile_directory, tmp_path):
+    cache = str(tmp_path / "cache")
+    registry = ProfileRegistry([str(profile_directory)], cache)
+    template = registry.template("widget")
+    assert [spec.name for spec in template.node_specs] == ["Measure", "Check"]
+    assert registry.template("widget") is template
+    assert registry.statistics() == {"memory_hits": 1, "disk_hits": 0, "compiles": 1}
+
+    # COMMENT: A restart finds the compiled template on disk
+    restarted = ProfileRegistry([str(profile_directory)], cache)
+    assert restarted.template("widget").node_specs == template.node_specs
+    assert restarted.statistics()["disk_hits"] == 1
+
+    # COMMENT: A changed profile file has another hash
+    (profile_directory / "widget.py").write_text(PROFILE.format(value=2))
+    sys.modules.pop("tag_profile_widget")
+    changed = ProfileRegistry([str(profile_directory)], cache)
+    assert changed.template("widget").node_specs[0].callable_object() == 2
+    assert changed.statistics()["compiles"] == 1
+
+
+def test_stale_cache_is_compiled_again(tmp_path):
+    cache = tmp_path / "cache"
+    registry = ProfileRegistry(cache_directory=str(cache))
+    registry.template("sample")
+    (cache_file,) = cache.iterdir()
+    cache_file.write_text(cache_file.read_text().replace("sync_task1", "no_such_task"))
+    restarted = ProfileRegistry(cache_directory=str(cache))
+    assert restarted.template("sample").node_specs == ProfileRegistry().template("sample").node_specs
+    assert restarted.statistics()["compiles"] == 1
+
+
+@pytest.mark.parametrize(
+    "corrupt",
+    [
+        # COMMENT: A cycle, an unknown dependency and a duplicate name
+        lambda specs: specs[0].update(dependencies=[1]),
+        lambda specs: specs[1].update(dependencies=[7]),
+        lambda specs: specs[1].update(name=specs[0]["name"]),
+    ],
+)
+def test_invalid_cache_is_compiled_again(profile_directory, tmp_path, corrupt):
+    cache = tmp_path / "cache"
+    ProfileRegistry([str(profile_directory)], str(cache)).template("widget")
+    (cache_file,) = cache.iterdir()
+    data = json.loads(cache_file.read_text())
+    corrupt(data["node_specs"])
+    cache_file.write_text(json.dumps(data))
+    with pytest.raises(ValueError):
+        ProfileTemplate.from_dict(data)
+    restarted = ProfileRegistry([str(profile_directory)], str(cache))
+    assert [spec.name for spec in restarted.template("widget").node_specs] == ["Measure", "Check"]
+    assert restarted.statistics()["compiles"] == 1
+
+
+def test_concurrent_loads_compile_once(monkeypatch):
+    compile = ProfileTemplate.compile.__func__
+
+    def slow_compile(cls, test_profile):
+        time.sleep(0.1)
+        return compile(cls, test_profile)
+
+    monkeypatch.setattr(ProfileTemplate, "compile", classmethod(slow_compile))
+    registry = ProfileRegistry()
+    templates = []
+    threads = [
+        threading.Thread(target=lambda: templates.append(registry.template("sample")))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(templates) == 4 and all(t is templates[0] for t in templates)
+    assert registry.statistics()["compiles"] == 1
+
+
+def test_invalid_profile_fails_to_load(profile_directory):
+    (profile_directory / "broken.py").write_text(
+        PROFILE.replace('"Measure", "measured"', '"Measure"').replace("Widget", "Broken")
+    )
+    registry = ProfileRegistry([str(profile_directory)])
+    with pytest.raises(ValueError):
+        registry.template("broken")
+    sys.modules.pop("tag_profile_broken", None)
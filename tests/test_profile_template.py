@@ -0,0 +1,83 @@
+# type: ignore
+from _Application._DomainEntity._ProfileTemplate import ProfileTemplate
+from sample_profile.profile import SampleTestProfile, sync_task1, sync_task3
+from _Node._TCNode import TCNode
+import pytest
+import json
+
+
+class LabelledProfile:
+    def __init__(self):
+        tc1 = TCNode(sync_task1, "Test Case 1", "task1_parameter", resources=["dmm"])
+        tc2 = TCNode(sync_task1, "Test Case 2", "task2_parameter")
+        tc3 = TCNode(sync_task3, "Test Case 3", description="adds things up")
+        tc3.add_dependency(tc2)
+        tc3.add_dependency(tc1)
+        self.test_case_list = [tc3, tc1, tc2]
+
+
+def test_compile_sample_profile_in_topological_order():
+    template = ProfileTemplate.compile(SampleTestProfile)
+    assert template.name == "SampleTestProfile"
+    assert len(template) == 7
+    for index, spec in enumerate(template.node_specs):
+        assert all(dependency < index for dependency in spec.dependencies)
+
+
+def test_instantiate_creates_fresh_nodes():
+    template = ProfileTemplate.compile(LabelledProfile)
+    first = template.instantiate()
+    second = template.instantiate()
+
+    assert [node.name for node in first] == [node.name for node in second]
+    assert not set(first) & set(second)
+    assert len({node.id for node in first + second}) == 6
+
+    tc3 = first[-1]
+    assert tc3.name == "Test Case 3"
+    assert tc3.data_model.description == "adds things up"
+    assert {d.name for d in tc3.dependencies} == {"Test Case 1", "Test Case 2"}
+    assert tc3.pending_dependencies == 2
+    assert tc3.graph is first[0].graph
+    assert {
+        label: node.name for label, node in tc3.dependency_bindings.items()
+    } == {"task1_parameter": "Test Case 1", "task2_parameter": "Test Case 2"}
+    by_name = {node.name: node for node in first}
+    assert by_name["Test Case 1"].resources == frozenset(["dmm"])
+    assert by_name["Test Case 2"].resources == frozenset()
+
+
+def test_instantiated_dag_rejects_cycles():
+    tc_nodes = ProfileTemplate.compile(LabelledProfile).instantiate()
+    with pytest.raises(ValueError):
+        tc_nodes[0].add_dependency(tc_nodes[-1])
+
+
+def test_dependency_outside_profile_is_rejected():
+    class IncompleteProfile:
+        def __init__(self):
+            tc1 = TCNode(sync_task1, "Test Case 1")
+            tc2 = TCNode(sync_task1, "Test Case 2")
+            tc1.add_dependency(tc2)
+            self.test_case_list = [tc1]
+
+    with pytest.raises(ValueError):
+        ProfileTemplate.compile(IncompleteProfile)
+
+
+def test_template_round_trips_through_a_dict():
+    template = ProfileTemplate.compile(LabelledProfile)
+    data = template.to_dict()
+    assert data["node_specs"][0]["callable"] == "sample_profile.profile:sync_task1"
+    restored = ProfileTemplate.from_dict(json.loads(json.dumps(data)))
+    assert restored.name == template.name
+    assert restored.node_specs == template.node_specs
+
+
+def test_template_with_a_lambda_cannot_be_serialised():
+    class LambdaProfile:
+        def __init__(self):
+            self.test_case_list = [TCNode(lambda: True, "Test Case 1")]
+
+    with pytest.raises(ValueError):
+        ProfileTemplate.compile(LambdaProfile).to_dict()
@@ -0,0 +1,109 @@
+# type: ignore
+from _ProducerConsumer._WorkflowProcessor._ResourcePool import ResourcePool
+import trio
+
+
+async def _hold(pool, resources, duration, running, peaks, key):
+    async with pool.acquire(resources):
+        running[key] = running.get(key, 0) + 1
+        peaks[key] = max(peaks.get(key, 0), running[key])
+        await trio.sleep(duration)
+        running[key] -= 1
+
+
+async def test_unlimited_pool_does_not_block(autojump_clock):
+    pool = ResourcePool()
+    running, peaks = {}, {}
+    async with trio.open_nursery() as nursery:
+        for _ in range(10):
+            nursery.start_soon(_hold, pool, ["dmm"], 1, running, peaks, "all")
+    assert peaks["all"] == 10
+
+
+async def test_global_limit(autojump_clock):
+    pool = ResourcePool(max_concurrency=3)
+    running, peaks = {}, {}
+    start = trio.current_time()
+    async with trio.open_nursery() as nursery:
+        for _ in range(9):
+            nursery.start_soon(_hold, pool, [], 1, running, peaks, "all")
+    assert peaks["all"] == 3
+    assert trio.current_time() - start == 3
+
+
+async def test_resource_limit_does_not_consume_global_slots(autojump_clock):
+    pool = ResourcePool(max_concurrency=4, resource_limits={"dmm": 1})
+    running, peaks = {}, {}
+    start = trio.current_time()
+    async with trio.open_nursery() as nursery:
+        for _ in range(4):
+            nursery.start_soon(_hold, pool, ["dmm"], 1, running, peaks, "dmm")
+        for _ in range(3):
+            nursery.start_soon(_hold, pool, [], 4, running, peaks, "cpu")
+    assert peaks["dmm"] == 1
+    assert peaks["cpu"] == 3
+    assert trio.current_time() - start == 4
+
+
+async def test_waiters_are_served_in_arrival_order(autojump_clock):
+    pool = ResourcePool(resource_limits={"dmm": 1})
+    order = []
+
+    async def _job(index):
+        async with pool.acquire(["dmm"]):
+            order.append(index)
+            await trio.sleep(1)
+
+    async with trio.open_nursery() as nursery:
+        for i in range(5):
+            nursery.start_soon(_job, i)
+            await trio.sleep(0.1)
+    assert order == [0, 1, 2, 3, 4]
+
+
+async def test_statistics():
+    pool = ResourcePool(max_concurrency=2, resource_limits={"dmm": 1})
+    async with pool.acquire(["dmm", "unlisted"]):
+        stats = pool.statistics()
+    assert stats["global"] == {"in_use": 1, "limit": 2, "waiting": 0}
+    assert stats["dmm"] == {"in_use": 1, "limit": 1, "waiting": 0}
+    assert "unlisted" not in stats
+
+
+async def test_groups_are_served_round_robin(autojump_clock):
+    pool = ResourcePool(max_concurrency=1)
+    order = []
+
+    async def _job(group, priority):
+        async with pool.acquire([], priority, group):
+            order.append(group)
+            await trio.sleep(1)
+
+    async with trio.open_nursery() as nursery:
+        # COMMENT: Panel A queues more and higher-priority work, it must still take turns with B
+        for _ in range(4):
+            nursery.start_soon(_job, "A", 10)
+            await trio.sleep(0.01)
+        for _ in range(2):
+            nursery.start_soon(_job, "B", 0)
+            await trio.sleep(0.01)
+    assert order == ["A", "A", "B", "A", "B", "A"]
+
+
+async def test_cancelled_group_waiters_are_skipped(autojump_clock):
+    pool = ResourcePool(max_concurrency=1)
+    order = []
+
+    async def _job(group):
+        async with pool.acquire([], 0, group):
+            order.append(group)
+            await trio.sleep(1)
+
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(_job, "A")
+        await trio.sleep(0.01)
+        with trio.move_on_after(0.5):
+            await _job("B")
+        nursery.start_soon(_job, "C")
+    assert order == ["A", "C"]
+    assert pool.statistics()["global"] == {"in_use": 0, "limit": 1, "waiting": 0}
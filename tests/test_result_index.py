@@ -0,0 +1,309 @@
+# type: ignore
+from _Application._ResultIndex import ColumnTable, ResultIndex
+from _Application._ResultStore import ResultStore, read_records
+from _CommunicationModules._WSCommModule import WSCommModule
+from _Application._AppStateManager import ApplicationStateManager
+from _Application._SystemEventBus import SystemEventBus
+from tests.test_ws_comm_module import FakeRequest, FakeWebSocket
+import numpy as np
+import pytest
+import threading
+import json
+import os
+import trio
+
+
+def run_records(tr_id, timestamp, outcomes):
+    """
+    outcomes: test case name -> list of measured values, one per execution
+    """
+    records = []
+    for name, values in outcomes.items():
+        tc_id = f"{tr_id}-{name}"
+        records.append({"kind": "test_case", "tc_id": tc_id, "name": name, "tr_id": tr_id})
+        for execution_id, value in enumerate(values):
+            records.append(
+                {"kind": "execution", "tc_id": tc_id, "execution_id": execution_id, "timestamp": timestamp}
+            )
+            records.append(
+                {
+                    "kind": "parameter",
+                    "tc_id": tc_id,
+                    "execution_id": execution_id,
+                    "name": "voltage",
+                    "value": {"measured": value, "result": 4.5 <= value <= 5.5},
+                }
+            )
+    records.append({"kind": "test_run_end", "tr_id": tr_id, "timestamp": timestamp})
+    return records
+
+
+def history():
+    return (
+        run_records("tr1", 100.0, {"TC1": [5.0], "TC2": [6.0, 5.1]})
+        + run_records("tr2", 200.0, {"TC1": [4.9], "TC2": [6.1, 6.2, 5.2]})
+        + run_records("tr3", 300.0, {"TC1": [5.1], "TC2": [5.0]})
+    )
+
+
+def test_yield_cpk_and_pareto(tmp_path):
+    index = ResultIndex(str(tmp_path / "index"))
+    index.ingest_all(history())
+    assert index.yield_("TC2") == {"units": 3, "first_pass": 1, "failures": 3, "yield": 1 / 3}
+    assert index.yield_("TC2", last=1)["yield"] == 1.0
+    assert index.yield_("TC2", since=150)["units"] == 2
+    assert index.yield_() == {"units": 6, "first_pass": 4, "failures": 3, "yield": 4 / 6}
+    assert index.yield_("TC9")["units"] == 0
+
+    result = index.cpk("TC1", "voltage", lsl=4.5, usl=5.5)
+    assert result["n"] == 3
+    assert result["mean"] == pytest.approx(5.0)
+    assert result["cpk"] == pytest.approx(0.5 / (3 * 0.1))
+    assert index.cpk("TC1", "voltage", usl=5.5, last=1)["n"] == 1
+
+    assert index.failure_pareto() == [{"test_case": "TC2", "failures": 3}]
+    assert index.failure_pareto(by="parameter", since=150) == [
+        {"test_case": "TC2", "parameter": "voltage", "failures": 2}
+    ]
+    with pytest.raises(ValueError):
+        index.query("median", {})
+
+
+def test_unfinished_runs_are_not_indexed(tmp_path):
+    index = ResultIndex(str(tmp_path / "index"))
+    index.ingest_all(run_records("tr1", 100.0, {"TC1": [5.0]})[:-1])
+    assert len(index.units) == 0
+    index.ingest({"kind": "test_run_end", "tr_id": "tr1"})
+    assert len(index.units) == 0
+    index.write()
+    assert len(index.units) == 1
+
+
+def test_failed_test_cases_are_not_first_pass(tmp_path):
+    index = ResultIndex(str(tmp_path / "index"))
+    records = run_records("tr1", 100.0, {"TC1": [5.0], "TC2": [6.0, 5.1]})
+    # COMMENT: TC1 fails with an exception, TC2 fails on its last execution and is retested
+    records.insert(3, {"kind": "test_case_fail", "tc_id": "tr1-TC1"})
+    records.insert(-1, {"kind": "test_case_fail", "tc_id": "tr1-TC2"})
+    records[-1:-1] = [
+        {"kind": "test_case", "tc_id": "tr1-TC2", "name": "TC2", "tr_id": "tr1"},
+        {"kind": "execution", "tc_id": "tr1-TC2", "execution_id": 2, "timestamp": 100.0},
+    ]
+    index.ingest_all(records)
+    assert index.yield_() == {"units": 2, "first_pass": 0, "failures": 3, "yield": 0.0}
+    assert index.yield_("TC2")["failures"] == 2
+    assert index.failure_pareto() == [
+        {"test_case": "TC2", "failures": 2}, {"test_case": "TC1", "failures": 1}
+    ]
+
+
+def test_runs_that_never_end_are_closed(tmp_path):
+    index = ResultIndex(str(tmp_path / "index"), max_open_runs=2)
+    for tr_id in ["tr1", "tr2", "tr3"]:
+        index.ingest_all(run_records(tr_id, 100.0, {"TC1": [5.0]})[:-1])
+    assert len(index.units) == 1
+    assert list(index._open_runs) == ["tr2", "tr3"]
+
+    log_path = str(tmp_path / "results.bin")
+    records = history()
+    # COMMENT: The log of a crashed application ends in the middle of tr2
+    write_log(log_path, records[:12])
+    index = ResultIndex.open(str(tmp_path / "opened"), log_path, os.path.getsize(log_path))
+    assert index.yield_() == {"units": 3, "first_pass": 2, "failures": 1, "yield": 2 / 3}
+    with open(tmp_path / "opened" / "state.json") as f:
+        assert json.load(f)["open_runs"] == {}
+
+
+def test_index_is_read_back_and_rebuilt_from_the_log(tmp_path):
+    directory = str(tmp_path / "index")
+    index = ResultIndex(directory)
+    index.ingest_all(history())
+    expected = index.yield_("TC2")
+    assert ResultIndex(directory).yield_("TC2") == expected
+    assert isinstance(ResultIndex(directory).units.column("attempts"), np.memmap)
+
+    log_path = str(tmp_path / "results.bin")
+    store = ResultStore(log_path)
+    for record in history():
+        store.append(record)
+    store._write(store._pending)
+    rebuilt = ResultIndex.rebuild(str(tmp_path / "rebuilt"), log_path)
+    assert rebuilt.yield_("TC2") == expected
+    with pytest.raises(ValueError):
+        ResultIndex.rebuild(directory, log_path)
+
+
+def write_log(path, records):
+    store = ResultStore(path)
+    for record in records:
+        store.append(record)
+    store._write(store._pending)
+    store._file.close()
+
+
+def expected_index(directory, records):
+    index = ResultIndex(str(directory))
+    index.ingest_all(records)
+    return index
+
+
+def test_index_catches_up_with_the_log(tmp_path):
+    log_path = str(tmp_path / "results.bin")
+    directory = str(tmp_path / "index")
+    records = history()
+    write_log(log_path, records[:9])
+    index = ResultIndex.open(directory, log_path, os.path.getsize(log_path))
+    assert index.log_offset == os.path.getsize(log_path)
+    write_log(log_path, records[9:])
+    index = ResultIndex.open(directory, log_path, os.path.getsize(log_path))
+    expected = expected_index(tmp_path / "expected", records)
+    assert index.yield_() == expected.yield_()
+    assert len(index.measurements) == len(expected.measurements)
+    assert index.log_offset == os.path.getsize(log_path)
+
+
+def test_rows_written_after_the_saved_state_are_cut(tmp_path):
+    log_path = str(tmp_path / "results.bin")
+    directory = str(tmp_path / "index")
+    records = history()
+    write_log(log_path, [])
+    store = ResultStore(log_path, index=ResultIndex.open(directory, log_path, os.path.getsize(log_path)))
+    # COMMENT: tr2 is open in the state saved after tr1
+    for record in records[:12]:
+        store.append(record)
+    store.open()
+    store._write(*store._take_writes())
+    saved_state = (tmp_path / "index" / "state.json").read_text()
+    for record in records[12:]:
+        store.append(record)
+    store._write(*store._take_writes())
+    # COMMENT: A crash after the rows of the later runs were written, before their state was
+    (tmp_path / "index" / "state.json").write_text(saved_state)
+    index = ResultIndex.open(directory, log_path, os.path.getsize(log_path))
+    expected = expected_index(tmp_path / "expected", records)
+    assert index.yield_() == expected.yield_()
+    assert len(index.measurements) == len(expected.measurements)
+
+
+def test_index_ahead_of_the_log_is_rebuilt(tmp_path):
+    log_path = str(tmp_path / "results.bin")
+    directory = str(tmp_path / "index")
+    records = history()
+    write_log(log_path, records)
+    ResultIndex.open(directory, log_path, os.path.getsize(log_path))
+    os.remove(log_path)
+    write_log(log_path, records[:10])
+    index = ResultIndex.open(directory, log_path, os.path.getsize(log_path))
+    assert index.yield_() == expected_index(tmp_path / "expected", records[:10]).yield_()
+    # COMMENT: Without a state, what the index covers is unknown
+    os.remove(tmp_path / "index" / "state.json")
+    index = ResultIndex.open(directory, log_path, os.path.getsize(log_path))
+    assert index.yield_() == expected_index(tmp_path / "expected2", records[:10]).yield_()
+
+
+def test_incomplete_rows_are_cut_on_open(tmp_path):
+    table = ColumnTable(str(tmp_path), "t", {"a": "<f8", "b": "<u2"})
+    table.append({"a": [1.0, 2.0], "b": [1, 2]})
+    # COMMENT: A crash after the first column of a row was written
+    with open(tmp_path / "t.a.bin", "ab") as f:
+        f.write(np.array([3.0]).tobytes())
+    table = ColumnTable(str(tmp_path), "t", {"a": "<f8", "b": "<u2"})
+    assert len(table) == 2
+    assert list(table.column("a")) == [1.0, 2.0]
+    assert os.path.getsize(tmp_path / "t.a.bin") == 16
+
+
+async def test_queries_over_the_websocket(tmp_path, autojump_clock):
+    index = ResultIndex(str(tmp_path / "index"))
+    index.ingest_all(history())
+    asm = ApplicationStateManager(SystemEventBus(), None, None, None, None)
+    comm_module = WSCommModule(None, None, asm, result_index=index)
+    ws = FakeWebSocket()
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(comm_module.ws_connection_handler, FakeRequest(ws))
+        await ws.incoming_send.send(
+            json.dumps({"type": "query", "id": 1, "query": "yield", "args": {"test_case": "TC1"}})
+        )
+        await ws.incoming_send.send(
+            json.dumps({"type": "query", "id": 2, "query": "cpk", "args": {"test_case": "TC1"}})
+        )
+        await trio.sleep(1)
+        await ws.incoming_send.aclose()
+    replies = [m for m in ws.sent if m["type"] == "query_result"]
+    assert replies[0] == {
+        "type": "query_result", "id": 1, "result": {"units": 3, "first_pass": 3, "failures": 0, "yield": 1.0}
+    }
+    assert replies[1]["id"] == 2 and replies[1]["error"].startswith("Invalid query")
+
+
+async def test_index_is_opened_when_the_store_starts(tmp_path):
+    log_path = str(tmp_path / "results.bin")
+    records = history()
+    store = ResultStore(log_path)
+    for record in records[:9]:
+        store.append(record)
+    store._write(store._pending)
+
+    def opener(log_length):
+        return ResultIndex.rebuild(str(tmp_path / "index"), log_path, log_length)
+
+    store = ResultStore(log_path, index_opener=opener)
+    # COMMENT: Appended before the index is open, replayed into it once it is
+    for record in records[9:]:
+        store.append(record)
+    assert store.index is None
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(store.start)
+        index = await store.wait_index()
+        nursery.cancel_scope.cancel()
+    assert index is store.index
+    expected = ResultIndex(str(tmp_path / "expected"))
+    expected.ingest_all(records)
+    assert index.yield_() == expected.yield_()
+    assert [r["kind"] for r in read_records(log_path)] == [r["kind"] for r in records]
+
+
+async def test_records_are_written_while_the_index_is_rebuilt(tmp_path):
+    log_path = str(tmp_path / "results.bin")
+    records = history()
+    store = ResultStore(log_path)
+    for record in records[:9]:
+        store.append(record)
+    store._write(store._pending)
+    rebuilding = threading.Event()
+    written = threading.Event()
+
+    def opener(log_length):
+        rebuilding.set()
+        written.wait(10)
+        # COMMENT: The log has grown meanwhile, only the part that existed on open is read
+        assert os.path.getsize(log_path) > log_length
+        return ResultIndex.rebuild(str(tmp_path / "index"), log_path, log_length)
+
+    store = ResultStore(log_path, flush_interval=0.01, index_opener=opener)
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(store.start)
+        await trio.to_thread.run_sync(rebuilding.wait)
+        for record in records[9:]:
+            store.append(record)
+        with trio.fail_after(5):
+            while store.statistics()["written"] < len(records) - 9:
+                await trio.sleep(0.01)
+        written.set()
+        index = await store.wait_index()
+        nursery.cancel_scope.cancel()
+    expected = ResultIndex(str(tmp_path / "expected"))
+    expected.ingest_all(records)
+    assert index.yield_() == expected.yield_()
+    assert len(index.measurements) == len(expected.measurements)
+
+
+async def test_store_runs_without_an_index_that_fails_to_open(tmp_path):
+    def opener(log_length):
+        raise ValueError("corrupt index")
+
+    store = ResultStore(str(tmp_path / "results.bin"), index_opener=opener)
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(store.start)
+        assert await store.wait_index() is None
+        nursery.cancel_scope.cancel()
@@ -0,0 +1,142 @@
+# type: ignore
+from _Application._ResultStore import MAGIC, ResultStore, encode_record, read_records
+from _Application._AppStateManager import ApplicationStateManager
+from _Application._SystemEventBus import SystemEventBus
+from _Application._SystemEvent import NewTestExecutionEvent, ParameterUpdateEvent
+from _Application import _SystemEvent
+import trio
+import os
+
+
+def execution_events(tc_id, parameters):
+    yield NewTestExecutionEvent({"tc_id": tc_id, "execution_id": 0, "tc_state": "processing"})
+    for i in range(parameters):
+        yield ParameterUpdateEvent(
+            {"tc_id": tc_id, "execution_id": 0, "parameter": {f"p{i}": {"measured": i}}}
+        )
+
+
+async def wait_for_flushes(store, flushes):
+    # COMMENT: Writes happen in a worker thread, the mock clock keeps running meanwhile
+    while store.statistics()["flushes"] < flushes:
+        await trio.sleep(0.01)
+    return trio.current_time()
+
+
+async def test_records_are_written_every_flush_interval(tmp_path, autojump_clock):
+    path = str(tmp_path / "results.bin")
+    bus = SystemEventBus()
+    store = ResultStore(path, flush_interval=1.0, flush_records=100)
+    store.subscribe(bus)
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(store.start)
+        for event in execution_events("tc1", 10):
+            await bus.publish(event)
+        await trio.sleep(0.5)
+        # COMMENT: The log may not even be open yet, start opens it in a worker thread
+        assert store.statistics()["written"] == 0
+        assert await wait_for_flushes(store, 1) >= 1.0
+        records = list(read_records(path))
+        assert [r["kind"] for r in records] == ["execution"] + ["parameter"] * 10
+        assert records[-1] == {
+            "kind": "parameter", "tc_id": "tc1", "execution_id": 0, "name": "p9", "value": {"measured": 9}
+        }
+        nursery.cancel_scope.cancel()
+
+
+async def test_full_batches_and_finished_runs_are_written_right_away(tmp_path):
+    path = str(tmp_path / "results.bin")
+    bus = SystemEventBus()
+    store = ResultStore(path, flush_interval=60, flush_records=100)
+    store.subscribe(bus)
+    with trio.fail_after(5):
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(store.start)
+            for event in execution_events("tc1", 150):
+                await bus.publish(event)
+            await wait_for_flushes(store, 1)
+            assert store.statistics()["written"] == 151
+            await bus.publish(_SystemEvent.TestCaseFailEvent({"tc_id": "tc1"}))
+            await bus.publish(_SystemEvent.TestRunTerminationEvent({"tr_id": "tr1", "panel_id": 1}))
+            await wait_for_flushes(store, 2)
+            assert [r["kind"] for r in read_records(path)][-2:] == ["test_case_fail", "test_run_end"]
+            nursery.cancel_scope.cancel()
+
+
+async def test_pending_records_are_written_on_shutdown(tmp_path, autojump_clock):
+    path = str(tmp_path / "results.bin")
+    store = ResultStore(path, flush_interval=60)
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(store.start)
+        await trio.sleep(1)
+        store.append({"kind": "test_run_end", "tr_id": "tr1"})
+        nursery.cancel_scope.cancel()
+    assert list(read_records(path)) == [{"kind": "test_run_end", "tr_id": "tr1"}]
+
+
+async def test_torn_tail_is_truncated_on_reopen(tmp_path):
+    path = str(tmp_path / "results.bin")
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(encode_record({"kind": "execution", "tc_id": "tc1"}))
+        # COMMENT: A crash in the middle of a write leaves half a record behind
+        f.write(encode_record({"kind": "parameter", "tc_id": "tc1"})[:-3])
+    store = ResultStore(path)
+    store.append({"kind": "test_case_fail", "tc_id": "tc1"})
+    await store.flush()
+    assert [r["kind"] for r in read_records(path)] == ["execution", "test_case_fail"]
+
+
+def test_corrupt_records_end_the_log(tmp_path):
+    path = str(tmp_path / "results.bin")
+    first = encode_record({"kind": "execution", "tc_id": "tc1"})
+    second = bytearray(encode_record({"kind": "execution", "tc_id": "tc2"}))
+    second[-2] ^= 0xFF
+    with open(path, "wb") as f:
+        f.write(MAGIC + first + bytes(second))
+    assert [r["tc_id"] for r in read_records(path)] == ["tc1"]
+    store = ResultStore(path)
+    # COMMENT: Nothing is read at construction
+    assert os.path.getsize(path) == len(MAGIC + first + second)
+    store.open()
+    assert os.path.getsize(path) == len(MAGIC + first)
+
+
+def test_only_records_after_the_checkpoint_are_checked(tmp_path):
+    path = str(tmp_path / "results.bin")
+    store = ResultStore(path)
+    store._write([encode_record({"kind": "execution", "tc_id": "tc1"})])
+    store._file.close()
+    checkpoint = os.path.getsize(path)
+    with open(path + ".checkpoint") as f:
+        assert int(f.read()) == checkpoint
+    with open(path, "r+b") as f:
+        # COMMENT: Damage before the checkpoint is not looked for, a torn tail after it is cut
+        f.seek(checkpoint - 2)
+        f.write(b"!")
+        f.seek(checkpoint)
+        f.write(encode_record({"kind": "execution", "tc_id": "tc2"})[:-3])
+    ResultStore(path).open()
+    assert os.path.getsize(path) == checkpoint
+
+
+async def test_finished_runs_are_evicted_from_the_ui_state():
+    send_channel, receive_channel = trio.open_memory_channel(100)
+    bus = SystemEventBus()
+    asm = ApplicationStateManager(bus, send_channel, None, None, None)
+
+    def add_test_case(tr_id, tc_id):
+        asm._run_test_cases.setdefault(tr_id, []).append(tc_id)
+        asm.ui_state.apply("newTC", [{"op": "add", "path": f"/test_cases/{tc_id}", "value": {}}])
+
+    add_test_case("tr1", "a")
+    add_test_case("tr1", "b")
+    await bus.publish(_SystemEvent.TestRunTerminationEvent({"tr_id": "tr1", "panel_id": 1}))
+    add_test_case("tr2", "c")
+    await bus.publish(_SystemEvent.TestRunTerminationEvent({"tr_id": "tr2", "panel_id": 2}))
+    # COMMENT: The last finished run of every panel stays on screen
+    assert set(asm.ui_state.state["test_cases"]) == {"a", "b", "c"}
+    add_test_case("tr3", "d")
+    await bus.publish(_SystemEvent.TestRunTerminationEvent({"tr_id": "tr3", "panel_id": 1}))
+    assert set(asm.ui_state.state["test_cases"]) == {"c", "d"}
+    assert set(asm.ui_state.state["test_runs"]) == {"tr2", "tr3"}
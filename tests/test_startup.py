@@ -0,0 +1,16 @@
+# type: ignore
+import subprocess
+import sys
+import os
+
+
+def test_startup_does_not_import_optional_dependencies():
+    modules = ["numpy", "graphviz", "matplotlib", "sample_profile.profile", "_Application._ResultIndex"]
+    code = f"import main, sys; print([m for m in {modules!r} if m in sys.modules])"
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    assert output.stdout.strip() == "[]", output.stderr
@@ -0,0 +1,69 @@
+# type: ignore
+from util.structured_log import LogEvent, log_event
+from util.log_filter import StructuredFieldFilter
+from tests.test_base_node import ConcreteNode
+import logging
+import pytest
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self, level=logging.DEBUG):
+        super().__init__(level)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class CountingField:
+    formatted = 0
+
+    def __format__(self, spec):
+        CountingField.formatted += 1
+        return "field"
+
+
+@pytest.fixture
+def recording_logger():
+    logger = logging.getLogger("StructuredLogTest")
+    handler = RecordingHandler()
+    logger.addHandler(handler)
+    logger.propagate = False
+    yield logger, handler
+    logger.removeHandler(handler)
+    logger.propagate = True
+    logger.setLevel(logging.NOTSET)
+
+
+def test_message_is_only_formatted_when_used(recording_logger):
+    logger, handler = recording_logger
+    logger.setLevel(logging.WARNING)
+    CountingField.formatted = 0
+    log_event(logger, logging.INFO, "test", "value {value}", value=CountingField())
+    assert handler.records == []
+    logger.setLevel(logging.DEBUG)
+    log_event(logger, logging.INFO, "test", "value {value}", value=CountingField())
+    assert CountingField.formatted == 0
+    record = handler.records[0]
+    assert isinstance(record.msg, LogEvent)
+    assert record.getMessage() == "value field"
+    assert CountingField.formatted == 1
+
+
+def test_node_transitions_carry_fields():
+    logger = logging.getLogger("BaseNode")
+    handler = RecordingHandler()
+    handler.addFilter(StructuredFieldFilter(event="dependency_added"))
+    logger.addHandler(handler)
+    try:
+        node, dependency = ConcreteNode("Node 1"), ConcreteNode("Node 2")
+        node.add_dependency(dependency)
+    finally:
+        logger.removeHandler(handler)
+    [record] = handler.records
+    assert record.node_id == node.id
+    assert record.node_name == "Node 1"
+    assert record.dependency == "Node 2"
+    assert record.run_id is None
+    assert record.state == "not_processed"
+    assert record.getMessage() == "Node 2 added as a dependency to Node 1"
@@ -0,0 +1,258 @@
+# type: ignore
+from _Application._SystemEventBus import SystemEventBus
+from _Application._SystemEvent import (
+    NewTestExecutionEvent,
+    ParameterUpdateEvent,
+    ProgressUpdateEvent,
+)
+import trio
+
+
+class FakeDataModel:
+    def __init__(self, tc_id):
+        self.id = tc_id
+
+
+async def test_direct_mode_awaits_listeners():
+    bus = SystemEventBus()
+    received = []
+
+    async def listener(event):
+        received.append(event)
+
+    bus.subscribe(listener)
+    event = ParameterUpdateEvent({"tc_id": "tc1"})
+    await bus.publish(event)
+    assert received == [event]
+
+
+async def test_batched_mode_coalesces_progress(autojump_clock):
+    bus = SystemEventBus(batch_window=0.1)
+    received = []
+
+    async def listener(event):
+        received.append(event)
+
+    bus.subscribe(listener)
+    tc1, tc2 = FakeDataModel("tc1"), FakeDataModel("tc2")
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(bus.start)
+        first = ProgressUpdateEvent(tc1)
+        parameter = ParameterUpdateEvent({"tc_id": "tc1"})
+        other = ProgressUpdateEvent(tc2)
+        latest = ProgressUpdateEvent(tc1)
+        for event in (first, parameter, other, latest):
+            await bus.publish(event)
+        assert bus.queue_depth == 3
+        await trio.sleep(1)
+        nursery.cancel_scope.cancel()
+    assert received == [parameter, other, latest]
+    stats = bus.statistics()
+    assert stats["published"] == 4
+    assert stats["coalesced"] == 1
+    assert stats["dispatched"] == 3
+    assert stats["queue_depth"] == 0
+    assert stats["max_queue_depth"] == 3
+
+
+async def test_slow_listener_blocks_neither_publisher_nor_other_listeners(autojump_clock):
+    bus = SystemEventBus(batch_window=0.01)
+    fast, slow = [], []
+
+    async def fast_listener(event):
+        fast.append(trio.current_time())
+
+    async def slow_listener(event):
+        await trio.sleep(10)
+        slow.append(trio.current_time())
+
+    bus.subscribe(slow_listener)
+    bus.subscribe(fast_listener)
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(bus.start)
+        start = trio.current_time()
+        await bus.publish(ParameterUpdateEvent({"tc_id": "tc1"}))
+        assert trio.current_time() == start
+        await trio.sleep(20)
+        nursery.cancel_scope.cancel()
+    assert fast[0] - start < 1
+    assert slow[0] - start >= 10
+
+
+async def test_slow_listener_does_not_hold_back_later_batches(autojump_clock):
+    bus = SystemEventBus(batch_window=0.01)
+    fast, slow = [], []
+
+    async def fast_listener(event):
+        fast.append((event.payload["tc_id"], trio.current_time()))
+
+    async def slow_listener(event):
+        await trio.sleep(10)
+        slow.append(event.payload["tc_id"])
+
+    bus.subscribe(slow_listener)
+    bus.subscribe(fast_listener)
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(bus.start)
+        start = trio.current_time()
+        for i in range(3):
+            await bus.publish(ParameterUpdateEvent({"tc_id": f"tc{i}"}))
+            await trio.sleep(1)
+        assert [tc_id for tc_id, _ in fast] == ["tc0", "tc1", "tc2"]
+        assert fast[-1][1] - start < 3
+        assert slow == []
+        await trio.sleep(40)
+        nursery.cancel_scope.cancel()
+    assert slow == ["tc0", "tc1", "tc2"]
+
+
+async def test_queues_are_bounded(autojump_clock):
+    bus = SystemEventBus(batch_window=0.01, subscriber_queue_size=2, max_pending=2)
+    received = []
+
+    async def stalled_listener(event):
+        await trio.sleep(100)
+        received.append(event)
+
+    bus.subscribe(stalled_listener)
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(bus.start)
+        with trio.fail_after(10):
+            for i in range(10):
+                await bus.publish(ParameterUpdateEvent({"tc_id": f"tc{i}"}))
+                await trio.sleep(0.1)
+        # COMMENT: One event in the listener, two in its queue, the others are dropped
+        assert bus.statistics()["dropped"] == 7
+        await trio.sleep(1000)
+        nursery.cancel_scope.cancel()
+    assert [event.payload["tc_id"] for event in received] == ["tc0", "tc1", "tc2"]
+
+
+async def test_lagging_subscriber_gets_the_latest_progress(autojump_clock):
+    bus = SystemEventBus(batch_window=0.01, subscriber_queue_size=2)
+    received = []
+
+    async def slow_listener(event):
+        await trio.sleep(10)
+        received.append(event)
+
+    bus.subscribe(slow_listener)
+    tc1 = FakeDataModel("tc1")
+    events = [ProgressUpdateEvent(tc1) for _ in range(5)]
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(bus.start)
+        for event in events:
+            await bus.publish(event)
+            await trio.sleep(1)
+        await trio.sleep(100)
+        nursery.cancel_scope.cancel()
+    assert received == [events[0], events[-1]]
+    assert bus.statistics()["subscriber_coalesced"] == 3
+    assert bus.statistics()["dropped"] == 0
+
+
+async def test_listener_publishing_on_a_full_bus_does_not_deadlock(autojump_clock):
+    bus = SystemEventBus(batch_window=0.01, subscriber_queue_size=1, max_pending=1)
+    received = []
+
+    async def echo_listener(event):
+        received.append(event.payload["tc_id"])
+        if event.payload["tc_id"].startswith("tc"):
+            await bus.publish(ParameterUpdateEvent({"tc_id": "echo"}))
+
+    bus.subscribe(echo_listener)
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(bus.start)
+        with trio.fail_after(10):
+            for i in range(20):
+                await bus.publish(ParameterUpdateEvent({"tc_id": f"tc{i}"}))
+            await trio.sleep(1)
+            await bus.publish(ParameterUpdateEvent({"tc_id": "last"}))
+            await trio.sleep(1)
+        nursery.cancel_scope.cancel()
+    assert received[-1] == "last"
+
+
+class Subscriber:
+    def __init__(self):
+        self.handled = []
+
+    async def on_execution(self, event):
+        # COMMENT: Yields, a concurrently dispatched handler would overtake it
+        await trio.sleep(0)
+        self.handled.append(event)
+
+    async def on_parameter(self, event):
+        self.handled.append(event)
+
+
+async def test_batched_mode_keeps_publish_order_across_event_types(autojump_clock):
+    bus = SystemEventBus(batch_window=0.02)
+    subscriber = Subscriber()
+    bus.subscribe(subscriber.on_execution, NewTestExecutionEvent)
+    bus.subscribe(subscriber.on_parameter, ParameterUpdateEvent)
+    published = []
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(bus.start)
+        for i in range(100):
+            for event in (
+                NewTestExecutionEvent({"tc_id": "tc1", "execution_id": i}),
+                ParameterUpdateEvent({"tc_id": "tc1", "execution_id": i}),
+            ):
+                await bus.publish(event)
+                published.append(event)
+            if i % 7 == 0:
+                await trio.sleep(0.01)
+        await trio.sleep(1)
+        nursery.cancel_scope.cancel()
+    assert subscriber.handled == published
+
+
+async def test_failing_listener_does_not_stop_the_bus(autojump_clock):
+    bus = SystemEventBus(batch_window=0.01)
+    received = []
+
+    async def failing_listener(event):
+        raise RuntimeError("listener failure")
+
+    async def listener(event):
+        received.append(event)
+
+    bus.subscribe(failing_listener)
+    bus.subscribe(listener)
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(bus.start)
+        await bus.publish(ParameterUpdateEvent({"tc_id": "tc1"}))
+        await trio.sleep(1)
+        await bus.publish(ParameterUpdateEvent({"tc_id": "tc2"}))
+        await trio.sleep(1)
+        nursery.cancel_scope.cancel()
+    assert len(received) == 2
+
+
+async def test_typed_subscription():
+    bus = SystemEventBus()
+    progress, everything = [], []
+
+    async def on_progress(event):
+        progress.append(event)
+
+    async def on_any(event):
+        everything.append(event)
+
+    bus.subscribe(on_progress, ProgressUpdateEvent)
+    bus.subscribe(on_any)
+    parameter = ParameterUpdateEvent({"tc_id": "tc1"})
+    update = ProgressUpdateEvent(FakeDataModel("tc1"))
+    await bus.publish(parameter)
+    await bus.publish(update)
+    assert progress == [update]
+    assert everything == [parameter, update]
+    assert bus.listeners_for(ProgressUpdateEvent) == [on_progress, on_any]
+
+    async def late_listener(event):
+        pass
+
+    # COMMENT: Subscribing after a dispatch must invalidate the resolved listeners
+    bus.subscribe(late_listener, ProgressUpdateEvent)
+    assert late_listener in bus.listeners_for(ProgressUpdateEvent)
@@ -0,0 +1,107 @@
+# type: ignore
+from util.tracer import RingBuffer, Tracer
+from _ProducerConsumer._WorkflowProcessor._NodeExecutor import NodeExecutor
+from _ProducerConsumer._WorkflowProcessor._ResourcePool import ResourcePool
+from _Node._BaseNode import BaseNode
+import subprocess
+import json
+import sys
+import os
+import trio
+
+
+class SleepNode(BaseNode):
+    def __init__(self, name, seconds, run_id="tr1", panel_id=1):
+        super().__init__(name)
+        self._seconds = seconds
+        self._run_id = run_id
+        self._panel_id = panel_id
+
+    @property
+    def run_id(self):
+        return self._run_id
+
+    @property
+    def panel_id(self):
+        return self._panel_id
+
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, value):
+        self._state = value
+
+    async def execute(self):
+        await trio.sleep(self._seconds)
+        self._result = True
+
+
+def test_ring_buffer_keeps_the_last_items():
+    buffer = RingBuffer(3)
+    for i in range(5):
+        buffer.append(i)
+    assert list(buffer) == [2, 3, 4]
+    assert len(buffer) == 3
+    assert buffer.dropped == 2
+
+
+def test_memory_is_bounded_per_run_and_in_runs():
+    tracer = Tracer(capacity_per_run=2, max_runs=2)
+    for run in range(3):
+        for i in range(5):
+            tracer.record(f"node{i}", "node", i, i + 1, run_id=f"tr{run}")
+    assert tracer.run_ids == ["tr1", "tr2"]
+    assert [span.name for span in tracer.spans("tr2")] == ["node3", "node4"]
+    assert tracer.statistics()["tr2"] == {"spans": 2, "dropped": 3}
+
+
+def test_chrome_trace_has_queue_and_execution_slices_on_free_lanes():
+    tracer = Tracer()
+    ms = 1_000_000
+    tracer.record("a", "node", 0, 10 * ms, node_id="a", run_id="tr1", panel_id=1)
+    tracer.record("b", "node", 5 * ms, 8 * ms, queue_wait_ns=3 * ms, node_id="b", run_id="tr1", panel_id=1)
+    tracer.record("c", "node", 12 * ms, 13 * ms, node_id="c", run_id="tr1", panel_id=1)
+    trace = tracer.to_chrome_trace("tr1")
+    slices = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert [(e["name"], e["ts"], e["dur"], e["tid"]) for e in slices] == [
+        ("a", 0.0, 10000.0, 0),
+        ("b (queued)", 2000.0, 3000.0, 1),
+        ("b", 5000.0, 3000.0, 1),
+        ("c", 12000.0, 1000.0, 0),
+    ]
+    assert slices[2]["args"]["queue_wait_ms"] == 3.0
+    metadata = [e for e in trace["traceEvents"] if e["ph"] == "M"]
+    assert metadata == [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "Panel 1"}}]
+    json.dumps(trace)
+
+
+async def test_executor_records_queue_wait_and_execution_time():
+    tracer = Tracer()
+    send_channel, receive_channel = trio.open_memory_channel(10)
+    executor = NodeExecutor(None, send_channel, ResourcePool(max_concurrency=1), tracer=tracer)
+    first, second = SleepNode("first", 0.05), SleepNode("second", 0.05)
+    for node in (first, second):
+        await node.check_dependency_and_schedule_self()
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(executor._execute_node, first)
+        nursery.start_soon(executor._execute_node, second)
+    # COMMENT: trio does not guarantee the order tasks start in, the pool decides which node ran first
+    ran_first, ran_second = sorted(tracer.spans("tr1"), key=lambda span: span.start_ns)
+    assert ran_first.end_ns - ran_first.start_ns >= 50_000_000
+    # COMMENT: The other node waited on the pool while the first one executed
+    assert ran_second.queue_wait_ns >= 45_000_000
+    assert ran_second.node_id == {"first": first, "second": second}[ran_second.name].id
+    assert ran_second.panel_id == 1
+
+
+def test_importing_the_tracer_does_not_import_matplotlib():
+    code = "import util.tracer, sys; print('matplotlib' in sys.modules)"
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    assert output.stdout.strip() == "False"
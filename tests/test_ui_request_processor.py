@@ -0,0 +1,93 @@
+# type: ignore
+from _ProducerConsumer._SideEffectProcessor._UIRequestProcessor import UIRequestProcessor
+from _CommunicationModules._WSCommModule import WSCommModule
+from _Application._AppStateManager import ApplicationStateManager
+from _Application._SystemEventBus import SystemEventBus
+from tests.test_ws_comm_module import FakeRequest, FakeWebSocket
+from util.ui_request import UIRequest
+import json
+import trio
+
+
+class FakeCommModule:
+    def __init__(self):
+        self.sent = []
+
+    def send_to_control(self, message):
+        self.sent.append(json.loads(message))
+        return True
+
+    def on_control_connected(self, callback):
+        pass
+
+
+async def test_concurrent_prompts_are_matched_by_id(autojump_clock):
+    request_send, request_receive = trio.open_memory_channel(10)
+    response_send, response_receive = trio.open_memory_channel(10)
+    comm_module = FakeCommModule()
+    processor = UIRequestProcessor(request_receive, response_receive, comm_module)
+    first, second = UIRequest(request_send), UIRequest(request_send)
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(processor.start)
+        nursery.start_soon(first.queue_request, "first")
+        await trio.sleep(0.1)
+        nursery.start_soon(second.queue_request, "second")
+        await trio.sleep(1)
+        # COMMENT: Both prompts are out before either is answered
+        prompts = {prompt["data"]: prompt["id"] for prompt in comm_module.sent}
+        assert set(prompts) == {"first", "second"}
+        await response_send.send({"type": "ui-response", "id": prompts["second"], "value": "2"})
+        await response_send.send({"type": "ui-response", "id": prompts["first"], "value": "1"})
+        await trio.sleep(1)
+        assert not processor.pending
+        nursery.cancel_scope.cancel()
+    assert first.response == "1"
+    assert second.response == "2"
+
+
+async def test_prompt_timeout_uses_default(autojump_clock):
+    request_send, request_receive = trio.open_memory_channel(10)
+    response_send, response_receive = trio.open_memory_channel(10)
+    comm_module = FakeCommModule()
+    processor = UIRequestProcessor(request_receive, response_receive, comm_module)
+    ui_request = UIRequest(request_send)
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(processor.start)
+        start = trio.current_time()
+        await ui_request.queue_request("int", timeout=5, default_response="0")
+        assert trio.current_time() - start == 5
+        prompt_id = comm_module.sent[0]["id"]
+        assert comm_module.sent[1] == {"type": "prompt_cancel", "id": prompt_id}
+        # COMMENT: A late response is ignored
+        await response_send.send({"type": "ui-response", "id": prompt_id, "value": "1"})
+        await trio.sleep(1)
+        nursery.cancel_scope.cancel()
+    assert ui_request.response == "0"
+    assert ui_request.timed_out
+
+
+async def test_prompts_are_sent_once_a_control_connection_is_established(autojump_clock):
+    request_send, request_receive = trio.open_memory_channel(10)
+    response_send, response_receive = trio.open_memory_channel(10)
+    asm = ApplicationStateManager(SystemEventBus(), None, None, None, None)
+    comm_module = WSCommModule(None, response_send, asm)
+    processor = UIRequestProcessor(request_receive, response_receive, comm_module)
+    ui_request = UIRequest(request_send)
+    control = FakeWebSocket()
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(processor.start)
+        nursery.start_soon(ui_request.queue_request, "serial number")
+        await trio.sleep(1)
+        assert len(processor.pending) == 1
+        nursery.start_soon(comm_module.ws_connection_handler, FakeRequest(control))
+        await trio.sleep(1)
+        prompts = [m for m in control.sent if m.get("data") == "serial number"]
+        assert len(prompts) == 1
+        await control.incoming_send.send(
+            json.dumps({"type": "ui-response", "id": prompts[0]["id"], "value": "SN1"})
+        )
+        await trio.sleep(1)
+        assert not processor.pending
+        await control.incoming_send.aclose()
+        nursery.cancel_scope.cancel()
+    assert ui_request.response == "SN1"
@@ -0,0 +1,120 @@
+# type: ignore
+from _Application._UIStateStore import UIStateStore, json_pointer
+from _Application._AppStateManager import ApplicationStateManager
+from _Application._SystemEventBus import SystemEventBus
+from _Application._SystemEvent import (
+    NewTestExecutionEvent,
+    ParameterUpdateEvent,
+    ProgressUpdateEvent,
+)
+from _Application._DomainEntity import _TestCaseDataModel
+import json
+import pytest
+import trio
+
+
+def test_json_pointer_escapes_tokens():
+    assert json_pointer("test_cases", "a/b", "c~d", 0) == "/test_cases/a~1b/c~0d/0"
+
+
+def test_patches_update_state_and_sequence():
+    store = UIStateStore()
+    message = store.apply(
+        "newTC", [{"op": "add", "path": "/test_cases/tc1", "value": {"progress": 0, "executions": {0: {}}}}]
+    )
+    assert message["seq"] == 1
+    assert message["patch"][0]["path"] == "/test_cases/tc1"
+    store.apply("progressUpdate", [{"op": "replace", "path": "/test_cases/tc1/progress", "value": 40}])
+    snapshot = store.snapshot()
+    assert snapshot["seq"] == 2
+    # COMMENT: Stored as it appears on the wire
+    assert snapshot["state"]["test_cases"]["tc1"] == {"progress": 40, "executions": {"0": {}}}
+    store.apply("remove", [{"op": "remove", "path": "/test_cases/tc1"}])
+    assert store.state["test_cases"] == {}
+
+
+def test_invalid_patches_are_rejected():
+    store = UIStateStore()
+    with pytest.raises(KeyError):
+        store.apply("progressUpdate", [{"op": "replace", "path": "/test_cases/tc1", "value": 1}])
+    with pytest.raises(ValueError):
+        store.apply("move", [{"op": "move", "path": "/test_cases/tc1", "from": "/x"}])
+    assert store.seq == 0
+
+
+async def test_failed_patch_is_replaced_by_a_resync_snapshot():
+    send_channel, receive_channel = trio.open_memory_channel(10)
+    bus = SystemEventBus()
+    asm = ApplicationStateManager(bus, send_channel, None, None, None)
+    asm.ui_state.apply(
+        "newTC",
+        [{"op": "add", "path": "/test_cases/tc1", "value": {"progress": 0, "tc_state": "processing", "executions": {}}}],
+    )
+    # COMMENT: The parameters of an execution the store does not know
+    await bus.publish(
+        ParameterUpdateEvent({"tc_id": "tc1", "execution_id": 3, "parameter": {"p": {"measured": 1}}})
+    )
+    message = receive_channel.receive_nowait()
+    assert message["event_type"] == "snapshot"
+    assert message["seq"] == 2 == asm.ui_state.seq
+    assert message["state"] == asm.ui_state.state
+    assert message["state"] is not asm.ui_state.state
+    await bus.publish(NewTestExecutionEvent({"tc_id": "tc1", "execution_id": 3, "tc_state": "processing"}))
+    assert receive_channel.receive_nowait()["seq"] == 3
+
+
+async def test_update_size_does_not_grow_with_the_run():
+    send_channel, receive_channel = trio.open_memory_channel(10_000)
+    bus = SystemEventBus()
+    asm = ApplicationStateManager(bus, send_channel, None, None, None)
+    asm.ui_state.apply(
+        "newTC",
+        [{"op": "add", "path": "/test_cases/tc1", "value": {"progress": 0, "tc_state": "processing", "executions": {}}}],
+    )
+    await bus.publish(NewTestExecutionEvent({"tc_id": "tc1", "execution_id": 0, "tc_state": "processing"}))
+    assert receive_channel.receive_nowait()["seq"] == 2
+    sizes = []
+    for i in range(1000):
+        parameter = {f"parameter{i}": {"name": f"parameter{i}", "measured": i}}
+        await bus.publish(
+            ParameterUpdateEvent({"tc_id": "tc1", "execution_id": 0, "parameter": parameter})
+        )
+        sizes.append(len(json.dumps(receive_channel.receive_nowait())))
+    assert max(sizes) - min(sizes) < 10
+    assert len(asm.ui_state.state["test_cases"]["tc1"]["executions"]["0"]["parameters"]) == 1000
+    await bus.publish(ProgressUpdateEvent(_TestCaseDataModel.TestCaseDataModel("tc1", "Test Case 1", "")))
+    message = receive_channel.receive_nowait()
+    assert message["seq"] == 1003
+    assert message["patch"] == [{"op": "replace", "path": "/test_cases/tc1/progress", "value": 0}]
+
+
+async def test_progress_of_unknown_test_cases_is_dropped():
+    send_channel, receive_channel = trio.open_memory_channel(10)
+    bus = SystemEventBus()
+    asm = ApplicationStateManager(bus, send_channel, None, None, None)
+    await bus.publish(ProgressUpdateEvent(_TestCaseDataModel.TestCaseDataModel("evicted", "Test Case", "")))
+    assert receive_channel.statistics().current_buffer_used == 0
+    assert asm.ui_state.seq == 0
+
+
+async def test_batched_bus_applies_execution_before_its_parameters(autojump_clock):
+    send_channel, receive_channel = trio.open_memory_channel(10_000)
+    bus = SystemEventBus(batch_window=0.02)
+    asm = ApplicationStateManager(bus, send_channel, None, None, None)
+    asm.ui_state.apply(
+        "newTC",
+        [{"op": "add", "path": "/test_cases/tc1", "value": {"progress": 0, "tc_state": "processing", "executions": {}}}],
+    )
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(bus.start)
+        for i in range(10):
+            await bus.publish(NewTestExecutionEvent({"tc_id": "tc1", "execution_id": i, "tc_state": "processing"}))
+            await bus.publish(
+                ParameterUpdateEvent({"tc_id": "tc1", "execution_id": i, "parameter": {"p": {"measured": i}}})
+            )
+        await trio.sleep(1)
+        nursery.cancel_scope.cancel()
+    messages = [receive_channel.receive_nowait() for _ in range(20)]
+    assert [message["event_type"] for message in messages] == ["newExecution", "parameterUpdate"] * 10
+    executions = asm.ui_state.state["test_cases"]["tc1"]["executions"]
+    assert all(executions[str(i)]["parameters"] == {"p": {"measured": i}} for i in range(10))
@@ -0,0 +1,92 @@
+# type: ignore
+from _CommunicationModules._WSCommModule import WSCommModule
+from _Application._AppStateManager import ApplicationStateManager
+from _Application._SystemEventBus import SystemEventBus
+from trio_websocket import ConnectionClosed
+import json
+import trio
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.incoming_send, self.incoming = trio.open_memory_channel(100)
+        self.sent = []
+
+    async def get_message(self):
+        try:
+            return await self.incoming.receive()
+        except trio.EndOfChannel:
+            raise ConnectionClosed(None)
+
+    async def send_message(self, message):
+        self.sent.append(json.loads(message))
+
+    async def aclose(self):
+        pass
+
+
+class FakeRequest:
+    def __init__(self, ws):
+        self.ws = ws
+
+    async def accept(self):
+        return self.ws
+
+
+async def test_messages_are_read_per_connection_and_routed_by_role(autojump_clock):
+    command_send, command_receive = trio.open_memory_channel(10)
+    response_send, response_receive = trio.open_memory_channel(10)
+    asm = ApplicationStateManager(SystemEventBus(), None, None, None, None)
+    comm_module = WSCommModule(command_send, response_send, asm)
+    control, view = FakeWebSocket(), FakeWebSocket()
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(comm_module.ws_connection_handler, FakeRequest(control))
+        await trio.sleep(0.1)
+        nursery.start_soon(comm_module.ws_connection_handler, FakeRequest(view))
+        await trio.sleep(0.1)
+        await view.incoming_send.send(json.dumps({"type": "command", "command": "loadTC"}))
+        await view.incoming_send.send(json.dumps({"type": "snapshot"}))
+        await control.incoming_send.send(json.dumps({"type": "command", "command": "loadTC"}))
+        await control.incoming_send.send(json.dumps({"type": "ui-response", "id": "p1", "value": "1"}))
+        await trio.sleep(1)
+        assert command_receive.receive_nowait()["command"] == "loadTC"
+        assert response_receive.receive_nowait() == {"type": "ui-response", "id": "p1", "value": "1"}
+        stats = sorted(comm_module.statistics().values(), key=lambda s: s["role"])
+        assert [s["role"] for s in stats] == ["control", "view"]
+        assert stats[0]["received"] == 2 and stats[0]["rejected"] == 0
+        assert stats[1]["received"] == 2 and stats[1]["rejected"] == 1
+        await view.incoming_send.aclose()
+        await trio.sleep(1)
+        assert len(asm.sessions) == 1
+        assert asm.control_session is not None
+        await control.incoming_send.aclose()
+    assert [m["event_type"] for m in view.sent if m["type"] == "tc_data"] == ["snapshot", "snapshot"]
+    assert [m["type"] for m in view.sent if m["type"] == "error"] == ["error"]
+    assert not command_receive.statistics().current_buffer_used
+    assert asm.sessions == {}
+
+
+class SlowWebSocket(FakeWebSocket):
+    async def send_message(self, message):
+        await trio.sleep(1)
+        await super().send_message(message)
+
+
+async def test_flooded_control_connection_stays_open(autojump_clock):
+    asm = ApplicationStateManager(SystemEventBus(), None, None, None, None)
+    comm_module = WSCommModule(None, None, asm, max_outbound_queue_size=5, send_timeout=0.5)
+    control, view = SlowWebSocket(), SlowWebSocket()
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(comm_module.ws_connection_handler, FakeRequest(control))
+        await trio.sleep(0.1)
+        nursery.start_soon(comm_module.ws_connection_handler, FakeRequest(view))
+        await trio.sleep(0.1)
+        for i in range(20):
+            comm_module.broadcast(json.dumps({"type": "flood", "seq": i}))
+        assert comm_module.send_to_control(json.dumps({"type": "prompt", "id": "p1"}))
+        await trio.sleep(100)
+        # COMMENT: The view is dropped, the control connection gets every message
+        assert len(asm.sessions) == 1
+        assert [m["seq"] for m in control.sent if m["type"] == "flood"] == list(range(20))
+        assert control.sent[-1] == {"type": "prompt", "id": "p1"}
+        await control.incoming_send.aclose()
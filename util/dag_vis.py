@@ -1,10 +1,12 @@
 # type: ignore
-from graphviz import Digraph
 from _Node._BaseNode import BaseNode
 from typing import Set
 
 
 def draw_graph(root: BaseNode):
+    # COMMENT: graphviz is only needed to draw, importing it here keeps it off the startup path
+    from graphviz import Digraph
+
     dot = Digraph()
     visited: Set['BaseNode'] = set()
 
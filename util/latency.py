@@ -0,0 +1,144 @@
+from typing import Any, Dict, TYPE_CHECKING
+from enum import Enum
+import math
+import json
+
+if TYPE_CHECKING:
+    from _Node._BaseNode import BaseNode
+
+
+class Stage(Enum):
+    # COMMENT: Handed to the executor channel, see BaseNode.check_dependency_and_schedule_self
+    READY = "ready"
+    # COMMENT: Taken off the channel by NodeExecutor
+    DEQUEUED = "dequeued"
+    # COMMENT: Resources acquired, execute() called
+    STARTED = "started"
+    # COMMENT: A worker thread picked up the synchronous callable
+    THREAD_ACQUIRED = "thread_acquired"
+    # COMMENT: execute() returned
+    RETURNED = "returned"
+    # COMMENT: Taken off the result channel by NodeResultProcessor
+    RESULT_PROCESSED = "result_processed"
+    CLEARED = "cleared"
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed histogram of durations in nanoseconds, a bucket spans 2 ** (1 / 8), so
+    percentiles are exact to within about 9% whatever the number of samples. Memory is bounded
+    by the number of buckets, a few hundred between a nanosecond and a day.
+    """
+
+    _BUCKETS_PER_OCTAVE = 8
+
+    def __init__(self) -> None:
+        self._buckets: Dict[int, int] = {}
+        self._count = 0
+        self._sum = 0
+        self._min: int | None = None
+        self._max: int | None = None
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def record(self, duration_ns: int) -> None:
+        duration_ns = max(duration_ns, 0)
+        bucket = (
+            math.floor(math.log2(duration_ns) * self._BUCKETS_PER_OCTAVE)
+            if duration_ns > 0
+            else -1
+        )
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+        self._count += 1
+        self._sum += duration_ns
+        self._min = duration_ns if self._min is None else min(self._min, duration_ns)
+        self._max = duration_ns if self._max is None else max(self._max, duration_ns)
+
+    def percentile(self, p: float) -> float | None:
+        """
+        Upper bound of the bucket holding the p-th percentile, in nanoseconds, clamped to the
+        largest recorded value.
+        """
+        if self._count == 0:
+            return None
+        rank = math.ceil(p / 100 * self._count)
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                if bucket < 0:
+                    return 0.0
+                upper = 2 ** ((bucket + 1) / self._BUCKETS_PER_OCTAVE)
+                return min(upper, float(self._max))  # type: ignore
+        return float(self._max)  # type: ignore
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Count, then mean, min, max and percentiles in milliseconds.
+        """
+
+        def ms(ns: float | None) -> float | None:
+            return ns / 1e6 if ns is not None else None
+
+        return {
+            "count": self._count,
+            "mean": ms(self._sum / self._count) if self._count else None,
+            "min": ms(self._min),
+            "p50": ms(self.percentile(50)),
+            "p95": ms(self.percentile(95)),
+            "p99": ms(self.percentile(99)),
+            "max": ms(self._max),
+        }
+
+
+# COMMENT: stage name -> (from, to), the duration between two transitions of a node
+STAGE_SPANS = {
+    "executor_queue": (Stage.READY, Stage.DEQUEUED),
+    "resource_wait": (Stage.DEQUEUED, Stage.STARTED),
+    "thread_wait": (Stage.STARTED, Stage.THREAD_ACQUIRED),
+    "run": (Stage.STARTED, Stage.RETURNED),
+    "result_queue": (Stage.RETURNED, Stage.RESULT_PROCESSED),
+    "clear": (Stage.RESULT_PROCESSED, Stage.CLEARED),
+    "total": (Stage.READY, Stage.CLEARED),
+}
+
+
+class LatencyRecorder:
+    """
+    Per-stage latency histograms over every node execution. "run" is the time in execute(),
+    "ui_wait" the part of it spent waiting on operator prompts and "instrument" the rest of the
+    callable's own time, after a worker thread was acquired.
+    """
+
+    def __init__(self) -> None:
+        self._histograms: Dict[str, LatencyHistogram] = {}
+
+    def histogram(self, stage: str) -> LatencyHistogram:
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            histogram = self._histograms[stage] = LatencyHistogram()
+        return histogram
+
+    def record_node(self, node: "BaseNode") -> None:
+        stages = node.stage_ns
+        for name, (start, end) in STAGE_SPANS.items():
+            if start in stages and end in stages:
+                self.histogram(name).record(stages[end] - stages[start])
+        if Stage.STARTED in stages and Stage.RETURNED in stages:
+            ui_wait_ns = node.ui_wait_ns
+            self.histogram("ui_wait").record(ui_wait_ns)
+            callable_start = stages.get(Stage.THREAD_ACQUIRED, stages[Stage.STARTED])
+            self.histogram("instrument").record(
+                stages[Stage.RETURNED] - callable_start - ui_wait_ns
+            )
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            stage: histogram.summary() for stage, histogram in self._histograms.items()
+        }
+
+    def dump(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
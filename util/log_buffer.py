@@ -0,0 +1,125 @@
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+import itertools
+import threading
+import logging
+import trio
+
+
+class LogBuffer:
+    """
+    Bounded, thread-safe buffer between logging handlers and the trio side.
+
+    put never blocks. When the buffer is full the oldest record of the lowest severity present is
+    dropped, or the new record itself if its severity is lower still, so a burst of DEBUG lines
+    cannot push out warnings and errors. get_batch waits for records without a thread per record:
+    the trio task registers a wakeup that the first put after an empty buffer triggers.
+    """
+
+    def __init__(self, capacity: int = 10000) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self._capacity = capacity
+        self._lock = threading.Lock()
+        # COMMENT: levelno -> (arrival, record), records of a level are in arrival order
+        self._records: Dict[int, Deque[Tuple[int, logging.LogRecord]]] = {}
+        self._size = 0
+        self._arrival = itertools.count()
+        self._wakeup: Tuple[trio.lowlevel.TrioToken, trio.Event] | None = None
+        self._closed = False
+        self._dropped: Dict[str, int] = {}
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def __len__(self) -> int:
+        return self._size
+
+    def put(self, record: logging.LogRecord) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            if self._size >= self._capacity:
+                lowest = min(level for level, records in self._records.items() if records)
+                if record.levelno < lowest:
+                    self._count_dropped(record)
+                    return
+                _, dropped = self._records[lowest].popleft()
+                self._count_dropped(dropped)
+                self._size -= 1
+            records = self._records.get(record.levelno)
+            if records is None:
+                records = self._records[record.levelno] = deque()
+            records.append((next(self._arrival), record))
+            self._size += 1
+            wakeup = self._wakeup
+            self._wakeup = None
+        if wakeup is not None:
+            self._wake(wakeup)
+
+    def close(self) -> None:
+        """
+        Stops accepting records, get_batch returns an empty batch once the buffer is drained.
+        """
+        with self._lock:
+            self._closed = True
+            wakeup = self._wakeup
+            self._wakeup = None
+        if wakeup is not None:
+            self._wake(wakeup)
+
+    async def get_batch(
+        self, max_records: int = 200, max_latency: float = 0.1
+    ) -> List[logging.LogRecord]:
+        """
+        Waits for at least one record, then up to max_latency for the batch to fill, and returns
+        at most max_records records in arrival order.
+        """
+        event: trio.Event | None = None
+        with self._lock:
+            if self._size == 0 and not self._closed:
+                event = trio.Event()
+                self._wakeup = (trio.lowlevel.current_trio_token(), event)
+        if event is not None:
+            await event.wait()
+        if self._size < max_records and not self._closed:
+            await trio.sleep(max_latency)
+        else:
+            await trio.lowlevel.checkpoint()
+        with self._lock:
+            return self._drain(max_records)
+
+    def _drain(self, max_records: int) -> List[logging.LogRecord]:
+        batch: List[logging.LogRecord] = []
+        queues = [records for records in self._records.values() if records]
+        while queues and len(batch) < max_records:
+            # COMMENT: Merge the per-level queues by arrival, there are only a handful of levels
+            oldest = min(queues, key=lambda records: records[0][0])
+            batch.append(oldest.popleft()[1])
+            if not oldest:
+                queues.remove(oldest)
+        self._size -= len(batch)
+        return batch
+
+    def _count_dropped(self, record: logging.LogRecord) -> None:
+        self._dropped[record.levelname] = self._dropped.get(record.levelname, 0) + 1
+
+    @staticmethod
+    def _wake(wakeup: Tuple[trio.lowlevel.TrioToken, trio.Event]) -> None:
+        trio_token, event = wakeup
+        try:
+            trio_token.run_sync_soon(event.set)
+        except trio.RunFinishedError:
+            pass
+
+    def statistics(self) -> Dict[str, object]:
+        return {
+            "size": self._size,
+            "capacity": self._capacity,
+            "dropped": dict(self._dropped),
+        }
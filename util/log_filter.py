@@ -5,4 +5,21 @@ class TAGAppLoggerFilter(logging.Filter):
         return not (record.name.startswith("matplotlib") or 
                     record.name.startswith("PIL") or
                     record.name.startswith("asyncio") or 
-                    record.name.startswith("trio-websocket"))
\ No newline at end of file
+                    record.name.startswith("trio-websocket"))
+
+
+class StructuredFieldFilter(logging.Filter):
+    """
+    Passes records whose structured log fields (see util.structured_log) have the given values,
+    e.g. StructuredFieldFilter(run_id=test_run.id).
+    """
+
+    def __init__(self, **criteria: object):
+        super().__init__()
+        self._criteria = criteria
+
+    def filter(self, record: logging.LogRecord):
+        return all(
+            getattr(record, field, None) == value
+            for field, value in self._criteria.items()
+        )
@@ -1,13 +1,12 @@
-from queue import Queue
-from _Node._TestRunTerminalNode import TestRunTerminalNode
+from util.log_buffer import LogBuffer
 import logging 
 
 
 class WebSocketLogHandler(logging.Handler):
-    def __init__(self, log_queue: Queue[logging.LogRecord | TestRunTerminalNode]):
+    def __init__(self, log_buffer: LogBuffer):
         super().__init__()
-        self._log_queue = log_queue 
+        self._log_buffer = log_buffer 
         
 
     def emit(self, record) -> None:
-        self._log_queue.put(record)
\ No newline at end of file
+        self._log_buffer.put(record)
@@ -0,0 +1,73 @@
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from util.log_filter import TAGAppLoggerFilter
+from queue import SimpleQueue
+from typing import Any
+import logging
+import gzip
+import shutil
+import os
+
+
+LOG_FORMAT = "%(asctime)s - %(threadName)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class _DeferredFormatQueueHandler(QueueHandler):
+    """
+    Queues records unformatted. QueueHandler.prepare formats every record on the logging thread,
+    which is only needed when records cross a process boundary, this queue does not.
+    Messages (e.g. structured LogEvents) are then only formatted by the listener's handlers.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _gzip_namer(name: str) -> str:
+    return name + ".gz"
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    with open(source, "rb") as source_file, gzip.open(dest, "wb") as dest_file:
+        shutil.copyfileobj(source_file, dest_file)
+    os.remove(source)
+
+
+def setup_logging(
+    log_file: str = "tag_application.log",
+    level: int = logging.DEBUG,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    compress: bool = True,
+    console: bool = True,
+) -> QueueListener:
+    """
+    Routes the root logger through a QueueHandler. The returned QueueListener, once started,
+    writes the records to a size-rotated log file (rotated files gzip-compressed) and to the
+    console from its own thread, so logging calls never wait on disk or terminal I/O.
+    Stop the listener on shutdown to flush the remaining records.
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    file_handler = RotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+    if compress:
+        file_handler.namer = _gzip_namer
+        file_handler.rotator = _gzip_rotator
+    handlers: list[logging.Handler] = [file_handler]
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        handler.setLevel(level)
+
+    log_queue: "SimpleQueue[Any]" = SimpleQueue()
+    queue_handler = _DeferredFormatQueueHandler(log_queue)
+    # COMMENT: Filtered before the record is queued, filtered records cost nothing downstream
+    queue_handler.addFilter(TAGAppLoggerFilter())
+    queue_handler.setLevel(level)
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    root_logger.addHandler(queue_handler)
+    return QueueListener(log_queue, *handlers, respect_handler_level=True)
@@ -0,0 +1,17 @@
+from uuid import uuid4
+import itertools
+
+# COMMENT: Node ids are small integers, unique within the process. They are only turned into
+#   strings for the UI, the result log and the logs, where the per-process prefix keeps them
+#   unique across restarts.
+_PREFIX = uuid4().hex[:8]
+_counter = itertools.count(1)
+
+
+def new_node_id() -> int:
+    # COMMENT: next() on itertools.count is atomic, profiles may be compiled in worker threads
+    return next(_counter)
+
+
+def node_id_string(node_id: int) -> str:
+    return f"{_PREFIX}-{node_id:x}"
@@ -0,0 +1,15 @@
+import os
+
+
+def output_path(directory: str, file_name: str) -> str:
+    """
+    The path of file_name in directory. file_name may come from a client, it must be a bare file
+    name that stays in directory, otherwise ValueError is raised.
+    """
+    if file_name in ("", ".", "..") or os.path.basename(file_name) != file_name:
+        raise ValueError(f"{file_name!r} is not a bare file name")
+    path = os.path.join(directory, file_name)
+    # COMMENT: Also rejects a symlink leading out of the directory
+    if os.path.dirname(os.path.realpath(path)) != os.path.realpath(directory):
+        raise ValueError(f"{file_name!r} leads out of {directory}")
+    return path
@@ -0,0 +1,292 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Awaitable, Callable, Dict, Tuple, TYPE_CHECKING
+import multiprocessing
+import itertools
+import threading
+import logging
+import math
+import trio
+
+if TYPE_CHECKING:
+    from _Application._DomainEntity._TestCaseDataModel import TestCaseDataModel
+    from _Application._DomainEntity._Parameter import Parameter
+
+# COMMENT: Put on the update queue by the trio side once the worker call has finished
+_UPDATES_DONE = None
+# COMMENT: Put on the update queue by shutdown, stops the forwarder thread
+_FORWARDER_STOP = None
+
+
+class _JobUpdateQueue:
+    """
+    The update queue of one call as its worker sees it: the updates go to the update queue of
+    the runner, tagged with the job id of the call.
+    """
+
+    def __init__(self, update_queue: Any, job_id: int) -> None:
+        self._update_queue = update_queue
+        self._job_id = job_id
+
+    def put(self, update: Any) -> None:
+        self._update_queue.put((self._job_id, update))
+
+
+class ProcessDataModel:
+    """
+    Stands in for the TestCaseDataModel inside a worker process. There is no trio loop in the
+    worker, so update_parameter and update_progress are plain synchronous calls, the updates are
+    forwarded to the real data model on the trio side.
+    """
+
+    def __init__(self, tc_id: str, name: str, update_queue: Any) -> None:
+        self._tc_id = tc_id
+        self._name = name
+        self._update_queue = update_queue
+
+    @property
+    def id(self) -> str:
+        return self._tc_id
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def update_parameter(self, parameter: "Parameter") -> None:
+        self._update_queue.put(("parameter", parameter))
+
+    def update_progress(self, progress: int) -> None:
+        self._update_queue.put(("progress", progress))
+
+
+class _UpdateQueueLogHandler(logging.Handler):
+    """
+    Puts the log records of a worker call on its update queue as ("log", (level, logger name,
+    message)), the trio side hands them to the on_log callback of ProcessRunner.run.
+    """
+
+    def __init__(self, update_queue: Any) -> None:
+        super().__init__()
+        self._update_queue = update_queue
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._update_queue.put(("log", (record.levelno, record.name, record.getMessage())))
+        except Exception:
+            self.handleError(record)
+
+
+def _run_in_worker(
+    callable_object: Callable[..., Any],
+    func_parameters: Dict[str, Any],
+    data_model_args: Tuple[str, ...],
+    data_model_info: Tuple[str, str],
+    update_queue: Any,
+    log_level: int | None = None,
+) -> Any:
+    data_model = ProcessDataModel(*data_model_info, update_queue)
+    for p_name in data_model_args:
+        func_parameters[p_name] = data_model
+    if log_level is None:
+        return callable_object(**func_parameters)
+    # COMMENT: A spawned worker has no logging configured, it logs at the level of the parent
+    root_logger = logging.getLogger()
+    root_logger.setLevel(log_level)
+    log_handler = _UpdateQueueLogHandler(update_queue)
+    root_logger.addHandler(log_handler)
+    try:
+        return callable_object(**func_parameters)
+    finally:
+        root_logger.removeHandler(log_handler)
+
+
+async def apply_update(data_model: "TestCaseDataModel", update: Tuple[str, Any]) -> None:
+    """
+    Applies an update made through a ProcessDataModel to the real data model.
+    """
+    update_type, value = update
+    if update_type == "parameter":
+        await data_model.update_parameter(value)
+    elif update_type == "progress":
+        await data_model.update_progress(value)
+
+
+class ProcessRunner:
+    """
+    Runs picklable synchronous callables in a pool of worker processes. Workers are started with
+    the "spawn" method, forking a process that runs trio worker threads is not safe. A worker
+    that dies breaks the pool, the call fails with BrokenProcessPool and the next one starts a
+    new pool.
+
+    The updates of all calls go through one queue, read by one forwarder thread that hands them
+    to the trio side of their call by job id, so waiting calls take no trio worker threads.
+    """
+
+    def __init__(self, max_workers: int | None = None) -> None:
+        self._max_workers = max_workers
+        self._executor: ProcessPoolExecutor | None = None
+        self._manager: Any = None
+        self._update_queue: Any = None
+        self._forwarder: threading.Thread | None = None
+        # COMMENT: job id -> trio token and update channel of a running call, shared with the
+        #   forwarder thread
+        self._jobs: Dict[int, Tuple[trio.lowlevel.TrioToken, trio.MemorySendChannel[Any]]] = {}
+        self._jobs_lock = threading.Lock()
+        self._job_ids = itertools.count()
+        self._logger = logging.getLogger("ProcessRunner")
+
+    def _ensure_started(self) -> None:
+        if self._executor is None:
+            context = multiprocessing.get_context("spawn")
+            if self._manager is None:
+                self._manager = context.Manager()
+                self._update_queue = self._manager.Queue()
+                self._forwarder = threading.Thread(
+                    target=self._forward, args=(self._update_queue,), daemon=True
+                )
+                self._forwarder.start()
+            self._executor = ProcessPoolExecutor(self._max_workers, mp_context=context)
+            self._logger.info(
+                f"Process pool started with {self._executor._max_workers} workers"  # type: ignore
+            )
+
+    async def run(
+        self,
+        callable_object: Callable[..., Any],
+        func_parameters: Dict[str, Any],
+        data_model_args: Tuple[str, ...],
+        data_model: "TestCaseDataModel",
+        on_log: "Callable[[int, str, str], Awaitable[None]] | None" = None,
+    ) -> Any:
+        """
+        With on_log, the records logged during the call are passed to it as (level, logger name,
+        message) instead of being handled in the worker.
+        """
+        self._ensure_started()
+        assert self._executor is not None
+        update_queue = self._update_queue
+        executor = self._executor
+        job_id = next(self._job_ids)
+        # COMMENT: Unbounded, the forwarder thread never waits on one call
+        send_channel, receive_channel = trio.open_memory_channel[Any](math.inf)
+        with self._jobs_lock:
+            self._jobs[job_id] = (trio.lowlevel.current_trio_token(), send_channel)
+        try:
+            future: Future[Any] = executor.submit(
+                _run_in_worker,
+                callable_object,
+                func_parameters,
+                data_model_args,
+                (data_model.id, data_model.name),
+                _JobUpdateQueue(update_queue, job_id),
+                logging.getLogger().getEffectiveLevel() if on_log is not None else None,
+            )
+        except BaseException:
+            with self._jobs_lock:
+                del self._jobs[job_id]
+            raise
+        trio_token = trio.lowlevel.current_trio_token()
+        done = trio.Event()
+
+        def _on_done(_: Future[Any]) -> None:
+            try:
+                trio_token.run_sync_soon(done.set)
+            except trio.RunFinishedError:
+                pass
+
+        future.add_done_callback(_on_done)
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(self._forward_updates, receive_channel, data_model, on_log)
+            try:
+                await done.wait()
+            finally:
+                # COMMENT: Every update the worker made is queued before its call returns, so this
+                #   marker is always the last item of the call the forwarder sees
+                future.cancel()
+                update_queue.put((job_id, _UPDATES_DONE))
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            # COMMENT: Every call on the pool fails, the first one drops it. The manager serves the
+            #   update queues of those calls and is kept.
+            if self._executor is executor:
+                self._logger.error("A worker process died, the process pool is restarted")
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            raise
+
+    def _forward(self, update_queue: Any) -> None:
+        """
+        Body of the forwarder thread.
+        """
+        while True:
+            try:
+                item = update_queue.get()
+            except (EOFError, OSError):
+                # COMMENT: The manager is gone
+                return
+            if item is _FORWARDER_STOP:
+                return
+            job_id, update = item
+            with self._jobs_lock:
+                job = self._jobs.get(job_id)
+                if update is _UPDATES_DONE:
+                    self._jobs.pop(job_id, None)
+            if job is None:
+                continue
+            trio_token, send_channel = job
+            try:
+                trio_token.run_sync_soon(_deliver_update, send_channel, update)
+            except trio.RunFinishedError:
+                pass
+
+    async def _forward_updates(
+        self,
+        receive_channel: trio.MemoryReceiveChannel[Any],
+        data_model: "TestCaseDataModel",
+        on_log: "Callable[[int, str, str], Awaitable[None]] | None",
+    ) -> None:
+        async with receive_channel:
+            async for update in receive_channel:
+                if update[0] == "log":
+                    if on_log is not None:
+                        await on_log(*update[1])
+                else:
+                    await apply_update(data_model, update)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            assert self._forwarder is not None
+            try:
+                self._update_queue.put(_FORWARDER_STOP)
+            except (EOFError, OSError):
+                pass
+            self._forwarder.join(1)
+            self._manager.shutdown()
+            self._manager = None
+            self._update_queue = None
+            self._forwarder = None
+
+
+def _deliver_update(send_channel: trio.MemorySendChannel[Any], update: Any) -> None:
+    # COMMENT: Runs on the trio side, the call may have been cancelled meanwhile
+    try:
+        if update is _UPDATES_DONE:
+            send_channel.close()
+        else:
+            send_channel.send_nowait(update)
+    except (trio.BrokenResourceError, trio.ClosedResourceError):
+        pass
+
+
+_default_process_runner: ProcessRunner | None = None
+
+
+def default_process_runner() -> ProcessRunner:
+    global _default_process_runner
+    if _default_process_runner is None:
+        _default_process_runner = ProcessRunner()
+    return _default_process_runner
@@ -0,0 +1,39 @@
+from typing import Any, Dict
+import importlib
+
+# COMMENT: Distributions register their test profiles under this entry point group, e.g.
+#   [project.entry-points."tag.profiles"] widget = "widget_profile.profile:WidgetTestProfile"
+ENTRY_POINT_GROUP = "tag.profiles"
+
+# COMMENT: Profiles shipped with the application, available without installing anything
+BUILTIN_PROFILES: Dict[str, str] = {
+    "sample": "sample_profile.profile:SampleTestProfile",
+}
+
+
+def import_object(reference: str) -> Any:
+    """
+    Returns the object a "module:qualified.name" reference points to, importing the module.
+    """
+    module_name, _, attribute = reference.partition(":")
+    obj = importlib.import_module(module_name)
+    for part in attribute.split(".") if attribute else []:
+        obj = getattr(obj, part)
+    return obj
+
+
+def object_reference(obj: Any) -> str | None:
+    """
+    The "module:qualified.name" reference of a module level function or class, None when obj
+    cannot be found again from one, e.g. a lambda, a nested function or a partial.
+    """
+    module_name = getattr(obj, "__module__", None)
+    qualname = getattr(obj, "__qualname__", None)
+    if not module_name or not qualname or "<" in qualname:
+        return None
+    reference = f"{module_name}:{qualname}"
+    try:
+        return reference if import_object(reference) is obj else None
+    except (ImportError, AttributeError):
+        return None
+
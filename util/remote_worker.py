@@ -0,0 +1,511 @@
+"""
+Remote execution of process mode test cases, see RemoteWorker and RemoteRunner.
+
+Trust model: frames are pickles, unpickling one can run arbitrary code, so a peer must be trusted
+before any frame is read. Worker and coordinator share a secret (TAG_REMOTE_AUTHKEY by default)
+and prove it to each other with an HMAC challenge-response on connect, a peer that fails is
+disconnected before a frame is exchanged. The secret is not an encryption key, frames travel in
+the clear. A worker only binds to loopback or a Unix socket unless allow_remote is set, which is
+meant for an isolated bench network.
+"""
+from util.process_runner import ProcessRunner, apply_update
+from util.structured_log import log_event
+from typing import Any, Dict, Iterable, List, Tuple, Union, TYPE_CHECKING
+from functools import partial
+import itertools
+import ipaddress
+import traceback
+import argparse
+import hashlib
+import logging
+import pickle
+import hmac
+import struct
+import stat
+import os
+import trio
+
+if TYPE_CHECKING:
+    from _Application._DomainEntity._TestCaseDataModel import TestCaseDataModel
+
+# COMMENT: ("host", port) for TCP, a filesystem path for a Unix socket
+Address = Union[Tuple[str, int], str]
+
+_HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+# COMMENT: Environment variable holding the secret shared by workers and coordinators
+AUTHKEY_ENV = "TAG_REMOTE_AUTHKEY"
+_CHALLENGE_SIZE = 32
+_DIGEST_SIZE = hashlib.sha256().digest_size
+
+
+class RemoteWorkerError(Exception):
+    pass
+
+
+def authkey_from_environment() -> bytes:
+    authkey = os.environ.get(AUTHKEY_ENV)
+    if not authkey:
+        raise RemoteWorkerError(f"No shared secret for remote workers, set {AUTHKEY_ENV}")
+    return authkey.encode()
+
+
+def _is_local(address: "Address") -> bool:
+    if isinstance(address, str):
+        return True
+    host = address[0]
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _digest(authkey: bytes, role: bytes, challenge: bytes) -> bytes:
+    return hmac.new(authkey, role + challenge, hashlib.sha256).digest()
+
+
+class FrameStream:
+    """
+    Length-prefixed frames over a trio stream: a 4 byte big-endian payload length followed by
+    the pickled message. Frames are only exchanged once the peer is authenticated, see
+    accept_peer and connect_peer.
+    """
+
+    def __init__(self, stream: trio.abc.Stream, max_frame_size: int = MAX_FRAME_SIZE) -> None:
+        self._stream = stream
+        self._max_frame_size = max_frame_size
+        self._buffer = bytearray()
+        # COMMENT: Job tasks and log handlers send concurrently, trio streams allow one sender
+        self._send_lock = trio.Lock()
+
+    @property
+    def stream(self) -> trio.abc.Stream:
+        return self._stream
+
+    async def send(self, message: Any) -> None:
+        # COMMENT: Pickled before taking the lock, a pickling error never leaves a partial frame
+        payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self._max_frame_size:
+            raise ValueError(
+                f"Frame of {len(payload)} bytes exceeds the {self._max_frame_size} byte limit"
+            )
+        async with self._send_lock:
+            await self._stream.send_all(_HEADER.pack(len(payload)) + payload)
+
+    async def accept_peer(self, authkey: bytes) -> None:
+        """
+        Worker side of the handshake, raw bytes only: sends a challenge, checks the
+        coordinator's HMAC of it and answers the coordinator's own challenge.
+        """
+        challenge = os.urandom(_CHALLENGE_SIZE)
+        await self._stream.send_all(challenge)
+        response = await self._receive_exactly(_DIGEST_SIZE + _CHALLENGE_SIZE)
+        if not hmac.compare_digest(
+            response[:_DIGEST_SIZE], _digest(authkey, b"coordinator", challenge)
+        ):
+            raise RemoteWorkerError("Coordinator failed to authenticate")
+        await self._stream.send_all(_digest(authkey, b"worker", response[_DIGEST_SIZE:]))
+
+    async def connect_peer(self, authkey: bytes) -> None:
+        """
+        Coordinator side of the handshake, see accept_peer.
+        """
+        challenge = await self._receive_exactly(_CHALLENGE_SIZE)
+        own_challenge = os.urandom(_CHALLENGE_SIZE)
+        await self._stream.send_all(_digest(authkey, b"coordinator", challenge) + own_challenge)
+        if not hmac.compare_digest(
+            await self._receive_exactly(_DIGEST_SIZE), _digest(authkey, b"worker", own_challenge)
+        ):
+            raise RemoteWorkerError("Worker failed to authenticate")
+
+    async def receive(self) -> Any:
+        """
+        Raises EOFError once the peer has closed the connection.
+        """
+        (size,) = _HEADER.unpack(await self._receive_exactly(_HEADER.size))
+        if size > self._max_frame_size:
+            raise RemoteWorkerError(
+                f"Frame of {size} bytes exceeds the {self._max_frame_size} byte limit"
+            )
+        return pickle.loads(await self._receive_exactly(size))
+
+    async def _receive_exactly(self, size: int) -> bytes:
+        while len(self._buffer) < size:
+            data = await self._stream.receive_some(65536)
+            if not data:
+                raise EOFError("Connection closed by peer")
+            self._buffer += data
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+async def _open_stream(address: Address) -> trio.abc.Stream:
+    if isinstance(address, str):
+        return await trio.open_unix_socket(address)
+    host, port = address
+    return await trio.open_tcp_stream(host, port)
+
+
+async def _open_listeners(address: Address) -> List[trio.SocketListener]:
+    if not isinstance(address, str):
+        host, port = address
+        return await trio.open_tcp_listeners(port, host=host)
+    # COMMENT: A socket file left behind by a previous worker would make bind fail
+    if os.path.exists(address) and stat.S_ISSOCK(os.stat(address).st_mode):
+        os.unlink(address)
+    sock = trio.socket.socket(trio.socket.AF_UNIX, trio.socket.SOCK_STREAM)
+    await sock.bind(address)
+    sock.listen()
+    return [trio.SocketListener(sock)]
+
+
+class _RemoteDataModel:
+    """
+    The data model a job's updates are applied to on the worker side, each update is sent to the
+    coordinator as it is made.
+    """
+
+    def __init__(self, frames: FrameStream, job_id: int, tc_id: str, name: str) -> None:
+        self._frames = frames
+        self._job_id = job_id
+        self._tc_id = tc_id
+        self._name = name
+
+    @property
+    def id(self) -> str:
+        return self._tc_id
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    async def update_parameter(self, parameter: Any) -> None:
+        await self._frames.send(("update", self._job_id, ("parameter", parameter)))
+
+    async def update_progress(self, progress: int) -> None:
+        await self._frames.send(("update", self._job_id, ("progress", progress)))
+
+
+class RemoteWorker:
+    """
+    Runs test case callables for coordinators connecting over TCP or a Unix socket.
+
+    Protocol, coordinator to worker: ("run", job_id, pickled (callable, func_parameters,
+    data_model_args, (tc_id, name))). Worker to coordinator: ("hello", max_jobs, pid) on connect,
+    then ("update", job_id, update), ("log", job_id, level, logger_name, message) while a job runs
+    and ("result", job_id, value) or ("error", job_id, exception, traceback) when it is done.
+    Callables are pickled by reference, the worker needs the same test profile code importable.
+
+    Jobs run in a ProcessRunner of max_jobs spawned processes, so they do not share the GIL, and
+    a job that crashes its process fails on its own while the worker keeps serving. A job that
+    hangs only holds its process.
+    """
+
+    def __init__(
+        self,
+        max_jobs: int | None = None,
+        authkey: bytes | None = None,
+        allow_remote: bool = False,
+        handshake_timeout: float = 5.0,
+    ) -> None:
+        self._max_jobs = max_jobs or os.cpu_count() or 1
+        self._authkey = authkey or authkey_from_environment()
+        self._allow_remote = allow_remote
+        self._handshake_timeout = handshake_timeout
+        self._process_runner = ProcessRunner(self._max_jobs)
+        self._logger = logging.getLogger("RemoteWorker")
+
+    async def serve(
+        self, address: Address, task_status=trio.TASK_STATUS_IGNORED
+    ) -> None:
+        """
+        Serves until cancelled, task_status is started with the listeners.
+        """
+        if not self._allow_remote and not _is_local(address):
+            raise RemoteWorkerError(
+                f"Refusing to listen on {address}, only loopback and Unix sockets are allowed"
+            )
+        listeners = await _open_listeners(address)
+        self._logger.info(f"Remote worker listening on {address} with {self._max_jobs} job slots")
+        try:
+            await trio.serve_listeners(
+                self.handle_connection, listeners, task_status=task_status
+            )
+        finally:
+            self._process_runner.shutdown()
+
+    async def handle_connection(self, stream: trio.abc.Stream) -> None:
+        frames = FrameStream(stream)
+        async with stream:
+            try:
+                with trio.fail_after(self._handshake_timeout):
+                    await frames.accept_peer(self._authkey)
+                await frames.send(("hello", self._max_jobs, os.getpid()))
+            except (
+                EOFError,
+                trio.TooSlowError,
+                trio.BrokenResourceError,
+                trio.ClosedResourceError,
+                RemoteWorkerError,
+            ) as e:
+                self._logger.warning(f"Coordinator rejected: {e!r}")
+                return
+            async with trio.open_nursery() as nursery:
+                try:
+                    while True:
+                        message = await frames.receive()
+                        if message[0] == "run":
+                            nursery.start_soon(self._run_job, frames, *message[1:])
+                        else:
+                            self._logger.error(f"Unknown message type {message[0]}")
+                except (EOFError, trio.BrokenResourceError, RemoteWorkerError) as e:
+                    self._logger.info(f"Coordinator connection closed: {e}")
+                # COMMENT: Jobs already running in worker processes finish, their results are dropped
+                nursery.cancel_scope.cancel()
+
+    async def _run_job(self, frames: FrameStream, job_id: int, payload: bytes) -> None:
+        try:
+            callable_object, func_parameters, data_model_args, (tc_id, name) = (
+                pickle.loads(payload)
+            )
+            result = await self._process_runner.run(
+                callable_object,
+                func_parameters,
+                data_model_args,
+                _RemoteDataModel(frames, job_id, tc_id, name),  # type: ignore
+                on_log=partial(self._send_log, frames, job_id),
+            )
+            reply: Tuple[Any, ...] = ("result", job_id, result)
+        except Exception as e:
+            reply = ("error", job_id, e, traceback.format_exc())
+        try:
+            try:
+                await frames.send(reply)
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                await frames.send(
+                    (
+                        "error",
+                        job_id,
+                        RemoteWorkerError(f"Outcome of job {job_id} cannot be sent back: {e}"),
+                        traceback.format_exc(),
+                    )
+                )
+        except (trio.BrokenResourceError, trio.ClosedResourceError):
+            self._logger.warning(f"Coordinator gone, outcome of job {job_id} dropped")
+
+    async def _send_log(
+        self, frames: FrameStream, job_id: int, level: int, logger_name: str, message: str
+    ) -> None:
+        await frames.send(("log", job_id, level, logger_name, message))
+
+
+class _RemoteJob:
+    def __init__(self, data_model: "TestCaseDataModel") -> None:
+        self.data_model = data_model
+        self.done = trio.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class _WorkerConnection:
+    def __init__(self, address: Address, frames: FrameStream, capacity: int, pid: int) -> None:
+        self.address = address
+        self.frames = frames
+        self.capacity = max(capacity, 1)
+        self.pid = pid
+        self.jobs: Dict[int, _RemoteJob] = {}
+        self.completed = 0
+
+    @property
+    def load(self) -> float:
+        return len(self.jobs) / self.capacity
+
+
+class RemoteRunner:
+    """
+    Coordinator side of RemoteWorker, a drop-in for ProcessRunner.run. Each job goes to the
+    connected worker with the lowest load, parameter updates and log records stream back while
+    it runs. Workers are connected on first use and reconnected after a failure, at most once
+    per retry_interval. start() must be running, it owns the connection reader tasks. authkey
+    is the secret shared with the workers, read from AUTHKEY_ENV when not given.
+    """
+
+    def __init__(
+        self,
+        addresses: Iterable[Address],
+        connect_timeout: float = 5.0,
+        retry_interval: float = 5.0,
+        authkey: bytes | None = None,
+    ) -> None:
+        self._addresses = list(addresses)
+        self._authkey = authkey or authkey_from_environment()
+        self._connect_timeout = connect_timeout
+        self._retry_interval = retry_interval
+        self._connections: Dict[Address, _WorkerConnection] = {}
+        self._retry_at: Dict[Address, float] = {}
+        self._connect_lock = trio.Lock()
+        self._job_ids = itertools.count()
+        self._nursery: trio.Nursery | None = None
+        self._logger = logging.getLogger("RemoteRunner")
+
+    async def start(self) -> None:
+        async with trio.open_nursery() as nursery:
+            self._nursery = nursery
+            try:
+                await self._connect_missing()
+                await trio.sleep_forever()
+            finally:
+                self._nursery = None
+
+    def statistics(self) -> Dict[str, Any]:
+        return {
+            str(address): {
+                "pid": connection.pid,
+                "capacity": connection.capacity,
+                "in_flight": len(connection.jobs),
+                "completed": connection.completed,
+            }
+            for address, connection in self._connections.items()
+        }
+
+    async def run(
+        self,
+        callable_object: Any,
+        func_parameters: Dict[str, Any],
+        data_model_args: Tuple[str, ...],
+        data_model: "TestCaseDataModel",
+    ) -> Any:
+        payload = pickle.dumps(
+            (callable_object, func_parameters, data_model_args, (data_model.id, data_model.name)),
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+        connection = await self._pick_connection()
+        job_id = next(self._job_ids)
+        job = _RemoteJob(data_model)
+        connection.jobs[job_id] = job
+        try:
+            try:
+                await connection.frames.send(("run", job_id, payload))
+            except (trio.BrokenResourceError, trio.ClosedResourceError) as e:
+                raise RemoteWorkerError(
+                    f"Lost remote worker {connection.address}: {e}"
+                ) from e
+            await job.done.wait()
+        finally:
+            connection.jobs.pop(job_id, None)
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    async def _pick_connection(self) -> _WorkerConnection:
+        if len(self._connections) < len(self._addresses):
+            await self._connect_missing()
+        if not self._connections:
+            raise RemoteWorkerError(f"No remote worker reachable at {self._addresses}")
+        return min(self._connections.values(), key=lambda connection: connection.load)
+
+    async def _connect_missing(self) -> None:
+        if self._nursery is None:
+            raise RemoteWorkerError("RemoteRunner is not started")
+        async with self._connect_lock:
+            for address in self._addresses:
+                if address in self._connections:
+                    continue
+                if trio.current_time() < self._retry_at.get(address, float("-inf")):
+                    continue
+                try:
+                    await self._nursery.start(self._serve_connection, address)
+                except (OSError, EOFError, trio.TooSlowError, RemoteWorkerError) as e:
+                    self._retry_at[address] = trio.current_time() + self._retry_interval
+                    self._logger.error(f"Cannot connect to remote worker {address}: {e}")
+
+    async def _serve_connection(
+        self, address: Address, task_status=trio.TASK_STATUS_IGNORED
+    ) -> None:
+        with trio.fail_after(self._connect_timeout):
+            stream = await _open_stream(address)
+            frames = FrameStream(stream)
+            try:
+                await frames.connect_peer(self._authkey)
+                greeting = await frames.receive()
+                if greeting[0] != "hello":
+                    raise RemoteWorkerError(f"Unexpected greeting {greeting[0]} from {address}")
+            except BaseException:
+                await trio.aclose_forcefully(stream)
+                raise
+        _, capacity, pid = greeting
+        connection = _WorkerConnection(address, frames, capacity, pid)
+        self._connections[address] = connection
+        self._logger.info(
+            f"Connected to remote worker {address} (pid {pid}, {capacity} job slots)"
+        )
+        task_status.started()
+        try:
+            async with stream:
+                while True:
+                    await self._dispatch(connection, await frames.receive())
+        except (EOFError, trio.BrokenResourceError, trio.ClosedResourceError, RemoteWorkerError) as e:
+            self._logger.error(f"Lost remote worker {address}: {e}")
+        finally:
+            del self._connections[address]
+            for job in connection.jobs.values():
+                job.error = RemoteWorkerError(f"Lost remote worker {address}")
+                job.done.set()
+
+    async def _dispatch(self, connection: _WorkerConnection, message: Tuple[Any, ...]) -> None:
+        message_type, job_id = message[0], message[1]
+        job = connection.jobs.get(job_id)
+        if job is None:
+            # COMMENT: The job was cancelled on this side, the worker still reports on it
+            return
+        if message_type == "update":
+            await apply_update(job.data_model, message[2])
+        elif message_type == "log":
+            _, _, level, logger_name, text = message
+            log_event(
+                logging.getLogger(logger_name),
+                level,
+                "remote_log",
+                "{text}",
+                text=text,
+                node_id=job.data_model.id,
+                worker=str(connection.address),
+            )
+        elif message_type == "result":
+            connection.completed += 1
+            job.result = message[2]
+            job.done.set()
+        elif message_type == "error":
+            _, _, error, remote_traceback = message
+            connection.completed += 1
+            # COMMENT: Same as concurrent.futures, the worker side traceback becomes the cause
+            error.__cause__ = RemoteWorkerError(f"\n{remote_traceback}")
+            job.error = error
+            job.done.set()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Runs test cases for a remote coordinator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--unix", help="Listen on this Unix socket path instead of TCP")
+    parser.add_argument("--max-jobs", type=int, default=None)
+    parser.add_argument(
+        "--allow-remote",
+        action="store_true",
+        help="Allow listening on a non-loopback address, only on an isolated bench network",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    address: Address = args.unix if args.unix else (args.host, args.port)
+    # COMMENT: The secret is taken from AUTHKEY_ENV, never from the command line where other
+    #   users can read it
+    worker = RemoteWorker(args.max_jobs, allow_remote=args.allow_remote)
+    trio.run(worker.serve, address)
+
+
+if __name__ == "__main__":
+    main()
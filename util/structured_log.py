@@ -0,0 +1,35 @@
+from typing import Any, Dict
+import logging
+
+
+class LogEvent:
+    """
+    A log message that is formatted only when a handler asks for it (LogRecord.getMessage calls
+    str() on the message). The fields are also set as attributes on the LogRecord, so sinks and
+    filters can use record.node_id and the like without parsing the message.
+    """
+
+    __slots__ = ("event", "template", "fields")
+
+    def __init__(self, event: str, template: str, fields: Dict[str, Any]) -> None:
+        self.event = event
+        self.template = template
+        self.fields = fields
+
+    def __str__(self) -> str:
+        return self.template.format(**self.fields)
+
+    def __repr__(self) -> str:
+        return f"LogEvent({self.event!r}, {self.fields!r})"
+
+
+def log_event(
+    logger: logging.Logger, level: int, event: str, template: str, **fields: Any
+) -> None:
+    """
+    Logs a structured event, template is a str.format template over the fields.
+    Field names must not clash with LogRecord attributes (name, msg, ...).
+    """
+    if logger.isEnabledFor(level):
+        fields["event"] = event
+        logger.log(level, LogEvent(event, template, fields), extra=fields)
@@ -0,0 +1,218 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterator, List, NamedTuple, TYPE_CHECKING
+import json
+import time
+
+if TYPE_CHECKING:
+    from _Node._BaseNode import BaseNode
+
+
+class Span(NamedTuple):
+    name: str
+    category: str
+    # COMMENT: time.perf_counter_ns() timestamps
+    start_ns: int
+    end_ns: int
+    queue_wait_ns: int
+    node_id: str | None
+    run_id: str | None
+    panel_id: Any
+
+
+class RingBuffer:
+    """
+    Keeps the last capacity items, older items are overwritten.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self._items: List[Any] = [None] * capacity
+        self._capacity = capacity
+        self._count = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def dropped(self) -> int:
+        return max(self._count - self._capacity, 0)
+
+    def __len__(self) -> int:
+        return min(self._count, self._capacity)
+
+    def append(self, item: Any) -> None:
+        self._items[self._count % self._capacity] = item
+        self._count += 1
+
+    def __iter__(self) -> Iterator[Any]:
+        # COMMENT: Oldest first
+        start = self._count - len(self)
+        for i in range(start, self._count):
+            yield self._items[i % self._capacity]
+
+
+class Tracer:
+    """
+    Records execution spans into a fixed-size ring buffer per test run, memory stays bounded
+    however long the application runs: each run keeps its last capacity_per_run spans and only
+    the max_runs most recent runs are kept. Spans without a run go to a buffer of their own.
+
+    The spans export as Chrome trace event JSON, which chrome://tracing and ui.perfetto.dev open.
+    Panels become processes, queue waits and executions are separate slices so scheduling gaps
+    show up.
+    """
+
+    def __init__(self, capacity_per_run: int = 10000, max_runs: int = 16) -> None:
+        self._capacity_per_run = capacity_per_run
+        self._max_runs = max_runs
+        self._buffers: "OrderedDict[Hashable, RingBuffer]" = OrderedDict()
+
+    @staticmethod
+    def now() -> int:
+        return time.perf_counter_ns()
+
+    def _buffer(self, run_id: str | None) -> RingBuffer:
+        buffer = self._buffers.get(run_id)
+        if buffer is None:
+            buffer = self._buffers[run_id] = RingBuffer(self._capacity_per_run)
+            if len(self._buffers) > self._max_runs:
+                self._buffers.popitem(last=False)
+        return buffer
+
+    def record(
+        self,
+        name: str,
+        category: str,
+        start_ns: int,
+        end_ns: int,
+        queue_wait_ns: int = 0,
+        node_id: str | None = None,
+        run_id: str | None = None,
+        panel_id: Any = None,
+    ) -> None:
+        self._buffer(run_id).append(
+            Span(name, category, start_ns, end_ns, queue_wait_ns, node_id, run_id, panel_id)
+        )
+
+    def record_node(self, node: "BaseNode", ready_ns: int, start_ns: int, end_ns: int) -> None:
+        self.record(
+            node.name,
+            "node",
+            start_ns,
+            end_ns,
+            start_ns - ready_ns,
+            node.id,
+            node.run_id,
+            node.panel_id,
+        )
+
+    @property
+    def run_ids(self) -> List[str | None]:
+        return list(self._buffers)
+
+    def spans(self, run_id: str | None = None, all_runs: bool = False) -> List[Span]:
+        if all_runs:
+            return [span for buffer in self._buffers.values() for span in buffer]
+        buffer = self._buffers.get(run_id)
+        return list(buffer) if buffer is not None else []
+
+    def statistics(self) -> Dict[str, Any]:
+        return {
+            str(run_id): {"spans": len(buffer), "dropped": buffer.dropped}
+            for run_id, buffer in self._buffers.items()
+        }
+
+    def clear(self) -> None:
+        self._buffers.clear()
+
+    def to_chrome_trace(
+        self, run_id: str | None = None, all_runs: bool = False
+    ) -> Dict[str, Any]:
+        spans = sorted(self.spans(run_id, all_runs), key=lambda span: span.start_ns - span.queue_wait_ns)
+        if not spans:
+            return {"traceEvents": [], "displayTimeUnit": "ms"}
+        origin = min(span.start_ns - span.queue_wait_ns for span in spans)
+        events: List[Dict[str, Any]] = []
+        # COMMENT: Spans of a panel are spread over lanes (threads) so that slices on the same lane
+        #   never overlap, lane_ends holds the end of the last slice of each lane
+        lane_ends: Dict[Any, List[int]] = {}
+        pids: Dict[Any, int] = {}
+        for span in spans:
+            pid = pids.setdefault(span.panel_id, len(pids) + 1)
+            wait_start = span.start_ns - span.queue_wait_ns
+            lanes = lane_ends.setdefault(span.panel_id, [])
+            for tid, lane_end in enumerate(lanes):
+                if lane_end <= wait_start:
+                    break
+            else:
+                tid = len(lanes)
+                lanes.append(0)
+            lanes[tid] = span.end_ns
+            args = {"node_id": span.node_id, "run_id": span.run_id, "panel_id": span.panel_id}
+            if span.queue_wait_ns > 0:
+                events.append(
+                    {
+                        "name": f"{span.name} (queued)",
+                        "cat": "queue",
+                        "ph": "X",
+                        "ts": (wait_start - origin) / 1000,
+                        "dur": span.queue_wait_ns / 1000,
+                        "pid": pid,
+                        "tid": tid,
+                        "args": args,
+                    }
+                )
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": (span.start_ns - origin) / 1000,
+                    "dur": (span.end_ns - span.start_ns) / 1000,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": dict(args, queue_wait_ms=span.queue_wait_ns / 1e6),
+                }
+            )
+        for panel_id, pid in pids.items():
+            events.append(
+                {
+                    "name": "process_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "args": {"name": f"Panel {panel_id}" if panel_id is not None else "Application"},
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(
+        self, path: str, run_id: str | None = None, all_runs: bool = False
+    ) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(run_id, all_runs), f)
+
+
+def plot_timeline(spans: List[Span], path: str = "function_execution_timeline.pdf") -> None:
+    """
+    Saves a Gantt chart of the spans. Needs matplotlib, which is only imported here.
+    """
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    if not spans:
+        return
+    origin = min(span.start_ns for span in spans)
+    fig, ax = plt.subplots()
+    for i, span in enumerate(spans):
+        ax.barh(i, (span.end_ns - span.start_ns) / 1e9, left=(span.start_ns - origin) / 1e9)
+    ax.set_yticks(range(len(spans)))
+    ax.set_yticklabels([span.name for span in spans])
+    ax.set_xlabel("Seconds")
+    ax.set_title("Function Execution Timeline")
+    fig.savefig(path)
+    plt.close(fig)
+
@@ -1,33 +1,15 @@
 # type: ignore
-import trio
+from _Application._DomainEntity._InteractionContext import InteractionContext, InteractionType
+import time
 
-class UIRequestTask:
-    def __init__(self) -> None:
-        self._message = {
-            "type": "prompt",
-            "data": "int"
-        }
-        self.event = trio.Event()
-        self._response = None
-
-    @property
-    def response(self):
-        return self._response 
-    
-    @response.setter
-    def response(self, value):
-        self._response = value
-        self.event.set()
-
-    @property
-    def message(self):
-        return self._message    
 
 class UIRequest():
     def __init__(self, send_channel) -> None:
-        self._task = None  # a ws task that send the request to UI
         self._send_channel = send_channel   
         self._response = None
+        self._timed_out = False
+        # COMMENT: Total time spent waiting on the operator, in nanoseconds
+        self._wait_ns = 0
 
     @property
     def response(self):
@@ -37,11 +19,23 @@ class UIRequest():
     def response(self, value):  
         self._response = value
 
-    async def queue_request(self) -> None:
-        # TODO: queue the task that sends request to the UI
-        task = UIRequestTask()
-        await self._send_channel.send(task)
-        await task.event.wait()
-        self.response = task.response  
+    @property
+    def timed_out(self):
+        return self._timed_out
+
+    @property
+    def wait_ns(self):
+        return self._wait_ns
 
-    
\ No newline at end of file
+    async def queue_request(self, payload="int", timeout=None, default_response=None) -> None:
+        interaction_context = InteractionContext(
+            InteractionType.InputRequest, payload, timeout, default_response
+        )
+        start_ns = time.perf_counter_ns()
+        try:
+            await self._send_channel.send(interaction_context)
+            await interaction_context.response_ready()
+        finally:
+            self._wait_ns += time.perf_counter_ns() - start_ns
+        self.response = interaction_context.response
+        self._timed_out = interaction_context.timed_out